@@ -1,34 +1,57 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify, session
+from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify
 import os
 from werkzeug.utils import secure_filename
 from dna_encoder import (
-    initialize_nucleotides, read_file, encrypt_data,
-    convert_to_nucleotides, decode_nucleotides, binary_to_bytes,
-    decrypt_data, rs_encode, rs_decode, save_metadata, load_metadata,
-    serialize_huffman_info, deserialize_huffman_info, 
-    derive_key_iv_from_password, encrypt_data_with_password, decrypt_data_with_password,
-    verify_password, generate_password_hash
+    save_metadata, load_metadata, DICTIONARIES_FILE, load_dna_sequence, is_packed_dna_file, pack_dna, unpack_dna,
+    encode_file, decode_file, decode_range, encode_data, decode_data
 )
-from huffman import huffman_encode, huffman_decode  # Add direct import from huffman module
-import tempfile
+from huffman import load_dictionaries
+from engine import get_engine
+from parallel import run_job
 import shutil
 import json
 import uuid
-import base64
+import io
+import mmap
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.urandom(24)
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 40 * 1024 * 1024  # 40MB max upload
+app.config['JOB_WORKERS'] = None  # Processes running encode/decode jobs (None: one per CPU, 0: in the request thread)
+
+app.config['HUFFMAN_DICTIONARIES'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), DICTIONARIES_FILE)
 
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Load user-trained Huffman dictionaries (see `python dna_encoder.py train`)
+if os.path.exists(app.config['HUFFMAN_DICTIONARIES']):
+    load_dictionaries(app.config['HUFFMAN_DICTIONARIES'])
+
+# Reed-Solomon codecs and lookup tables shared by all requests of this worker
+engine = get_engine()
+
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'mp3', 'mp4', 'zip'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def run_in_pool(function, *args):
+    """
+    Run a CPU-bound encode or decode job in the job process pool and return its result.
+    
+    Compression, key derivation, encryption and Reed-Solomon coding would
+    otherwise hold the GIL of this process for the whole job; the request
+    thread now only waits, so other requests (and jobs of other users, on
+    other workers) keep running. Workers load the Huffman dictionaries too.
+    """
+    dictionaries = app.config['HUFFMAN_DICTIONARIES']
+    if os.path.exists(dictionaries):
+        return run_job(function, *args, workers=app.config['JOB_WORKERS'],
+                       initializer=load_dictionaries, initargs=(dictionaries,))
+    return run_job(function, *args, workers=app.config['JOB_WORKERS'])
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -62,70 +85,35 @@ def encode():
             # Get configuration from form
             config = {
                 'use_compression': request.form.get('use_compression') == 'on',
+                'compression_codec': request.form.get('compression_codec', 'auto'),
                 'use_encryption': request.form.get('use_encryption') == 'on',
+                'cipher': 'aes-gcm',
                 'use_error_correction': request.form.get('use_error_correction') == 'on',
-                'ecc_symbols': int(request.form.get('ecc_symbols', 20))
+                'ecc_symbols': int(request.form.get('ecc_symbols', 20)),
+                'ecc_interleave': 'auto',
+                'packed_dna': request.form.get('packed_dna') == 'on',
+                'oligo_length': int(request.form.get('oligo_length', 200)) if request.form.get('use_oligos') == 'on' else 0,
+                'fountain': request.form.get('use_oligos') == 'on' and request.form.get('fountain') == 'on',
+                'random_access': request.form.get('random_access') == 'on',
+                'sequence_format': request.form.get('sequence_format') or None,
+                'nucleotide_code': request.form.get('nucleotide_code', 'binary')
             }
             
             # Process the file
             try:
-                # Initialize mappings
-                nucleotides, inverse_nucleotides = initialize_nucleotides()
-                
-                # Read file data
-                data = read_file(file_path)
-                
-                # Process data based on configuration
-                processed_data = data
-                original_encoded_length = len(data)
-                info = None
-                
-                # Step 1: Compression (optional)
-                if config['use_compression']:
-                    processed_data, info = huffman_encode(processed_data)
-                    original_encoded_length = len(processed_data)
-                
-                # Step 2: Encryption (optional)
-                encryption_salt = None
-                password_hash = None
-                verification_salt = None
+                # Get password from form
+                password = None
                 if config['use_encryption']:
-                    # Get password from form
                     password = request.form.get('encryption_password', '')
                     if not password:
                         flash('Encryption password is required when encryption is enabled')
                         return redirect(request.url)
-                        
-                    processed_data, encryption_salt, password_hash, verification_salt = encrypt_data_with_password(processed_data, password)
-                
-                # Step 3: Error correction (optional)
-                if config['use_error_correction']:
-                    ecc_symbols = config['ecc_symbols']
-                    processed_data = rs_encode(bytes(processed_data), ecc_symbols)
-                
-                # Convert to DNA sequence
-                dna_sequence = convert_to_nucleotides(processed_data, nucleotides)
                 
-                # Create metadata - store encryption salt but not the password
-                metadata = {
-                    'config': config,
-                    'original_file_name': filename,
-                    'original_size': len(data),
-                    'processed_size': original_encoded_length,
-                    'encryption_salt': base64.b64encode(encryption_salt).decode('utf-8') if encryption_salt else None,
-                    'password_hash': base64.b64encode(password_hash).decode('utf-8') if password_hash else None,
-                    'verification_salt': base64.b64encode(verification_salt).decode('utf-8') if verification_salt else None,
-                    'huffman_info': serialize_huffman_info(info),
-                    'dna_sequence_length': len(dna_sequence)
-                }
-                
-                # Save DNA sequence and metadata
-                dna_file = os.path.join(process_dir, f"{os.path.splitext(filename)[0]}.dna")
+                # Encode through the streaming pipeline, writing the DNA as it is produced;
+                # the metadata stores the encryption salt but not the password
+                dna_file = os.path.join(process_dir, f"{os.path.splitext(filename)[0]}.{config['sequence_format'] or 'dna'}")
                 metadata_file = os.path.join(process_dir, f"{os.path.splitext(filename)[0]}_metadata.json")
-                
-                with open(dna_file, 'w') as f:
-                    f.write(dna_sequence)
-                
+                metadata = run_in_pool(encode_file, file_path, dna_file, config, password)
                 save_metadata(metadata, metadata_file)
                 
                 # Don't save the encryption key file anymore since we're using password-based encryption
@@ -172,20 +160,11 @@ def decode():
         metadata_file.save(metadata_path)
         
         try:
-            # Initialize mappings
-            nucleotides, inverse_nucleotides = initialize_nucleotides()
-            
-            # Load DNA sequence and metadata
-            with open(dna_path, 'r') as f:
-                dna_sequence = f.read().strip()
-            
             metadata = load_metadata(metadata_path)
-            
-            # Extract configuration and needed information
             config = metadata['config']
-            original_encoded_length = metadata['processed_size']
             
             # Get encryption password if needed
+            encryption_password = None
             if config['use_encryption']:
                 # Check if we have a salt in the metadata
                 if 'encryption_salt' not in metadata or not metadata['encryption_salt']:
@@ -196,71 +175,36 @@ def decode():
                 if not encryption_password:
                     flash('Encryption password is required for decoding this file')
                     return redirect(request.url)
-                    
-                encryption_salt = base64.b64decode(metadata['encryption_salt'])
-                
-                # Verify password if hash exists
-                if 'password_hash' in metadata and 'verification_salt' in metadata:
-                    password_hash = base64.b64decode(metadata['password_hash'])
-                    verification_salt = base64.b64decode(metadata['verification_salt'])
-                    
-                    if not verify_password(encryption_password, password_hash, verification_salt):
-                        flash('Incorrect password. Please check your password and try again.', 'error')
-                        return redirect(request.url)
-            
-            huffman_info = deserialize_huffman_info(metadata['huffman_info'])
-            output_file = metadata['original_file_name']
-            
-            # Decode the DNA sequence
-            binary_string = decode_nucleotides(dna_sequence, inverse_nucleotides)
-            
-            # Convert binary string to bytes
-            byte_array = binary_to_bytes(binary_string)
-            
-            # Process data back based on configuration (in reverse order)
-            retrieved_data = byte_array
             
-            # Step 1: Error correction (optional) - reverse
-            if config['use_error_correction']:
-                ecc_symbols = config['ecc_symbols']
-                retrieved_data = rs_decode(retrieved_data, ecc_symbols)
-            
-            # Step 2: Decryption (optional) - reverse
-            if config['use_encryption']:
-                try:
-                    # Use appropriate decryption method based on whether we have password hash
-                    if 'password_hash' in metadata and 'verification_salt' in metadata:
-                        password_hash = base64.b64decode(metadata['password_hash'])
-                        verification_salt = base64.b64decode(metadata['verification_salt'])
-                        retrieved_data = decrypt_data_with_password(
-                            retrieved_data, encryption_password, encryption_salt, 
-                            password_hash, verification_salt, original_encoded_length)
-                    else:
-                        # For backward compatibility with older files
-                        key, iv, _ = derive_key_iv_from_password(encryption_password, encryption_salt)
-                        key_iv_tuple = (key, iv)
-                        retrieved_data = decrypt_data(retrieved_data, key_iv_tuple, original_encoded_length)
-                        
-                    # Ensure output is the right length
-                    retrieved_data = retrieved_data[:original_encoded_length]
-                except ValueError as e:
-                    if str(e) == "PASSWORD_INCORRECT":
-                        flash('Incorrect password. Please check your password and try again.', 'error')
-                    else:
-                        flash('Decryption failed. The data may be corrupted.', 'data_error')
+            # Decode through the streaming pipeline (text or packed .dna), writing the output as it is produced
+            output_path = os.path.join(process_dir, f"decoded_{metadata['original_file_name']}")
+            range_start = request.form.get('range_start', '').strip()
+            range_end = request.form.get('range_end', '').strip()
+            stats = {}
+            try:
+                if range_start or range_end:
+                    # Only the requested bytes, e.g. one record out of a large archive
+                    data = run_in_pool(decode_range, dna_path, metadata, int(range_start or 0),
+                                       int(range_end) if range_end else None, encryption_password)
+                    with open(output_path, "wb") as f:
+                        f.write(data)
+                else:
+                    stats = run_in_pool(decode_file, dna_path, metadata, output_path, encryption_password)
+            except ValueError as e:
+                if str(e) == "PASSWORD_INCORRECT":
+                    flash('Incorrect password. Please check your password and try again.', 'error')
                     return redirect(request.url)
-                except Exception as e:
+                if str(e) == "DECRYPTION_FAILED":
                     flash('Decryption failed. The data may be corrupted.', 'data_error')
                     return redirect(request.url)
+                raise
             
-            # Step 3: Decompression (optional) - reverse
-            if config['use_compression']:
-                retrieved_data = huffman_decode(bytes(retrieved_data), huffman_info)
-            
-            # Save the decoded output to a file
-            output_path = os.path.join(process_dir, f"decoded_{output_file}")
-            with open(output_path, "wb") as f:
-                f.write(retrieved_data)
+            oligo_stats = stats.get('oligos')
+            if oligo_stats and (oligo_stats['missing'] or oligo_stats['invalid']):
+                flash(f"{oligo_stats['missing']} oligos were missing and {oligo_stats['invalid']} were unreadable.")
+            ecc_stats = stats.get('ecc')
+            if ecc_stats and ecc_stats['uncorrectable']:
+                flash(f"{ecc_stats['uncorrectable']} Reed-Solomon codewords could not be corrected; the output may be damaged.")
             
             # Return success with process ID for download
             flash('File decoded successfully!')
@@ -293,7 +237,7 @@ def result(process_id):
     for file in files:
         if file.startswith('decoded_'):
             file_info['decoded'].append(file)
-        elif file.endswith('.dna'):
+        elif file.endswith(('.dna', '.fasta', '.fastq')):
             file_info['dna'].append(file)
         elif file.endswith('_metadata.json'):
             file_info['metadata'].append(file)
@@ -305,7 +249,23 @@ def result(process_id):
 @app.route('/download/<process_id>/<filename>')
 def download(process_id, filename):
     process_dir = os.path.join(app.config['UPLOAD_FOLDER'], process_id)
-    return send_file(os.path.join(process_dir, filename), as_attachment=True)
+    file_path = os.path.join(process_dir, filename)
+    
+    # .dna files can be downloaded in either format with ?format=text or ?format=packed
+    dna_format = request.args.get('format')
+    if filename.endswith('.dna') and dna_format in ('text', 'packed'):
+        packed = is_packed_dna_file(file_path)
+        if dna_format == 'text' and packed:
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                converted = unpack_dna(mm).encode('ascii')
+            return send_file(io.BytesIO(converted), as_attachment=True, download_name=filename)
+        if dna_format == 'packed' and not packed:
+            nucleotides = engine.nucleotides
+            # Line breaks of oligo pools are dropped; their oligos have a fixed length
+            converted = pack_dna("".join(load_dna_sequence(file_path).split()), nucleotides)
+            return send_file(io.BytesIO(converted), as_attachment=True, download_name=filename)
+    
+    return send_file(file_path, as_attachment=True)
 
 @app.route('/clean/<process_id>', methods=['POST'])
 def clean(process_id):
@@ -322,15 +282,14 @@ def text():
         # Get configuration from form
         config = {
             'use_compression': request.form.get('use_compression') == 'on',
+            'compression_codec': request.form.get('compression_codec', 'auto'),
             'use_encryption': request.form.get('use_encryption') == 'on',
+            'cipher': 'aes-gcm',
             'use_error_correction': request.form.get('use_error_correction') == 'on',
             'ecc_symbols': int(request.form.get('ecc_symbols', 20))
         }
         
         try:
-            # Initialize nucleotide mappings
-            nucleotides, inverse_nucleotides = initialize_nucleotides()
-            
             if action == 'encode':
                 # Get input text
                 input_text = request.form.get('input_text', '')
@@ -338,51 +297,16 @@ def text():
                     flash('Please enter some text to encode')
                     return redirect(url_for('text'))
                 
-                # Convert text to bytes
-                data = input_text.encode('utf-8')
-                
-                # Process data based on configuration
-                processed_data = data
-                original_encoded_length = len(data)
-                info = None
-                
-                # Step 1: Compression (optional)
-                if config['use_compression']:
-                    processed_data, info = huffman_encode(processed_data)
-                    original_encoded_length = len(processed_data)
-                
-                # Step 2: Encryption (optional)
-                encryption_salt = None
-                password_hash = None
-                verification_salt = None
+                # Get password from form
+                password = None
                 if config['use_encryption']:
-                    # Get password from form
                     password = request.form.get('encryption_password', '')
                     if not password:
                         flash('Encryption password is required when encryption is enabled')
                         return redirect(url_for('text'))
-                        
-                    processed_data, encryption_salt, password_hash, verification_salt = encrypt_data_with_password(processed_data, password)
                 
-                # Step 3: Error correction (optional)
-                if config['use_error_correction']:
-                    ecc_symbols = config['ecc_symbols']
-                    processed_data = rs_encode(bytes(processed_data), ecc_symbols)
-                
-                # Convert to DNA sequence
-                dna_sequence = convert_to_nucleotides(processed_data, nucleotides)
-                
-                # Create metadata - include encryption salt but not the password
-                metadata = {
-                    'config': config,
-                    'original_size': len(data),
-                    'processed_size': original_encoded_length,
-                    'encryption_salt': base64.b64encode(encryption_salt).decode('utf-8') if encryption_salt else None,
-                    'password_hash': base64.b64encode(password_hash).decode('utf-8') if password_hash else None,
-                    'verification_salt': base64.b64encode(verification_salt).decode('utf-8') if verification_salt else None,
-                    'huffman_info': serialize_huffman_info(info),
-                    'dna_sequence_length': len(dna_sequence)
-                }
+                # Compress, encrypt and add error correction in the job pool
+                dna_sequence, metadata = run_in_pool(encode_data, input_text.encode('utf-8'), config, password)
                 
                 # Convert metadata to JSON string
                 metadata_json = json.dumps(metadata, indent=2)
@@ -412,9 +336,8 @@ def text():
                     flash('Invalid metadata JSON format')
                     return redirect(url_for('text'))
                 
-                # Extract configuration and needed information
+                # Extract configuration
                 config = metadata['config']
-                original_encoded_length = metadata['processed_size']
                 
                 # Get encryption password if needed
                 if config['use_encryption']:
@@ -427,86 +350,28 @@ def text():
                     if not encryption_password:
                         flash('Encryption password is required for decoding')
                         return redirect(url_for('text'))
-                        
-                    encryption_salt = base64.b64decode(metadata['encryption_salt'])
-                    
-                    # Verify password if hash exists
-                    if 'password_hash' in metadata and 'verification_salt' in metadata:
-                        password_hash = base64.b64decode(metadata['password_hash'])
-                        verification_salt = base64.b64decode(metadata['verification_salt'])
-                        
-                        if not verify_password(encryption_password, password_hash, verification_salt):
-                            flash('Incorrect password. Please check your password and try again.', 'error')
-                            return render_template('text.html', 
-                                             dna_text=dna_sequence, 
-                                             metadata_text=metadata_json,
-                                             config=config,
-                                             password_error=True,
-                                             show_password_info=config['use_encryption'])
-                
-                huffman_info = deserialize_huffman_info(metadata['huffman_info'])
-                
-                # Decode the DNA sequence
-                binary_string = decode_nucleotides(dna_sequence, inverse_nucleotides)
-                
-                # Convert binary string to bytes
-                byte_array = binary_to_bytes(binary_string)
-                
-                # Process data back based on configuration (in reverse order)
-                retrieved_data = byte_array
                 
-                # Step 1: Error correction (optional) - reverse
-                if config['use_error_correction']:
-                    ecc_symbols = config['ecc_symbols']
-                    retrieved_data = rs_decode(retrieved_data, ecc_symbols)
-                
-                # Step 2: Decryption (optional) - reverse
-                if config['use_encryption']:
-                    try:
-                        # Use appropriate decryption method based on whether we have password hash
-                        if 'password_hash' in metadata and 'verification_salt' in metadata:
-                            password_hash = base64.b64decode(metadata['password_hash'])
-                            verification_salt = base64.b64decode(metadata['verification_salt'])
-                            retrieved_data = decrypt_data_with_password(
-                                retrieved_data, encryption_password, encryption_salt, 
-                                password_hash, verification_salt, original_encoded_length)
-                        else:
-                            # For backward compatibility with older files
-                            key, iv, _ = derive_key_iv_from_password(encryption_password, encryption_salt)
-                            key_iv_tuple = (key, iv)
-                            retrieved_data = decrypt_data(retrieved_data, key_iv_tuple, original_encoded_length)
-                            
-                        # Ensure output is the right length
-                        retrieved_data = retrieved_data[:original_encoded_length]
-                    except ValueError as e:
-                        if str(e) == "PASSWORD_INCORRECT":
-                            flash('Incorrect password. Please check your password and try again.', 'error')
-                            return render_template('text.html', 
-                                          dna_text=dna_sequence, 
-                                          metadata_text=metadata_json,
-                                          config=config,
-                                          password_error=True,
-                                          show_password_info=config['use_encryption'])
-                        else:
-                            flash('Decryption failed. The data may be corrupted.', 'data_error')
-                            return render_template('text.html', 
-                                          dna_text=dna_sequence, 
-                                          metadata_text=metadata_json,
-                                          config=config,
-                                          data_error=True,
-                                          show_password_info=config['use_encryption'])
-                    except Exception as e:
-                        flash('An error occurred during decryption. The data may be corrupted.', 'data_error')
+                # Verify the password, then decode, decrypt and decompress in the job pool
+                try:
+                    retrieved_data = run_in_pool(decode_data, dna_sequence, metadata, encryption_password)
+                except ValueError as e:
+                    if str(e) == "PASSWORD_INCORRECT":
+                        flash('Incorrect password. Please check your password and try again.', 'error')
                         return render_template('text.html', 
-                                          dna_text=dna_sequence, 
-                                          metadata_text=metadata_json,
-                                          config=config,
-                                          data_error=True,
-                                          show_password_info=config['use_encryption'])
-                
-                # Step 3: Decompression (optional) - reverse
-                if config['use_compression']:
-                    retrieved_data = huffman_decode(bytes(retrieved_data), huffman_info)
+                                      dna_text=dna_sequence, 
+                                      metadata_text=metadata_json,
+                                      config=config,
+                                      password_error=True,
+                                      show_password_info=config['use_encryption'])
+                    if str(e) == "DECRYPTION_FAILED":
+                        flash('Decryption failed. The data may be corrupted.', 'data_error')
+                        return render_template('text.html', 
+                                      dna_text=dna_sequence, 
+                                      metadata_text=metadata_json,
+                                      config=config,
+                                      data_error=True,
+                                      show_password_info=config['use_encryption'])
+                    raise
                 
                 # Convert bytes back to text
                 output_text = retrieved_data.decode('utf-8', errors='replace')
@@ -525,6 +390,7 @@ def text():
     # Default configuration for GET request
     config = {
         'use_compression': True,
+        'compression_codec': 'auto',
         'use_encryption': True,
         'use_error_correction': True,
         'ecc_symbols': 20
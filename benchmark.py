@@ -0,0 +1,287 @@
+"""
+Throughput and ratio benchmarks for the encoding pipeline stages.
+
+Usage: python benchmark.py [section ...]
+"""
+import os
+import random
+import struct
+import sys
+import time
+from compression import compress_data, decompress_data
+from range_coder import range_encode, range_decode
+from dna_encoder import (
+    initialize_nucleotides, convert_to_nucleotides, decode_nucleotides, binary_to_bytes,
+    nucleotides_to_bytes, rotating_encode, rotating_decode, rs_encode, rs_decode,
+    parallel_rs_encode, parallel_rs_decode, iter_fountain_oligos, reassemble_droplets,
+    fountain_segment_size, encode_file, decode_file, CONFIG, np
+)
+from parallel import default_workers
+from engine import Engine
+from huffman import huffman_encode, huffman_decode, build_decode_table
+from reedsolo import RSCodec
+from reed_solomon import get_rs_backend, rs_backend_names
+import io
+import tempfile
+
+# Size of the generated benchmark corpora
+CORPUS_SIZE = 256 * 1024
+
+
+def text_corpus(size=CORPUS_SIZE):
+    """Return `size` bytes of text: the project's own sources and docs, repeated."""
+    root = os.path.dirname(os.path.abspath(__file__))
+    text = b""
+    for directory, _, files in os.walk(root):
+        for name in sorted(files):
+            if name.endswith((".py", ".md", ".html")):
+                with open(os.path.join(directory, name), "rb") as f:
+                    text += f.read()
+    return (text * (size // len(text) + 1))[:size]
+
+
+def binary_corpus(size=CORPUS_SIZE):
+    """Return `size` bytes of structured binary data: fixed-size sensor-style records."""
+    rng = random.Random(0)
+    records = bytearray()
+    timestamp = 1_600_000_000
+    value = 20.0
+    while len(records) < size:
+        timestamp += rng.randint(1, 5)
+        value += rng.gauss(0, 0.1)
+        records += struct.pack("<IfHB", timestamp, value, rng.randint(0, 1023), rng.randint(0, 3))
+    return bytes(records[:size])
+
+
+def _measure(function, *args):
+    """Run function once and return (result, seconds)."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def _rate(size, seconds):
+    """Format a throughput in MB/s."""
+    return f"{size / max(seconds, 1e-9) / 1e6:8.2f} MB/s"
+
+
+def bench_compression():
+    """Compare compression ratio and speed of the Huffman and range coder paths."""
+    print("Compression")
+    print(f"{'corpus':8} {'codec':10} {'ratio':>7} {'compress':>13} {'decompress':>13}")
+    for corpus_name, corpus in (("text", text_corpus()), ("binary", binary_corpus())):
+        for codec in ("huffman", "zlib", "bz2", "lzma"):
+            (compressed, _, info), encode_time = _measure(compress_data, corpus, codec)
+            decoded, decode_time = _measure(decompress_data, compressed, codec, info)
+            assert decoded == corpus
+            print(f"{corpus_name:8} {codec:10} {len(compressed) / len(corpus):7.3f} "
+                  f"{_rate(len(corpus), encode_time)} {_rate(len(corpus), decode_time)}")
+        for order in range(4):
+            compressed, encode_time = _measure(range_encode, corpus, order)
+            decoded, decode_time = _measure(range_decode, compressed)
+            assert decoded == corpus
+            print(f"{corpus_name:8} {f'range-o{order}':10} {len(compressed) / len(corpus):7.3f} "
+                  f"{_rate(len(corpus), encode_time)} {_rate(len(corpus), decode_time)}")
+    print()
+
+
+def _legacy_convert_to_nucleotides(data, nucleotides):
+    """Reference: the original per-byte binary string formatting encoder."""
+    nucleotides_list = []
+    for i in data:
+        binary = f"{i:08b}"
+        nucleotides_list.extend([nucleotides[int(binary[j:j+2], 2)] for j in range(0, 8, 2)])
+    return "ATG" + "".join(nucleotides_list) + "TAC"
+
+
+def _legacy_nucleotides_to_bytes(sequence, inverse_nucleotides):
+    """Reference: the original binary string decoder."""
+    string = ""
+    for i in sequence[3:-3]:
+        string += inverse_nucleotides[i]
+    padded = string.ljust(((len(string) + 7) // 8) * 8, '0')
+    return bytearray(int(padded[i:i + 8], 2) for i in range(0, len(padded), 8))
+
+
+def bench_dna():
+    """Compare byte <-> nucleotide conversion throughput (MB/s of input bytes)."""
+    nucleotides, inverse_nucleotides = initialize_nucleotides()
+    data = os.urandom(4 * CORPUS_SIZE)
+    sequence = convert_to_nucleotides(data, nucleotides)
+    rotated = rotating_encode(data, nucleotides)
+    print("DNA conversion")
+    print(f"{'path':44} {'throughput':>13}")
+    paths = [
+        ("encode: legacy binary strings", _legacy_convert_to_nucleotides, (data, nucleotides)),
+        ("encode: convert_to_nucleotides (python)", convert_to_nucleotides, (data, nucleotides, 'python')),
+        ("decode: legacy binary strings", _legacy_nucleotides_to_bytes, (sequence, inverse_nucleotides)),
+        ("decode: decode_nucleotides+binary_to_bytes",
+         lambda seq, inv: binary_to_bytes(decode_nucleotides(seq, inv)), (sequence, inverse_nucleotides)),
+        ("decode: nucleotides_to_bytes (python)", nucleotides_to_bytes, (sequence, inverse_nucleotides, 'python')),
+        ("encode: rotating code", rotating_encode, (data, nucleotides, "G")),
+        ("decode: rotating code (python)", rotating_decode, (rotated, nucleotides, "G", 'python')),
+    ]
+    if np is not None:
+        paths += [
+            ("encode: convert_to_nucleotides (numpy)", convert_to_nucleotides, (data, nucleotides, 'numpy')),
+            ("decode: nucleotides_to_bytes (numpy)", nucleotides_to_bytes, (sequence, inverse_nucleotides, 'numpy')),
+            ("decode: rotating code (numpy)", rotating_decode, (rotated, nucleotides, "G", 'numpy')),
+        ]
+    for name, function, args in paths:
+        result, seconds = _measure(function, *args)
+        assert result in (sequence, rotated, data)
+        print(f"{name:44} {_rate(len(data), seconds)}")
+    print()
+
+
+def bench_engine():
+    """Compare per-call setup with and without the cached engine, on /text-sized payloads."""
+    message = text_corpus(200)
+    encoded, info = huffman_encode(message)
+    engine = Engine()
+    calls = 200
+    print("Engine setup (small payloads)")
+    print(f"{'path':44} {'per call':>13}")
+    paths = [
+        ("rs_encode: new RSCodec per call", lambda: RSCodec(20).encode(message)),
+        ("rs_encode: cached RSCodec", lambda: rs_encode(message, 20)),
+        ("huffman_decode table: rebuilt per call", lambda: build_decode_table(info["codes"])),
+        ("huffman_decode table: cached",
+         lambda: engine.huffman_decode_table(info["codes"], build_decode_table)),
+        ("huffman_decode (cached table)", lambda: huffman_decode(encoded, info)),
+    ]
+    for name, function in paths:
+        function()  # Warm the caches
+        _, seconds = _measure(lambda: [function() for _ in range(calls)])
+        print(f"{name:44} {seconds / calls * 1e3:10.3f} ms")
+    print()
+
+
+def bench_rs(ecc_symbols=20):
+    """Compare serial and process-pool Reed-Solomon throughput (MB/s of message bytes)."""
+    data = os.urandom(2 * CORPUS_SIZE)
+    encoded, encode_time = _measure(rs_encode, data, ecc_symbols)
+    decoded, decode_time = _measure(rs_decode, bytearray(encoded), ecc_symbols)
+    assert decoded == data
+    print(f"Reed-Solomon ({ecc_symbols} symbols)")
+    print(f"{'workers':44} {'encode':>13} {'decode':>13}")
+    print(f"{'serial':44} {_rate(len(data), encode_time)} {_rate(len(data), decode_time)}")
+    
+    # One corrupted byte in every tenth codeword: only those take the full decoder
+    noisy = bytearray(encoded)
+    for start in range(0, len(noisy), 2550):
+        noisy[start] ^= 0xFF
+    stats = {}
+    decoded, noisy_time = _measure(rs_decode, noisy, ecc_symbols, stats)
+    assert decoded == data
+    print(f"{'serial, 10% of codewords corrupted':44} {'':>13} {_rate(len(data), noisy_time)}  {stats}")
+    for workers in sorted({2, max(default_workers(), 2)}):
+        parallel_rs_encode(data, ecc_symbols, workers)  # Start the pool outside the timing
+        result, encode_time = _measure(parallel_rs_encode, data, ecc_symbols, workers)
+        assert result == encoded
+        result, decode_time = _measure(parallel_rs_decode, bytearray(encoded), ecc_symbols, workers)
+        assert result == data
+        print(f"{workers:<44} {_rate(len(data), encode_time)} {_rate(len(data), decode_time)}")
+    print()
+
+
+def bench_rs_backends(ecc_symbols=20):
+    """Compare the installed Reed-Solomon backends in codewords/sec."""
+    data = os.urandom(CORPUS_SIZE)
+    reference = RSCodec(ecc_symbols).encode(data)
+    codewords = -(-len(reference) // 255)
+    noisy = bytearray(reference)
+    for start in range(0, len(noisy), 2550):
+        noisy[start] ^= 0xFF
+    print(f"Reed-Solomon backends ({ecc_symbols} symbols, codewords/s; default: {get_rs_backend().name})")
+    print(f"{'backend':20} {'encode':>13} {'check':>13} {'decode':>13} {'decode 10%':>13}")
+    for name in rs_backend_names():
+        encoded, encode_time = _measure(rs_encode, data, ecc_symbols, name)
+        assert encoded == reference
+        _, check_time = _measure(get_rs_backend(name).check, reference, ecc_symbols)
+        decoded, decode_time = _measure(rs_decode, bytearray(reference), ecc_symbols, None, name)
+        assert decoded == data
+        decoded, noisy_time = _measure(rs_decode, bytearray(noisy), ecc_symbols, None, name)
+        assert decoded == data
+        rates = [f"{codewords / seconds:>13,.0f}" for seconds in (encode_time, check_time, decode_time, noisy_time)]
+        print(f"{name:20} {' '.join(rates)}")
+    print()
+
+
+def bench_fountain(oligo_length=150, dropout=0.1):
+    """Time DNA Fountain encoding and decoding, and count the droplets the decoder needed per segment."""
+    nucleotides, _ = initialize_nucleotides()
+    print(f"DNA Fountain ({oligo_length} nt droplets, {dropout:.0%} dropout)")
+    print(f"{'payload':12} {'droplets':>9} {'encode':>13} {'decode':>13} {'read/segment':>13}")
+    rng = random.Random(0)
+    for size in (4 * 1024, 64 * 1024, CORPUS_SIZE):
+        data = os.urandom(size)
+        droplets, encode_time = _measure(lambda: list(iter_fountain_oligos(data, nucleotides, oligo_length)))
+        received = [droplet for droplet in droplets if rng.random() >= dropout]
+        rng.shuffle(received)
+        output = io.BytesIO()
+        stats, decode_time = _measure(reassemble_droplets, received, nucleotides, oligo_length, size, output)
+        assert output.getvalue() == data and not stats['missing']
+        segments = -(-size // fountain_segment_size(oligo_length))
+        print(f"{size:<12} {len(droplets):>9} {_rate(size, encode_time)} {_rate(size, decode_time)} "
+              f"{stats['oligos'] / segments:>13.3f}")
+    print()
+
+
+def check_oligo_dropout(oligo_length=150, dropout=0.05, trials=5):
+    """Check that an oligo pool survives losing any one of its last oligos, and time decodes with random dropout."""
+    config = dict(CONFIG, oligo_length=oligo_length)
+    data = text_corpus(150 * 1024)
+    print(f"Oligo pool dropout ({oligo_length} nt oligos, {config['ecc_symbols']} ecc symbols, interleaved)")
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "input")
+        pool = os.path.join(tmp, "pool.dna")
+        with open(source, "wb") as f:
+            f.write(data)
+        metadata = encode_file(source, pool, config, "benchmark")
+        with open(pool) as f:
+            oligos = f.read().split()
+        
+        def decode_without(lost):
+            damaged = os.path.join(tmp, "damaged.dna")
+            with open(damaged, "w") as f:
+                f.write("".join(oligo + "\n" for address, oligo in enumerate(oligos) if address not in lost))
+            output = os.path.join(tmp, "output")
+            try:
+                stats = decode_file(damaged, metadata, output, "benchmark")
+            except ValueError:
+                return False, 0.0
+            with open(output, "rb") as f:
+                return f.read() == data, stats['ecc']['uncorrectable']
+        
+        # The last oligos hold the end of the last interleaved block, once a weak spot
+        for address in range(len(oligos) - 8, len(oligos)):
+            decoded, _ = decode_without({address})
+            assert decoded, f"Losing oligo {address} of {len(oligos)} broke the decode"
+        print(f"{'any one of the last 8 oligos lost':44} ok")
+        
+        rng = random.Random(0)
+        decoded = 0
+        for _ in range(trials):
+            lost = {address for address in range(len(oligos)) if rng.random() < dropout}
+            (ok, _), decode_time = _measure(decode_without, lost)
+            decoded += ok
+        print(f"{f'{dropout:.0%} random dropout, decoded exactly':44} {decoded}/{trials}  "
+              f"{_rate(len(data), decode_time)}")
+    print()
+
+
+BENCHMARKS = {
+    "compression": bench_compression,
+    "dna": bench_dna,
+    "engine": bench_engine,
+    "rs": bench_rs,
+    "rs-backends": bench_rs_backends,
+    "fountain": bench_fountain,
+    "oligos": check_oligo_dropout,
+}
+
+
+if __name__ == "__main__":
+    for section in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[section]()
@@ -0,0 +1,457 @@
+import bz2
+import itertools
+import lzma
+import math
+import time
+import zlib
+from collections import Counter, namedtuple
+from huffman import (
+    parallel_huffman_encode, parallel_huffman_decode, dictionary_encode, dictionary_ids,
+    dictionary_codes, pack_huffman_header, iter_compress, iter_decompress, DEFAULT_BLOCK_SIZE,
+    STREAM_HEADER, stream_header_size, decompress_block
+)
+from range_coder import range_encode, range_decode
+
+# A compression backend. compress(data, workers) returns (compressed, info),
+# decompress(compressed, info, workers) returns the original bytes. info is
+# only used by Huffman (its code table) and is None for the other codecs.
+Codec = namedtuple("Codec", ["name", "compress", "decompress"])
+
+CODECS = {}
+
+# Codecs tried by select_codec, in order of preference on ties. The range
+# coder is left out: it compresses well but runs at a few hundred KB/s, so it
+# has to be chosen explicitly.
+AUTO_CODECS = ["huffman", "zlib", "bz2", "lzma"]
+
+# Static Huffman dictionaries are selected as "huffman:<dictionary id>"
+DICTIONARY_PREFIX = "huffman:"
+
+# Inputs up to this size also try every static Huffman dictionary in auto mode
+DICTIONARY_MAX_SIZE = 4 * 1024
+
+# Bytes sampled from the input to choose a codec
+SAMPLE_SIZE = 64 * 1024
+SAMPLE_PIECES = 4
+
+# Samples with at least this many bits of entropy per byte are left uncompressed
+INCOMPRESSIBLE_ENTROPY = 7.9
+
+# Compression must save at least this fraction of the sample to be used
+MIN_SAVINGS = 0.02
+
+# Codecs whose output is within this fraction of the smallest are considered
+# equally good, and the fastest of them is chosen
+SIZE_TOLERANCE = 0.02
+
+
+# A codec that works chunk by chunk. compress(chunks) and decompress(chunks)
+# take an iterable of byte chunks and yield the output in bounded pieces.
+StreamCodec = namedtuple("StreamCodec", ["name", "compress", "decompress"])
+
+STREAM_CODECS = {}
+
+# Codecs tried by iter_compress_data in auto mode
+AUTO_STREAM_CODECS = ["huffman-stream", "zlib", "bz2", "lzma"]
+
+# Codecs whose output can be decoded from the middle (random access). Huffman
+# streams need the block index recorded by iter_compress_data.
+SEEKABLE_CODECS = ["huffman-stream", "store"]
+
+# Block size of seekable Huffman streams, the least a random access decodes
+SEEKABLE_BLOCK_SIZE = 64 * 1024
+
+# Size of the chunks streamed between pipeline stages
+STREAM_CHUNK_SIZE = DEFAULT_BLOCK_SIZE
+
+
+def register_codec(name, compress, decompress):
+    """Register a compression backend under the given name."""
+    CODECS[name] = Codec(name, compress, decompress)
+
+
+def get_codec(name):
+    """Return the registered codec with the given name."""
+    if name.startswith(DICTIONARY_PREFIX):
+        dictionary_id = name[len(DICTIONARY_PREFIX):]
+        return Codec(
+            name,
+            lambda data, workers: dictionary_encode(data, dictionary_id),
+            CODECS["huffman"].decompress,
+        )
+    if name not in CODECS:
+        raise ValueError(f"Unknown compression codec: {name}")
+    return CODECS[name]
+
+
+def stored_size(compressed, info):
+    """Return the bytes needed to store a compressed payload and its code table, if any."""
+    if info is None:
+        return len(compressed)
+    return len(compressed) + len(pack_huffman_header(info) or b"")
+
+
+def byte_entropy(data):
+    """Return the order-0 Shannon entropy of data in bits per byte."""
+    if not data:
+        return 0.0
+    total = len(data)
+    return -sum(count / total * math.log2(count / total) for count in Counter(data).values())
+
+
+def sample_data(data, size=SAMPLE_SIZE, pieces=SAMPLE_PIECES):
+    """Return up to `size` bytes of data, taken as evenly spaced pieces."""
+    if len(data) <= size:
+        return bytes(data)
+    piece = size // pieces
+    step = (len(data) - piece) // (pieces - 1)
+    return b"".join(bytes(data[i * step:i * step + piece]) for i in range(pieces))
+
+
+def select_codec(data, candidates=None):
+    """
+    Pick the codec to use for data.
+    
+    A sample of the input is checked for entropy first, so data that is
+    already compressed (JPG, MP4, ZIP...) is stored without trying anything.
+    Otherwise every candidate compresses the sample, and the fastest of the
+    codecs that produce (nearly) the smallest output is returned. Small
+    inputs also try the static Huffman dictionaries, whose code table costs
+    nothing to store.
+    
+    Args:
+        data (bytes): Input bytes
+        candidates (list): Codec names to try, defaults to AUTO_CODECS
+        
+    Returns:
+        str: Name of the chosen codec ("store" if compression does not pay off)
+    """
+    return _run_trials(sample_data(data), candidates)[0]
+
+
+def _run_trials(sample, candidates=None):
+    """Trial-compress sample with every candidate, returning (codec_name, compressed, info) of the winner."""
+    if not sample or byte_entropy(sample) >= INCOMPRESSIBLE_ENTROPY:
+        return "store", None, None
+    
+    if candidates is None:
+        candidates = list(AUTO_CODECS)
+        if len(sample) <= DICTIONARY_MAX_SIZE:
+            candidates += [DICTIONARY_PREFIX + dictionary_id for dictionary_id in dictionary_ids()]
+    
+    trials = []
+    for name in candidates:
+        start = time.perf_counter()
+        compressed, info = get_codec(name).compress(sample, 1)
+        elapsed = time.perf_counter() - start
+        trials.append((stored_size(compressed, info), elapsed, name, compressed, info))
+    
+    smallest = min(trial[0] for trial in trials)
+    if smallest > len(sample) * (1 - MIN_SAVINGS):
+        return "store", None, None
+    
+    close = [trial for trial in trials if trial[0] <= smallest * (1 + SIZE_TOLERANCE)]
+    _, _, name, compressed, info = min(close, key=lambda trial: trial[1])
+    return name, compressed, info
+
+
+def compress_data(data, codec="auto", workers=1):
+    """
+    Compress data with the named codec.
+    
+    Args:
+        data (bytes): Input bytes
+        codec (str): Registered codec name, "huffman:<dictionary id>" for a
+            static Huffman dictionary, or "auto" to let select_codec decide
+        workers (int): Worker processes for codecs that support them
+        
+    Returns:
+        tuple: (compressed_data, codec_name, info)
+    """
+    if codec == "auto":
+        if len(data) <= SAMPLE_SIZE:
+            # The whole input was the sample, reuse the winning trial
+            codec, compressed, info = _run_trials(bytes(data))
+            if compressed is not None:
+                return compressed, codec, info
+        else:
+            codec = select_codec(data)
+    compressed, info = get_codec(codec).compress(data, workers)
+    return compressed, codec, info
+
+
+def decompress_data(data, codec, info=None, workers=1):
+    """Decompress data produced by compress_data with the given codec and info."""
+    return get_codec(codec).decompress(data, info, workers)
+
+
+def register_stream_codec(name, compress, decompress):
+    """Register a chunk-by-chunk compression backend under the given name."""
+    STREAM_CODECS[name] = StreamCodec(name, compress, decompress)
+
+
+def get_stream_codec(name):
+    """
+    Return the stream codec used for the named codec, or None if it cannot be streamed.
+    
+    Huffman streams are written in the block container of huffman.py, so
+    "huffman" maps to "huffman-stream", and a static dictionary becomes the
+    table shared by all blocks of the stream.
+    """
+    if name == "huffman":
+        return STREAM_CODECS["huffman-stream"]
+    if name.startswith(DICTIONARY_PREFIX):
+        codes = dictionary_codes(name[len(DICTIONARY_PREFIX):])
+        return StreamCodec(
+            "huffman-stream",
+            lambda chunks: iter_compress(rebatch(chunks, STREAM_CHUNK_SIZE), STREAM_CHUNK_SIZE, codes),
+            STREAM_CODECS["huffman-stream"].decompress,
+        )
+    return STREAM_CODECS.get(name)
+
+
+def rebatch(chunks, size):
+    """Regroup an iterable of byte chunks into pieces of exactly size bytes (the last may be shorter)."""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= size:
+            usable = len(buffer) - len(buffer) % size
+            for start in range(0, usable, size):
+                yield bytes(buffer[start:start + size])
+            del buffer[:usable]
+    if buffer:
+        yield bytes(buffer)
+
+
+def iter_compress_data(chunks, codec="auto", workers=1, index=None):
+    """
+    Compress an iterable of byte chunks with the named codec.
+    
+    An input that fits in a single chunk is compressed in memory by
+    compress_data, so small files get exactly the same result as before
+    (including static dictionaries in auto mode). Longer inputs are
+    compressed chunk by chunk; auto mode then picks among
+    AUTO_STREAM_CODECS using a sample of the first chunk. Codecs without a
+    streaming form (the range coder) fall back to compressing the joined
+    input in memory.
+    
+    Passing an index list asks for output that supports random access: only
+    SEEKABLE_CODECS are used (Huffman codecs become "huffman-stream", others
+    raise ValueError) and the block offsets are appended to index for
+    decompress_range.
+    
+    Args:
+        chunks (iterable): Input byte chunks
+        codec (str): Codec name as for compress_data, or "auto"
+        workers (int): Worker processes for in-memory compression
+        index (list): Receives the block index of seekable output
+        
+    Returns:
+        tuple: (codec_name, info, iterator of compressed pieces). info is
+            only set for in-memory Huffman output and must be stored with
+            the codec name to decompress.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, b"")
+    second = next(chunks, None)
+    if index is not None:
+        head = [first] if second is None else [first, second]
+        return _iter_compress_seekable(itertools.chain(head, chunks), first, codec, index)
+    if second is None:
+        compressed, codec, info = compress_data(first, codec, workers)
+        return codec, info, iter([compressed])
+    chunks = itertools.chain([first, second], chunks)
+    
+    if codec == "auto":
+        codec = _run_trials(sample_data(first), AUTO_STREAM_CODECS)[0]
+    stream_codec = get_stream_codec(codec)
+    if stream_codec is None:
+        compressed, info = get_codec(codec).compress(b"".join(chunks), workers)
+        return codec, info, iter([compressed])
+    return stream_codec.name, None, stream_codec.compress(chunks)
+
+
+def _iter_compress_seekable(chunks, first, codec, index):
+    """Compress chunks with a seekable codec for iter_compress_data, recording the block index."""
+    if codec == "auto":
+        codec = _run_trials(sample_data(first), ["huffman-stream"])[0]
+    if codec == "store":
+        return "store", None, (bytes(chunk) for chunk in chunks)
+    
+    if codec in ("huffman", "huffman-stream"):
+        codes = None
+    elif codec.startswith(DICTIONARY_PREFIX):
+        codes = dictionary_codes(codec[len(DICTIONARY_PREFIX):])
+    else:
+        raise ValueError(f"Compression codec {codec} does not support random access")
+    return "huffman-stream", None, iter_compress(rebatch(chunks, SEEKABLE_BLOCK_SIZE), SEEKABLE_BLOCK_SIZE, codes, index)
+
+
+def decompress_range(read, codec, index, start, stop):
+    """
+    Decompress bytes [start, stop) of the original data from seekable compressed output.
+    
+    Args:
+        read (callable): read(offset, length) returning bytes of the
+            compressed output
+        codec (str): "huffman-stream" or "store"
+        index (list): Block index recorded by iter_compress_data
+        start (int): First original byte wanted
+        stop (int): End of the original range, exclusive
+        
+    Returns:
+        bytes: The requested range, touching only the blocks that cover it
+    """
+    if stop <= start:
+        return b""
+    if codec == "store":
+        return read(start, stop - start)
+    if codec != "huffman-stream" or not index:
+        raise ValueError(f"Compression codec {codec} does not support random access")
+    
+    header = read(0, STREAM_HEADER.size)
+    header = read(0, stream_header_size(header))
+    block_size = STREAM_HEADER.unpack(header[:STREAM_HEADER.size])[3]
+    
+    first = start // block_size
+    last = min((stop - 1) // block_size, len(index) - 2)
+    data = read(index[first], index[last + 1] - index[first])
+    blocks = []
+    for k in range(first, last + 1):
+        blocks.append(decompress_block(data[index[k] - index[first]:index[k + 1] - index[first]], header))
+    offset = start - first * block_size
+    return b"".join(blocks)[offset:offset + stop - start]
+
+
+def iter_decompress_data(chunks, codec, info=None, workers=1):
+    """
+    Decompress an iterable of byte chunks produced by iter_compress_data or compress_data.
+    
+    Stream codecs yield their output in bounded pieces. Output of codecs
+    that cannot be streamed (in-memory Huffman, range) is decompressed in
+    one piece.
+    """
+    stream_codec = STREAM_CODECS.get(codec)
+    if stream_codec is None:
+        yield decompress_data(b"".join(chunks), codec, info, workers)
+        return
+    yield from stream_codec.decompress(chunks)
+
+
+class _ChunkReader:
+    """Minimal binary file interface over an iterable of byte chunks, for huffman.iter_decompress."""
+    
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+    
+    def read(self, size):
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+def _iter_compressobj(chunks, compressor):
+    """Feed chunks through a zlib/bz2/lzma compressor object."""
+    for chunk in chunks:
+        piece = compressor.compress(chunk)
+        if piece:
+            yield piece
+    yield compressor.flush()
+
+
+def _iter_zlib_decompress(chunks):
+    """Decompress a zlib stream, yielding at most STREAM_CHUNK_SIZE bytes at a time."""
+    decompressor = zlib.decompressobj()
+    for chunk in chunks:
+        while chunk:
+            piece = decompressor.decompress(chunk, STREAM_CHUNK_SIZE)
+            if piece:
+                yield piece
+            chunk = decompressor.unconsumed_tail
+    if not decompressor.eof:
+        raise ValueError("Truncated zlib stream")
+
+
+def _iter_decompressor(chunks, decompressor):
+    """Decompress a bz2/lzma stream, yielding at most STREAM_CHUNK_SIZE bytes at a time."""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        piece = decompressor.decompress(chunk, STREAM_CHUNK_SIZE)
+        while piece:
+            yield piece
+            if decompressor.needs_input or decompressor.eof:
+                break
+            piece = decompressor.decompress(b"", STREAM_CHUNK_SIZE)
+    if not decompressor.eof:
+        raise ValueError("Truncated compressed stream")
+
+
+register_codec(
+    "huffman",
+    lambda data, workers: parallel_huffman_encode(data, workers),
+    lambda data, info, workers: parallel_huffman_decode(data, info, workers),
+)
+register_codec(
+    "huffman-stream",
+    lambda data, workers: (b"".join(iter_compress(rebatch([data], STREAM_CHUNK_SIZE), STREAM_CHUNK_SIZE)), None),
+    lambda data, info, workers: b"".join(iter_decompress(_ChunkReader([data]))),
+)
+register_codec(
+    "range",
+    lambda data, workers: (range_encode(data), None),
+    lambda data, info, workers: range_decode(data),
+)
+register_codec(
+    "zlib",
+    lambda data, workers: (zlib.compress(data, 9), None),
+    lambda data, info, workers: zlib.decompress(data),
+)
+register_codec(
+    "bz2",
+    lambda data, workers: (bz2.compress(data, 9), None),
+    lambda data, info, workers: bz2.decompress(data),
+)
+register_codec(
+    "lzma",
+    lambda data, workers: (lzma.compress(data), None),
+    lambda data, info, workers: lzma.decompress(data),
+)
+register_codec(
+    "store",
+    lambda data, workers: (bytes(data), None),
+    lambda data, info, workers: bytes(data),
+)
+
+register_stream_codec(
+    "huffman-stream",
+    lambda chunks: iter_compress(rebatch(chunks, STREAM_CHUNK_SIZE), STREAM_CHUNK_SIZE),
+    lambda chunks: iter_decompress(_ChunkReader(chunks)),
+)
+register_stream_codec(
+    "zlib",
+    lambda chunks: _iter_compressobj(chunks, zlib.compressobj(9)),
+    _iter_zlib_decompress,
+)
+register_stream_codec(
+    "bz2",
+    lambda chunks: _iter_compressobj(chunks, bz2.BZ2Compressor(9)),
+    lambda chunks: _iter_decompressor(chunks, bz2.BZ2Decompressor()),
+)
+register_stream_codec(
+    "lzma",
+    lambda chunks: _iter_compressobj(chunks, lzma.LZMACompressor()),
+    lambda chunks: _iter_decompressor(chunks, lzma.LZMADecompressor()),
+)
+register_stream_codec(
+    "store",
+    lambda chunks: (bytes(chunk) for chunk in chunks),
+    lambda chunks: (bytes(chunk) for chunk in chunks),
+)
@@ -1,31 +1,79 @@
 from os import urandom
-from math import log2, floor
-from huffman import huffman_encode, huffman_decode
-from reedsolo import RSCodec, ReedSolomonError
+from math import ceil
+from huffman import (
+    pack_huffman_header, unpack_huffman_header, HEADER_MAGIC, train_dictionary, save_dictionaries,
+    load_dictionaries, iter_blocks, load_pickled_header
+)
+from compression import (
+    compress_data, decompress_data, iter_compress_data, iter_decompress_data, decompress_range, rebatch,
+    STREAM_CHUNK_SIZE
+)
+from parallel import get_executor, default_workers, split_ranges
+from engine import get_engine
+from reed_solomon import (
+    get_rs_backend, rs_interleave, rs_deinterleave, rs_deinterleave_positions, rs_interleave_block, RS_BACKENDS
+)
+from fastx import (
+    detect_format, write_fasta, write_fastq, iter_fasta, iter_fastq, iter_sequence, mean_quality, QUALITY_OFFSET
+)
+from fountain import iter_droplets, screen_strand, FountainDecoder
+from reedsolo import ReedSolomonError
 import json
 import base64
 import pickle
+import io
 import os
 import hashlib
 import hmac
+import itertools
+import array
+import bisect
+import mmap
+import struct
+import tempfile
+import contextlib
+from multiprocessing import shared_memory
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.backends import default_backend
 
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure Python converters are used instead
+    np = None
+
 # Configuration options
 CONFIG = {
-    'use_compression': True,    # Whether to use Huffman compression
+    'use_compression': True,    # Whether to use compression
+    'compression_codec': 'auto',  # Codec name (huffman, range, zlib, bz2, lzma, store, huffman:<dictionary>) or 'auto'
     'use_encryption': True,     # Whether to use AES encryption
+    'cipher': 'aes-gcm',        # 'aes-gcm' (authenticated, in independent chunks) or 'aes-cbc' (older files)
     'use_error_correction': True,  # Whether to use Reed-Solomon error correction
-    'ecc_symbols': 20           # Number of error correction symbols if error correction is enabled
+    'ecc_symbols': 20,          # Number of error correction symbols if error correction is enabled
+    'compression_workers': 1,   # Processes used for Huffman compression (1 = single-threaded)
+    'packed_dna': False,        # Write .dna files packed 4 nucleotides per byte instead of ASCII text
+    'oligo_length': 0,          # Split the DNA into addressed oligos of about this many nucleotides (0 = one strand)
+    'oligo_workers': 1,         # Processes used to decode oligo pools
+    'fountain': False,          # Write the oligo pool as DNA Fountain droplets (rateless LT code) instead of addressed pieces
+    'fountain_redundancy': 0.3,  # Extra droplets made in fountain mode, as a fraction of the payload segments
+    'ecc_workers': 1,           # Processes used for Reed-Solomon encoding and decoding
+    'ecc_interleave': 'auto',   # Codewords interleaved per block ('auto' = one per oligo payload byte, 1 = none)
+    'rs_backend': 'auto',       # Reed-Solomon implementation: 'auto', 'pure', 'creedsolo' or 'numpy'
+    'random_access': False,     # Record a block index so byte ranges can be decoded without the whole file
+    'sequence_format': None,    # Write FASTA ('fasta') or FASTQ ('fastq') records instead of a .dna file
+    'nucleotide_code': 'binary'  # 'binary' (2 bits per nucleotide) or 'rotating' (no homopolymers, GC near 50%, 6 nucleotides per byte)
 }
 
+# User-trained static Huffman dictionaries, loaded on startup if present
+DICTIONARIES_FILE = "huffman_dictionaries.json"
+
 def initialize_nucleotides():
-    """Initialize nucleotide mapping dictionaries."""
-    nucleotides = ["A", "C", "G", "T"]
-    inverse_nucleotides = {n: f"{i:02b}" for i, n in enumerate(nucleotides)}
-    return nucleotides, inverse_nucleotides
+    """Return the nucleotide mapping dictionaries of the shared engine (do not modify them)."""
+    engine = get_engine()
+    return engine.nucleotides, engine.inverse_nucleotides
 
 def read_file(file_path):
     """Read binary data from a file."""
@@ -33,26 +81,34 @@ def read_file(file_path):
         data = f.read()
     return data
 
+def pbkdf2(password, salt, iterations, length, cache=True):
+    """Derive length bytes from a password with PBKDF2-HMAC-SHA256, through the engine's key cache unless cache is False."""
+    # Convert password string to bytes if it's not already
+    if isinstance(password, str):
+        password = password.encode('utf-8')
+    
+    def derive():
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=length,
+            salt=salt,
+            iterations=iterations,
+            backend=default_backend()
+        )
+        return kdf.derive(password)
+    if not cache:
+        return derive()
+    return get_engine().keys.get(('pbkdf2-sha256', iterations, length), salt, password, derive)
+
 def derive_key_iv_from_password(password, salt=None):
     """Derive encryption key and IV from a password using PBKDF2."""
+    # A new random salt if not provided; its key is never looked up again, so it is not cached
+    cache = salt is not None
     if salt is None:
-        salt = os.urandom(16)  # Generate a random salt if not provided
-    
-    # Use PBKDF2 to derive a key from the password
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=48,  # 32 bytes for key, 16 bytes for IV
-        salt=salt,
-        iterations=100000,  # High number of iterations for security
-        backend=default_backend()
-    )
+        salt = os.urandom(16)
     
-    # Convert password string to bytes if it's not already
-    if isinstance(password, str):
-        password = password.encode('utf-8')
-        
-    # Derive the key material
-    key_material = kdf.derive(password)
+    # 32 bytes for key, 16 bytes for IV; a high number of iterations for security
+    key_material = pbkdf2(password, salt, 100000, 48, cache)
     
     # Split into key and IV
     key = key_material[:32]
@@ -62,49 +118,20 @@ def derive_key_iv_from_password(password, salt=None):
 
 def generate_password_hash(password, salt=None):
     """Generate a hash for password verification."""
+    cache = salt is not None
     if salt is None:
         salt = os.urandom(16)
-        
-    # Convert password string to bytes if it's not already
-    if isinstance(password, str):
-        password = password.encode('utf-8')
-        
+    
     # Use a different salt for the verification hash
     verification_salt = hashlib.sha256(salt).digest()[:16]
     
-    # Create a hash using PBKDF2
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=verification_salt,
-        iterations=10000,
-        backend=default_backend()
-    )
-    
-    password_hash = kdf.derive(password)
+    password_hash = pbkdf2(password, verification_salt, 10000, 32, cache)
     return password_hash, verification_salt
 
 def verify_password(password, stored_hash, verification_salt):
     """Verify password against stored hash."""
-    # Convert password string to bytes if it's not already
-    if isinstance(password, str):
-        password = password.encode('utf-8')
-        
-    # Create a hash using PBKDF2
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=verification_salt,
-        iterations=10000,
-        backend=default_backend()
-    )
-    
-    try:
-        # This will raise an exception if verification fails
-        kdf.verify(password, stored_hash)
-        return True
-    except Exception:
-        return False
+    # Constant-time comparison, like PBKDF2HMAC.verify
+    return hmac.compare_digest(pbkdf2(password, verification_salt, 10000, 32), bytes(stored_hash))
 
 def encrypt_data(data, key_iv_tuple):
     """Encrypt data using AES-CBC with the given key and IV."""
@@ -194,41 +221,1617 @@ def deserialize_key_iv(key_b64, iv_b64):
     iv = base64.b64decode(iv_b64)
     return key, iv
 
-def convert_to_nucleotides(encrypted_data, nucleotides):
-    """Convert encrypted binary data to nucleotide sequence."""
-    nucleotides_list = []
-    for i in encrypted_data:
-        binary = f"{i:08b}"
-        nucleotides_list.extend([nucleotides[int(binary[j:j+2], 2)] for j in range(0, 8, 2)])
-    return "ATG" + "".join(nucleotides_list) + "TAC"  # Add start/stop codons
+# Inputs at least this large are converted with NumPy in 'auto' backend mode
+NUMPY_MIN_SIZE = 4096
+
+def _use_numpy(backend, size):
+    """Decide whether a conversion of `size` bytes runs on the NumPy backend."""
+    if backend == 'numpy':
+        if np is None:
+            raise ValueError("The NumPy nucleotide backend requires numpy to be installed")
+        return True
+    if backend == 'python':
+        return False
+    if backend != 'auto':
+        raise ValueError(f"Unknown nucleotide backend: {backend}")
+    return np is not None and size >= NUMPY_MIN_SIZE
+
+def nucleotide_tables(nucleotides):
+    """Return (byte -> 4-mer list, nucleotide -> base-4 digit str.translate table) for an alphabet."""
+    tables = get_engine().nucleotide_tables
+    key = tuple(nucleotides)
+    if key not in tables:
+        byte_to_kmer = [
+            nucleotides[byte >> 6] + nucleotides[(byte >> 4) & 3] + nucleotides[(byte >> 2) & 3] + nucleotides[byte & 3]
+            for byte in range(256)
+        ]
+        # Digits in the input are not nucleotides and must not pass as base-4 digits
+        to_digits = {ord(digit): "x" for digit in "0123456789"}
+        to_digits.update({ord(n): str(i) for i, n in enumerate(nucleotides)})
+        tables[key] = (byte_to_kmer, to_digits)
+    return tables[key]
+
+def convert_to_nucleotides(encrypted_data, nucleotides, backend='auto'):
+    """Convert encrypted binary data to nucleotide sequence (backend: 'auto', 'numpy' or 'python')."""
+    return "ATG" + unpack_nucleotides(encrypted_data, nucleotides, backend) + "TAC"  # Add start/stop codons
+
+def unpack_nucleotides(data, nucleotides, backend='auto'):
+    """Unpack bytes into nucleotides, four per byte, without start/stop codons."""
+    if _use_numpy(backend, len(data)):
+        return _bytes_to_nucleotides_numpy(data, nucleotides)
+    byte_to_kmer, _ = nucleotide_tables(nucleotides)
+    return "".join(map(byte_to_kmer.__getitem__, data))
+
+def _numpy_nucleotide_tables(nucleotides):
+    """
+    Return the NumPy lookup arrays of the binary code for an alphabet.
+    
+    Returns:
+        tuple: (kmers, pairs) where kmers[byte] is the byte's 4-mer as one
+            uint32 of ASCII and pairs[c0 | c1 << 8] is the 4-bit value of
+            the ASCII nucleotide pair c0 c1, or 255 if either is invalid
+    """
+    tables = get_engine().nucleotide_tables
+    key = ('numpy',) + tuple(nucleotides)
+    if key not in tables:
+        byte_to_kmer, _ = nucleotide_tables(nucleotides)
+        kmers = np.frombuffer("".join(byte_to_kmer).encode('ascii'), dtype=np.uint32)
+        pairs = np.full(1 << 16, 255, dtype=np.uint8)
+        for i, first in enumerate(nucleotides):
+            for j, second in enumerate(nucleotides):
+                pairs[ord(first) | ord(second) << 8] = i << 2 | j
+        tables[key] = (kmers, pairs)
+    return tables[key]
+
+def _bytes_to_nucleotides_numpy(data, nucleotides):
+    """Look every byte up as its whole 4-mer, one uint32 of ASCII per byte."""
+    kmers, _ = _numpy_nucleotide_tables(nucleotides)
+    return kmers[np.frombuffer(bytes(data), dtype=np.uint8)].tobytes().decode('ascii')
+
+def _nucleotides_to_bytes_numpy(sequence, nucleotides):
+    """Look nucleotides up two at a time as 4-bit values and join every two of those into a byte."""
+    _, pairs = _numpy_nucleotide_tables(nucleotides)
+    try:
+        raw = sequence.encode('ascii')
+    except UnicodeEncodeError:
+        raise ValueError("Invalid nucleotide in DNA sequence")
+    
+    # Pad to whole bytes like binary_to_bytes; the first nucleotide is the zero digit
+    raw += nucleotides[0].encode('ascii') * (-len(raw) % 4)
+    values = pairs[np.frombuffer(raw, dtype='<u2')]
+    if (values == 255).any():
+        raise ValueError("Invalid nucleotide in DNA sequence")
+    
+    # Word v0 | v1 << 8 holds two 4-bit values; the byte is v0 << 4 | v1
+    words = values.view('<u2')
+    return bytearray(((words << 4) | (words >> 8)).astype(np.uint8).tobytes())
+
+def nucleotides_to_bytes(encoded_data, inverse_nucleotides, backend='auto'):
+    """Convert nucleotide sequence straight back to bytes (decode_nucleotides + binary_to_bytes in one step)."""
+    nucleotides = sorted(inverse_nucleotides, key=lambda n: inverse_nucleotides[n])
+    return pack_nucleotides(encoded_data[3:-3], nucleotides, backend)  # Skip start/stop codons
+
+def pack_nucleotides(sequence, nucleotides, backend='auto'):
+    """Pack nucleotides into bytes, four per byte, zero-padding the last byte."""
+    if _use_numpy(backend, len(sequence) // 4):
+        return _nucleotides_to_bytes_numpy(sequence, nucleotides)
+    _, to_digits = nucleotide_tables(nucleotides)
+    
+    # Each nucleotide is one base-4 digit; pad to whole bytes like binary_to_bytes
+    digits = sequence.translate(to_digits)
+    digits += "0" * (-len(digits) % 4)
+    if not digits:
+        return bytearray()
+    if not (digits.isascii() and digits.isdigit()):
+        raise ValueError("Invalid nucleotide in DNA sequence")
+    return bytearray(int(digits, 4).to_bytes(len(digits) // 4, 'big'))
 
 def decode_nucleotides(encoded_data, inverse_nucleotides):
     """Convert nucleotide sequence back to binary string."""
-    string = ""
-    for i in encoded_data[3:-3]:  # Skip start/stop codons
-        string += inverse_nucleotides[i]
-    return string
+    return "".join(map(inverse_nucleotides.__getitem__, encoded_data[3:-3]))  # Skip start/stop codons
 
 def binary_to_bytes(binary_string):
     """Convert binary string to byte array."""
     # Make sure binary string length is a multiple of 8
     padded_length = ((len(binary_string) + 7) // 8) * 8
     padded_binary = binary_string.ljust(padded_length, '0')
-    return bytearray(int(padded_binary[i:i + 8], 2) for i in range(0, len(padded_binary), 8))
+    if not padded_binary:
+        return bytearray()
+    return bytearray(int(padded_binary, 2).to_bytes(padded_length // 8, 'big'))
+
+# Nucleotide codes used by the file pipeline, with the nucleotides each byte takes. 'binary'
+# maps every 2 bits to a nucleotide. 'rotating' writes a byte as 6 base-3 digits, each
+# choosing one of the 3 nucleotides that differ from the one before, so the strand has no
+# homopolymer runs. Only 256 of the 729 digit strings are needed for the bytes, and the
+# spare ones give every GC- or AT-rich byte a second spelling leaning the other way, which
+# the encoder uses to keep the GC content near 50%
+NUCLEOTIDE_CODES = {'binary': 4, 'rotating': 6}
+
+# The rotating code continues from the last nucleotide of the start codon
+ROTATING_START = "G"
+
+def nucleotides_per_byte(code):
+    """Return how many nucleotides a nucleotide code writes per byte."""
+    if code not in NUCLEOTIDE_CODES:
+        raise ValueError(f"Unknown nucleotide code: {code}")
+    return NUCLEOTIDE_CODES[code]
+
+def _rotating_kmer(nucleotides, state, value):
+    """Spell a value below 729 as 6 base-3 digits after the nucleotide with index state."""
+    kmer = ""
+    for k in range(6):
+        state = (state + 1 + value // 3 ** (5 - k) % 3) % 4
+        kmer += nucleotides[state]
+    return kmer, state
+
+def rotating_tables(nucleotides):
+    """
+    Return the precomputed state-transition tables of the rotating code for an alphabet.
+    
+    The state is the index of the previous nucleotide. Digit d after
+    nucleotide p is written as nucleotide (p + 1 + d) % 4. Byte b is
+    first spelled as the digits of b itself; when that 6-mer has more G/C
+    than A/T or the other way round, the first unused value from 256 to
+    728 leaning the other way becomes its spare spelling.
+    
+    Returns:
+        tuple: (encode, decode, remap) where encode[state << 8 | byte] is
+            (6-mer, next state << 8, G/C minus A/T count) for the first
+            spelling followed by the same for the spare, decode maps previous
+            nucleotide + 6-mer to its byte, and remap[state * 729 + value]
+            is the byte a digit value reads as
+    """
+    tables = get_engine().nucleotide_tables
+    key = ('rotating',) + tuple(nucleotides)
+    if key not in tables:
+        encode = [None] * 1024
+        remap = [value % 256 for value in range(729)] * 4
+        for state in range(4):
+            spellings = []
+            for value in range(729):
+                kmer, current = _rotating_kmer(nucleotides, state, value)
+                skew = sum(1 if n in "GC" else -1 for n in kmer)
+                spellings.append((kmer, current << 8, skew))
+            spare = {1: iter(v for v in range(256, 729) if spellings[v][2] > 0),
+                     -1: iter(v for v in range(256, 729) if spellings[v][2] < 0)}
+            for byte in range(256):
+                skew = spellings[byte][2]
+                value = next(spare[-1 if skew > 0 else 1]) if skew else byte
+                remap[state * 729 + value] = byte
+                encode[state << 8 | byte] = spellings[byte] + spellings[value]
+        
+        # Every 6-mer gets a byte, not only valid ones: a substituted nucleotide must
+        # still decode so Reed-Solomon can correct it. A repeated nucleotide reads as
+        # digit 0 and values that spell no byte wrap around.
+        decode = {}
+        for state in range(4):
+            for kmer in itertools.product(range(4), repeat=6):
+                value = 0
+                previous = state
+                for current in kmer:
+                    value = value * 3 + (current - previous - 1) % 4 % 3
+                    previous = current
+                decode[nucleotides[state] + "".join(nucleotides[i] for i in kmer)] = remap[state * 729 + value]
+        tables[key] = (encode, decode, remap)
+    return tables[key]
+
+def rotating_encode(data, nucleotides, previous=ROTATING_START, backend='auto'):
+    """
+    Write bytes in the rotating code, six nucleotides per byte, continuing from the previous nucleotide.
+    
+    A byte takes its spare spelling whenever the first one would push the
+    G/C minus A/T count further from zero, so that count stays within 6 at
+    every byte boundary whatever the data. Each choice depends on the ones
+    before it, so there is no NumPy path and backend is ignored.
+    """
+    encode, _, _ = rotating_tables(nucleotides)
+    state = nucleotides.index(previous) << 8
+    balance = 0
+    pieces = []
+    for byte in data:
+        kmer, state, skew, spare, spare_state, spare_skew = encode[state | byte]
+        if balance * skew > 0:
+            kmer, state, skew = spare, spare_state, spare_skew
+        balance += skew
+        pieces.append(kmer)
+    return "".join(pieces)
+
+def rotating_decode(sequence, nucleotides, previous=ROTATING_START, backend='auto'):
+    """Read bytes back from the rotating code; the sequence must be a multiple of 6 long."""
+    if len(sequence) % 6:
+        raise ValueError("Rotating code sequence is not a whole number of bytes")
+    if _use_numpy(backend, len(sequence) // 6):
+        return _rotating_decode_numpy(sequence, nucleotides, previous)
+    _, decode, _ = rotating_tables(nucleotides)
+    sequence = previous + sequence
+    try:
+        return bytearray([decode[sequence[i:i + 7]] for i in range(0, len(sequence) - 1, 6)])
+    except KeyError:
+        raise ValueError("Invalid nucleotide in DNA sequence")
+
+def _rotating_decode_numpy(sequence, nucleotides, previous):
+    """Recover the base-3 digits from the differences between neighbouring nucleotides."""
+    _, _, remap = rotating_tables(nucleotides)
+    reverse = np.full(256, 255, dtype=np.uint8)
+    for i, n in enumerate(nucleotides):
+        reverse[ord(n)] = i
+    try:
+        raw = (previous + sequence).encode('ascii')
+    except UnicodeEncodeError:
+        raise ValueError("Invalid nucleotide in DNA sequence")
+    
+    values = reverse[np.frombuffer(raw, dtype=np.uint8)]
+    if (values == 255).any():
+        raise ValueError("Invalid nucleotide in DNA sequence")
+    
+    # Same digit rules as the decode table in rotating_tables; uint8 wraparound keeps
+    # the differences right modulo 4
+    digit_of_step = np.array([0, 1, 2, 0], dtype=np.uint8)
+    digits = digit_of_step[(values[1:] - values[:-1] + 3) & 3].reshape(-1, 6).astype(np.uint16)
+    value = digits[:, 0]
+    for column in range(1, 6):
+        value = value * 3 + digits[:, column]
+    
+    # The nucleotide before each byte picks its row of the remap table
+    remap = np.array(remap, dtype=np.uint8)
+    return bytearray(remap[values[:-1:6].astype(np.uint16) * 729 + value].tobytes())
+
+def unpack_code(data, nucleotides, code='binary', previous=ROTATING_START, backend='auto'):
+    """Write bytes in a nucleotide code; previous is the nucleotide before them (used by the rotating code)."""
+    if code == 'rotating':
+        return rotating_encode(data, nucleotides, previous, backend)
+    nucleotides_per_byte(code)
+    return unpack_nucleotides(data, nucleotides, backend)
+
+def pack_code(sequence, nucleotides, code='binary', previous=ROTATING_START, backend='auto'):
+    """Read bytes back from a nucleotide code; previous is the nucleotide before the sequence."""
+    if code == 'rotating':
+        return rotating_decode(sequence, nucleotides, previous, backend)
+    nucleotides_per_byte(code)
+    return pack_nucleotides(sequence, nucleotides, backend)
+
+# Packed .dna files: magic, version, alphabet, nucleotide count, then 4 nucleotides per byte
+PACKED_DNA_MAGIC = b"DNA2"
+PACKED_DNA_VERSION = 1
+PACKED_DNA_HEADER = struct.Struct(">4sB4sQ")
+DNA_CHUNK_SIZE = 1 << 22  # Nucleotides converted per step by the file converters
+
+def pack_dna(dna_sequence, nucleotides):
+    """Pack a nucleotide sequence (start/stop codons included) into the binary .dna format."""
+    header = PACKED_DNA_HEADER.pack(PACKED_DNA_MAGIC, PACKED_DNA_VERSION, "".join(nucleotides).encode('ascii'), len(dna_sequence))
+    return header + bytes(pack_nucleotides(dna_sequence, nucleotides))
+
+def unpack_dna_header(buffer):
+    """Return (alphabet, nucleotide count) of a packed .dna buffer."""
+    if len(buffer) < PACKED_DNA_HEADER.size:
+        raise ValueError("Truncated packed DNA header")
+    magic, version, alphabet, count = PACKED_DNA_HEADER.unpack(buffer[:PACKED_DNA_HEADER.size])
+    if magic != PACKED_DNA_MAGIC:
+        raise ValueError("Not a packed DNA file")
+    if version != PACKED_DNA_VERSION:
+        raise ValueError(f"Unsupported packed DNA version: {version}")
+    if len(buffer) - PACKED_DNA_HEADER.size < (count + 3) // 4:
+        raise ValueError("Truncated packed DNA data")
+    return list(alphabet.decode('ascii')), count
+
+def unpack_dna(buffer, start=0, stop=None):
+    """Unpack nucleotides [start:stop] from a packed .dna buffer (bytes or mmap), touching only the bytes needed."""
+    nucleotides, count = unpack_dna_header(buffer)
+    start, stop, _ = slice(start, stop).indices(count)
+    if start >= stop:
+        return ""
+    
+    # Only the bytes that hold the requested nucleotides are read
+    first = PACKED_DNA_HEADER.size + start // 4
+    last = PACKED_DNA_HEADER.size + (stop + 3) // 4
+    sequence = unpack_nucleotides(buffer[first:last], nucleotides)
+    offset = start % 4
+    return sequence[offset:offset + stop - start]
+
+def is_packed_dna_file(file_path):
+    """Check whether a .dna file is in the packed binary format rather than ASCII text."""
+    with open(file_path, 'rb') as f:
+        return f.read(len(PACKED_DNA_MAGIC)) == PACKED_DNA_MAGIC
+
+def save_dna_sequence(dna_sequence, file_path, nucleotides, packed=False):
+    """Save a DNA sequence as ASCII text or in the packed binary format."""
+    write_dna_stream([dna_sequence], file_path, nucleotides, packed)
+
+def load_dna_sequence(file_path, start=0, stop=None):
+    """Load a DNA sequence (or the slice [start:stop] of it) from a text or packed .dna file."""
+    return "".join(iter_dna_file(file_path, start, stop))
+
+def iter_dna_file(file_path, start=0, stop=None, chunk_size=DNA_CHUNK_SIZE):
+    """Yield the nucleotides [start:stop] of a text or packed .dna file in chunks, reading it through mmap."""
+    if os.path.getsize(file_path) == 0:
+        return
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if mm[:len(PACKED_DNA_MAGIC)] == PACKED_DNA_MAGIC:
+            _, count = unpack_dna_header(mm)
+            start, stop, _ = slice(start, stop).indices(count)
+            for position in range(start, stop, chunk_size):
+                yield unpack_dna(mm, position, min(position + chunk_size, stop))
+            return
+        
+        # Text files: skip surrounding whitespace like str.strip()
+        begin, end = 0, len(mm)
+        while begin < end and mm[begin] in b" \t\r\n\x0b\x0c":
+            begin += 1
+        while end > begin and mm[end - 1] in b" \t\r\n\x0b\x0c":
+            end -= 1
+        start, stop, _ = slice(start, stop).indices(end - begin)
+        for position in range(start, stop, chunk_size):
+            # Non-ASCII bytes become U+FFFD and are rejected as invalid nucleotides later on
+            yield mm[begin + position:begin + min(position + chunk_size, stop)].decode('ascii', errors='replace')
+
+def write_dna_stream(sequence_chunks, file_path, nucleotides, packed=False):
+    """Write nucleotide chunks to a text or packed .dna file as they arrive; returns the nucleotide count."""
+    count = 0
+    if not packed:
+        with open(file_path, 'w') as f:
+            for chunk in sequence_chunks:
+                f.write(chunk)
+                count += len(chunk)
+        return count
+    
+    pending = ""
+    with open(file_path, 'wb') as f:
+        # Header is rewritten once the nucleotide count is known
+        f.write(bytes(PACKED_DNA_HEADER.size))
+        for chunk in sequence_chunks:
+            pending += chunk
+            usable = len(pending) - len(pending) % 4
+            f.write(pack_nucleotides(pending[:usable], nucleotides))
+            count += usable
+            pending = pending[usable:]
+        f.write(pack_nucleotides(pending, nucleotides))
+        count += len(pending)
+        
+        f.seek(0)
+        f.write(PACKED_DNA_HEADER.pack(PACKED_DNA_MAGIC, PACKED_DNA_VERSION, "".join(nucleotides).encode('ascii'), count))
+    return count
+
+def pack_dna_file(text_path, packed_path, nucleotides):
+    """Convert a text .dna file to the packed format in chunks, without loading it whole."""
+    write_dna_stream(iter_dna_file(text_path), packed_path, nucleotides, packed=True)
+
+def unpack_dna_file(packed_path, text_path):
+    """Convert a packed .dna file back to ASCII text in chunks."""
+    write_dna_stream(iter_dna_file(packed_path), text_path, None, packed=False)
+
+def rs_encode(data, ecc_symbols=10, backend='auto'):
+    """Apply Reed-Solomon encoding with error correction (backend: see reed_solomon.get_rs_backend)."""
+    return get_rs_backend(backend).encode(data, ecc_symbols)
+
+def rs_decode(data, ecc_symbols=10, stats=None, backend='auto', erasures=None):
+    """
+    Apply Reed-Solomon decoding with error correction.
+    
+    Every 255-byte codeword is checked first (see
+    reed_solomon.rs_failing_codewords) and only the ones that fail go
+    through the full Berlekamp-Massey/Forney decoder, so clean data costs
+    little more than a copy. A codeword that cannot be corrected keeps its
+    message bytes as received.
+    
+    Bytes known to be lost, such as those of a missing oligo, are passed to
+    the decoder as erasures: a codeword corrects up to ecc_symbols erasures
+    but only half as many errors at unknown positions. If a codeword cannot
+    be corrected with its erasures (e.g. more than ecc_symbols of them, or
+    low-quality bases that were mostly right), it is tried without them.
+    
+    Args:
+        data (bytes): Codewords from rs_encode
+        ecc_symbols (int): Error correction symbols per codeword
+        stats (dict): If given, counts of 'clean', 'corrected' and
+            'uncorrectable' codewords, of 'corrected_symbols' and of the
+            'erasures' among them are added to it
+        backend (str): Reed-Solomon backend, 'auto' for the fastest installed
+        erasures (list): Sorted positions in data of bytes known to be wrong
+        
+    Returns:
+        bytearray: The message without ecc symbols
+    """
+    rs_backend = get_rs_backend(backend)
+    counts = dict.fromkeys(RS_STATS, 0)
+    message_size = 255 - ecc_symbols
+    output = bytearray()
+    clean_start = 0
+    for index in rs_backend.check(data, ecc_symbols):
+        # Copy the clean codewords before this one without their ecc symbols
+        start = index * 255
+        for position in range(clean_start, start, 255):
+            output += data[position:position + message_size]
+        counts['clean'] += (start - clean_start) // 255
+        clean_start = start + 255
+        
+        codeword = bytearray(data[start:start + 255])
+        erase_pos = []
+        if erasures:
+            low = bisect.bisect_left(erasures, start)
+            erase_pos = [position - start for position in erasures[low:bisect.bisect_left(erasures, start + 255, low)]]
+        message = None
+        for attempt in ([erase_pos, None] if erase_pos else [None]):
+            try:
+                message, errata = rs_backend.correct(codeword, ecc_symbols, attempt)
+            except ReedSolomonError:
+                continue
+            counts['corrected'] += 1
+            counts['corrected_symbols'] += len(errata)
+            counts['erasures'] += len(attempt or ())
+            break
+        if message is None:
+            message = codeword[:-ecc_symbols]
+            counts['uncorrectable'] += 1
+        output += message
+    for position in range(clean_start, len(data), 255):
+        # The last codeword may be shorter
+        output += data[position:min(position + 255, len(data)) - ecc_symbols]
+        counts['clean'] += 1
+    
+    if counts['uncorrectable']:
+        print(f"Reed-Solomon decoding error: {counts['uncorrectable']} codewords could not be corrected")
+    if stats is not None:
+        merge_stats(stats, counts)
+    return output
+
+# Codeword counts reported by rs_decode
+RS_STATS = ('clean', 'corrected', 'uncorrectable', 'corrected_symbols', 'erasures')
+
+def merge_stats(stats, counts):
+    """Add every count in counts to stats."""
+    for key, value in counts.items():
+        stats[key] = stats.get(key, 0) + value
+
+# Inputs smaller than this are Reed-Solomon coded on one process
+RS_PARALLEL_MIN_SIZE = 256 * 1024
+
+def parallel_rs_encode(data, ecc_symbols=10, workers=None, backend='auto'):
+    """
+    Reed-Solomon encode on several processes; returns exactly what rs_encode returns.
+    
+    Codewords are independent, so the message is cut into one shard of whole
+    255 - ecc_symbols byte pieces per worker. Input and output live in
+    shared memory: workers read their shard and write their codewords in
+    place, and only names and offsets are sent to them.
+    """
+    workers = workers or default_workers()
+    if workers < 2 or len(data) < RS_PARALLEL_MIN_SIZE:
+        return rs_encode(data, ecc_symbols, backend)
+    
+    message_size = 255 - ecc_symbols
+    shards = split_ranges(len(data), workers, message_size)
+    # Every started piece of the message gains ecc_symbols bytes
+    output_size = len(data) + -(-len(data) // message_size) * ecc_symbols
+    with _shared_buffers(data, output_size) as (source, target):
+        list(get_executor(workers).map(
+            _rs_encode_shard, [source.name] * len(shards), [target.name] * len(shards), shards,
+            [start // message_size * 255 for start, _ in shards], [ecc_symbols] * len(shards),
+            [backend] * len(shards)))
+        return bytearray(target.buf[:output_size])
+
+def parallel_rs_decode(data, ecc_symbols=10, workers=None, stats=None, backend='auto', erasures=None):
+    """
+    Reed-Solomon decode on several processes; returns exactly what rs_decode returns.
+    
+    Works like parallel_rs_encode with shards of whole 255-byte codewords,
+    and adds the codeword counts of all shards to stats.
+    """
+    workers = workers or default_workers()
+    if workers < 2 or len(data) < RS_PARALLEL_MIN_SIZE:
+        return rs_decode(data, ecc_symbols, stats, backend, erasures)
+    
+    message_size = 255 - ecc_symbols
+    shards = split_ranges(len(data), workers, 255)
+    # Erasure positions relative to the start of their shard
+    erasures = erasures or []
+    shard_erasures = [
+        [position - start for position in erasures[bisect.bisect_left(erasures, start):bisect.bisect_left(erasures, stop)]]
+        for start, stop in shards
+    ]
+    # Every codeword, including a shorter last one, loses ecc_symbols bytes
+    output_size = len(data) - -(-len(data) // 255) * ecc_symbols
+    with _shared_buffers(data, output_size) as (source, target):
+        counts = {}
+        for shard_counts in get_executor(workers).map(
+                _rs_decode_shard, [source.name] * len(shards), [target.name] * len(shards), shards,
+                [start // 255 * message_size for start, _ in shards], [ecc_symbols] * len(shards),
+                [backend] * len(shards), shard_erasures):
+            merge_stats(counts, shard_counts)
+        if stats is not None:
+            merge_stats(stats, counts)
+        return bytearray(target.buf[:output_size])
+
+@contextlib.contextmanager
+def _shared_buffers(data, output_size):
+    """Yield (shared memory copy of data, shared output block of output_size bytes), unlinked on exit."""
+    source = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        source.buf[:len(data)] = data
+        target = shared_memory.SharedMemory(create=True, size=output_size)
+        try:
+            yield source, target
+        finally:
+            target.close()
+            target.unlink()
+    finally:
+        source.close()
+        source.unlink()
+
+def _rs_encode_shard(source_name, target_name, shard, output_start, ecc_symbols, backend='auto'):
+    """Encode data[start:stop] of a shared block into another one, in a worker process."""
+    source = shared_memory.SharedMemory(name=source_name)
+    target = shared_memory.SharedMemory(name=target_name)
+    try:
+        start, stop = shard
+        encoded = rs_encode(bytearray(source.buf[start:stop]), ecc_symbols, backend)
+        target.buf[output_start:output_start + len(encoded)] = encoded
+    finally:
+        source.close()
+        target.close()
+
+def _rs_decode_shard(source_name, target_name, shard, output_start, ecc_symbols, backend='auto', erasures=None):
+    """Decode codewords data[start:stop] of a shared block into another one; returns the rs_decode counts."""
+    source = shared_memory.SharedMemory(name=source_name)
+    target = shared_memory.SharedMemory(name=target_name)
+    try:
+        start, stop = shard
+        counts = {}
+        decoded = rs_decode(bytearray(source.buf[start:stop]), ecc_symbols, counts, backend, erasures)
+        target.buf[output_start:output_start + len(decoded)] = decoded
+        return counts
+    finally:
+        source.close()
+        target.close()
+
+# Streaming pipeline: every stage consumes and yields chunks of bounded size,
+# so memory use does not depend on the file size
+
+def iter_read_file(file_path, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the contents of a file in chunks."""
+    with open(file_path, 'rb') as f:
+        yield from iter_blocks(f, chunk_size)
+
+def iter_count(chunks, sizes, key):
+    """Pass chunks through unchanged, adding up their length in sizes[key]."""
+    sizes[key] = 0
+    for chunk in chunks:
+        sizes[key] += len(chunk)
+        yield chunk
+
+def iter_pad(chunks, multiple, sizes, key):
+    """Pass chunks through, then zero bytes up to a multiple of multiple bytes, recording how many in sizes[key]."""
+    length = 0
+    for chunk in chunks:
+        length += len(chunk)
+        yield chunk
+    sizes[key] = -length % multiple
+    if sizes[key]:
+        yield bytes(sizes[key])
+
+def iter_encrypt(chunks, key_iv_tuple):
+    """Encrypt a stream with AES-CBC; the output is identical to encrypt_data on the whole input."""
+    key, iv = key_iv_tuple
+    encryptor = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend()).encryptor()
+    
+    length = 0
+    for chunk in chunks:
+        length += len(chunk)
+        piece = encryptor.update(bytes(chunk))
+        if piece:
+            yield piece
+    
+    # PKCS#7 padding only depends on the total length
+    padding_len = 16 - length % 16
+    yield encryptor.update(bytes([padding_len]) * padding_len) + encryptor.finalize()
+
+def iter_decrypt(chunks, key_iv_tuple, original_length):
+    """Decrypt an AES-CBC stream from iter_encrypt/encrypt_data, stopping after original_length bytes."""
+    key, iv = key_iv_tuple
+    decryptor = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend()).decryptor()
+    
+    # The last block holds the padding, so it is held back until the end
+    remaining = original_length
+    held = b""
+    for chunk in chunks:
+        piece = held + decryptor.update(bytes(chunk))
+        held = piece[-16:]
+        piece = piece[:-16][:remaining]
+        remaining -= len(piece)
+        if piece:
+            yield piece
+    
+    try:
+        last_block = held + decryptor.finalize()
+    except ValueError as e:
+        raise ValueError("DECRYPTION_FAILED") from e
+    if not last_block:
+        raise ValueError("DECRYPTION_FAILED")
+    piece = unpad_data(last_block)[:remaining]
+    if piece:
+        yield piece
+
+# Chunked AES-GCM: the plaintext is cut into GCM_CHUNK_SIZE chunks, each
+# sealed on its own nonce (4 bytes of the derived IV and the chunk index) and
+# followed by its tag, so any chunk can be decrypted without the others. The
+# associated data marks the last chunk, so a stream cut short at a chunk
+# boundary does not authenticate either.
+GCM_CHUNK_SIZE = 64 * 1024
+GCM_TAG_SIZE = 16
+GCM_KEY_CHECK_INDEX = (1 << 64) - 1  # Nonce index of the metadata key check, never reached by a chunk
+CIPHERS = ('aes-gcm', 'aes-cbc')
+
+def _gcm_nonce(iv, index):
+    """Return the 12-byte nonce of chunk index."""
+    return bytes(iv[:4]) + index.to_bytes(8, 'big')
+
+def _gcm_associated_data(index, last):
+    """Return the associated data authenticated with chunk index."""
+    return struct.pack(">QB", index, last)
+
+def gcm_chunk_count(length):
+    """Return the number of chunks length bytes are encrypted in; empty input is one empty chunk."""
+    return max(1, -(-length // GCM_CHUNK_SIZE))
+
+def gcm_encrypted_size(length):
+    """Return the size of length bytes after chunked AES-GCM encryption."""
+    return length + gcm_chunk_count(length) * GCM_TAG_SIZE
+
+def gcm_key_check(key_iv_tuple):
+    """
+    Return the tag stored in the metadata to tell a wrong password from corrupted data.
+    
+    It authenticates no data, on a nonce no chunk uses, so checking it costs
+    one AES operation instead of a separate PBKDF2 password hash.
+    """
+    key, iv = key_iv_tuple
+    return AESGCM(key).encrypt(_gcm_nonce(iv, GCM_KEY_CHECK_INDEX), b"", b"key-check")
+
+def iter_encrypt_gcm(chunks, key_iv_tuple):
+    """Encrypt a stream with AES-GCM, in independent GCM_CHUNK_SIZE chunks each followed by its tag."""
+    key, iv = key_iv_tuple
+    aesgcm = AESGCM(key)
+    index = 0
+    pending = b""
+    for piece in rebatch(chunks, GCM_CHUNK_SIZE):
+        if index or pending:
+            yield aesgcm.encrypt(_gcm_nonce(iv, index), pending, _gcm_associated_data(index, False))
+            index += 1
+        pending = piece
+    # The last chunk is held back until it is known to be the last
+    yield aesgcm.encrypt(_gcm_nonce(iv, index), pending, _gcm_associated_data(index, True))
+
+def _gcm_open(aesgcm, iv, index, sealed, last):
+    """Authenticate and decrypt one chunk."""
+    try:
+        return aesgcm.decrypt(_gcm_nonce(iv, index), bytes(sealed), _gcm_associated_data(index, last))
+    except InvalidTag as e:
+        raise ValueError("DECRYPTION_FAILED") from e
+
+def iter_decrypt_gcm(chunks, key_iv_tuple, original_length):
+    """Decrypt a stream from iter_encrypt_gcm of original_length plaintext bytes, authenticating every chunk."""
+    key, iv = key_iv_tuple
+    aesgcm = AESGCM(key)
+    count = gcm_chunk_count(original_length)
+    index = 0
+    for piece in rebatch(chunks, GCM_CHUNK_SIZE + GCM_TAG_SIZE):
+        if index == count:
+            break
+        size = min(GCM_CHUNK_SIZE, original_length - index * GCM_CHUNK_SIZE) + GCM_TAG_SIZE
+        yield _gcm_open(aesgcm, iv, index, piece[:size], index == count - 1)
+        index += 1
+    if index < count:
+        raise ValueError("DECRYPTION_FAILED")
+
+def iter_rs_encode(chunks, ecc_symbols=10, workers=1, backend='auto', interleave=1, merge_tail=False):
+    """
+    Reed-Solomon encode a stream in whole 255-byte codewords.
+    
+    The output is identical to rs_encode on the whole input, followed by
+    reed_solomon.rs_interleave with depth interleave (and merge_tail).
+    """
+    # RSCodec splits its input into pieces of 255 - ecc_symbols bytes, so any
+    # multiple of that size can be encoded separately; whole interleaved
+    # blocks can be interleaved separately too
+    message_size = 255 - ecc_symbols
+    for piece, _ in _iter_rs_pieces(chunks, message_size, interleave, merge_tail):
+        yield rs_interleave(parallel_rs_encode(piece, ecc_symbols, workers, backend), interleave, merge_tail)
+
+def iter_rs_decode(chunks, ecc_symbols=10, workers=1, stats=None, backend='auto', interleave=1, erasures=None,
+                   merge_tail=False, padding=0):
+    """
+    Reed-Solomon decode a stream from iter_rs_encode, a batch of codewords at a time.
+    
+    Args:
+        chunks (iterable): The encoded stream
+        ecc_symbols (int): Error correction symbols per codeword
+        workers (int): Number of worker processes
+        stats (dict): See rs_decode
+        backend (str): Reed-Solomon backend
+        interleave (int): Interleaving depth the stream was encoded with
+        erasures (list): Sorted, non-overlapping (start, stop) ranges of the
+            stream known to be lost, e.g. from reassemble_oligos
+        merge_tail (bool): Whether the stream was encoded with merge_tail
+        padding (int): Zero bytes added to the message before encoding
+            (see iter_pad), dropped from the end of the output
+    
+    Yields:
+        bytearray: The decoded message
+    """
+    erasures = erasures or []
+    index = 0
+    position = 0
+    for piece, last in _iter_rs_pieces(chunks, 255, interleave, merge_tail):
+        end = position + len(piece)
+        # Erased bytes of this piece, moved to where they are after deinterleaving
+        positions = []
+        while index < len(erasures) and erasures[index][0] < end:
+            start, stop = erasures[index]
+            positions.extend(range(max(start, position) - position, min(stop, end) - position))
+            if stop > end:
+                break
+            index += 1
+        positions = rs_deinterleave_positions(positions, len(piece), interleave, merge_tail)
+        
+        piece = rs_deinterleave(bytearray(piece), interleave, merge_tail)
+        message = parallel_rs_decode(piece, ecc_symbols, workers, stats, backend, positions)
+        yield message[:len(message) - padding] if last and padding else message
+        position = end
+
+def _iter_rs_pieces(chunks, codeword_size, interleave, merge_tail=False):
+    """
+    Yield (piece, whether it is the last) for the pieces of whole interleaved blocks the streaming Reed-Solomon stages handle per step.
+    
+    codeword_size is the bytes per codeword on the side being read: 255, or
+    255 - ecc_symbols for messages. With merge_tail a last piece shorter
+    than a block is joined to the piece before, so that its codewords are
+    interleaved with the last full block.
+    """
+    pending = None
+    for piece in rebatch(chunks, codeword_size * _rs_batch_codewords(interleave)):
+        if pending is None:
+            pending = piece
+        elif merge_tail and len(piece) < codeword_size * interleave:
+            pending = bytes(pending) + bytes(piece)
+        else:
+            yield pending, False
+            pending = piece
+    if pending is not None:
+        yield pending, True
+
+def _rs_batch_codewords(interleave):
+    """Return the codewords handled per step by the streaming Reed-Solomon stages: whole interleaved blocks."""
+    return interleave * max(1, STREAM_CHUNK_SIZE // (255 * interleave))
+
+def ecc_interleave_depth(config):
+    """Return the interleaving depth configured for Reed-Solomon codewords, resolving 'auto'."""
+    depth = config.get('ecc_interleave', 1)
+    if depth == 'auto':
+        # One codeword per payload byte: a lost oligo then erases at most one byte of each codeword
+        if not config.get('oligo_length'):
+            return 1
+        if config.get('fountain'):
+            return fountain_segment_size(config['oligo_length'], config.get('nucleotide_code', 'binary'))
+        return oligo_payload_size(config['oligo_length'], config.get('nucleotide_code', 'binary'))
+    if not isinstance(depth, int) or depth < 1:
+        raise ValueError(f"Invalid Reed-Solomon interleaving depth: {depth}")
+    return depth
+
+def iter_convert_to_nucleotides(chunks, nucleotides, code='binary'):
+    """Stream version of convert_to_nucleotides, in any nucleotide code."""
+    yield "ATG"  # Start codon
+    previous = ROTATING_START
+    for chunk in chunks:
+        piece = unpack_code(chunk, nucleotides, code, previous)
+        if piece:
+            previous = piece[-1]
+        yield piece
+    yield "TAC"  # Stop codon
+
+def iter_nucleotides_to_bytes(sequence_chunks, nucleotides, code='binary'):
+    """Stream version of nucleotides_to_bytes; chunks must be codon-free and whole bytes long (except the last)."""
+    previous = ROTATING_START
+    for chunk in sequence_chunks:
+        yield pack_code(chunk, nucleotides, code, previous)
+        if chunk:
+            previous = chunk[-1]
+
+def code_chunk_size(code, chunk_size=DNA_CHUNK_SIZE):
+    """Round a nucleotide chunk size down to whole bytes of a nucleotide code."""
+    return chunk_size - chunk_size % nucleotides_per_byte(code)
+
+# Oligo pools: the payload is cut into fixed-length strands, each framed by
+# start/stop codons and carrying its index so the pool can come in any order
+OLIGO_ADDRESS = struct.Struct(">I")
+OLIGO_OVERHEAD = 6 + 4 * OLIGO_ADDRESS.size  # Codons plus address nucleotides (binary code)
+OLIGO_BATCH_SIZE = 4096  # Oligos decoded per worker task
+ERASURE_QUALITY = 10  # Payload bytes with a base read below this Phred score are treated as erasures
+
+def oligo_size(payload_size, code='binary'):
+    """Return the length in nucleotides of an oligo carrying payload_size bytes."""
+    return 6 + nucleotides_per_byte(code) * (OLIGO_ADDRESS.size + payload_size)
+
+def oligo_payload_size(oligo_length, code='binary'):
+    """Return the payload bytes carried by an oligo of (at most) oligo_length nucleotides."""
+    payload_size = (oligo_length - 6) // nucleotides_per_byte(code) - OLIGO_ADDRESS.size
+    if payload_size < 1:
+        raise ValueError(f"Oligos must be longer than {oligo_size(1, code) - 1} nucleotides")
+    return payload_size
+
+def iter_fragment_oligos(chunks, nucleotides, oligo_length, code='binary'):
+    """Cut a byte stream into addressed oligos; the last payload is zero-padded so all have the same length."""
+    payload_size = oligo_payload_size(oligo_length, code)
+    for address, payload in enumerate(rebatch(chunks, payload_size)):
+        payload = OLIGO_ADDRESS.pack(address) + payload.ljust(payload_size, b"\0")
+        yield "ATG" + unpack_code(payload, nucleotides, code, backend='python') + "TAC"
+
+def decode_oligo(oligo, nucleotides, payload_size, code='binary'):
+    """Return (address, payload) of one oligo, or None if it is malformed."""
+    if len(oligo) != oligo_size(payload_size, code) or oligo[:3] != "ATG" or oligo[-3:] != "TAC":
+        return None
+    try:
+        data = pack_code(oligo[3:-3], nucleotides, code, backend='python')
+    except ValueError:
+        return None
+    return OLIGO_ADDRESS.unpack_from(data)[0], bytes(data[OLIGO_ADDRESS.size:])
+
+def weak_payload_bytes(quality, payload_size, code='binary'):
+    """Return the sorted payload byte offsets of an oligo read that hold a base below ERASURE_QUALITY."""
+    threshold = chr(ERASURE_QUALITY + QUALITY_OFFSET)
+    if not quality or min(quality) >= threshold:
+        return []
+    width = nucleotides_per_byte(code)
+    offsets = set()
+    for index, char in enumerate(quality):
+        if char < threshold:
+            # The rotating code reads every digit from two bases, so the next byte can suffer too
+            for base in (index, index + 1) if code == 'rotating' else (index,):
+                offset = (base - 3) // width - OLIGO_ADDRESS.size
+                if 0 <= offset < payload_size:
+                    offsets.add(offset)
+    return sorted(offsets)
+
+def _decode_oligo_batch(oligos, nucleotides, payload_size, code='binary'):
+    """Decode a batch of oligos in a worker process."""
+    return [decode_oligo(oligo, nucleotides, payload_size, code) for oligo in oligos]
+
+def write_oligo_pool(oligos, file_path, nucleotides, packed=False):
+    """Write an oligo pool, one oligo per line or packed back to back; returns (oligo count, nucleotide count)."""
+    if packed:
+        # zip() stops at the end of the pool without drawing from the counter again
+        counter = itertools.count()
+        length = write_dna_stream((oligo for oligo, _ in zip(oligos, counter)), file_path, nucleotides, packed=True)
+        return next(counter), length
+    
+    count = 0
+    length = 0
+    with open(file_path, 'w') as f:
+        for oligo in oligos:
+            f.write(oligo + "\n")
+            count += 1
+            length += len(oligo)
+    return count, length
+
+def iter_oligo_file(file_path, oligo_length, code='binary'):
+    """
+    Yield the oligos of a pool file in file order.
+    
+    Packed pools are cut every oligo_length nucleotides. Text pools are read
+    line by line in chunks; since every oligo has the same length, lines
+    holding several oligos back to back are split as well.
+    """
+    # Actual oligo length, oligo_length rounded down to whole payload bytes
+    oligo_length = oligo_size(oligo_payload_size(oligo_length, code), code)
+    if is_packed_dna_file(file_path):
+        yield from iter_dna_file(file_path, chunk_size=oligo_length)
+        return
+    
+    line = ""
+    with open(file_path, 'r', errors='replace') as f:
+        for chunk in iter(lambda: f.read(DNA_CHUNK_SIZE), ""):
+            parts = chunk.split("\n")
+            for part in parts[:-1]:
+                yield from _split_oligo_line(line + part, oligo_length)
+                line = ""
+            
+            # Emit whole oligos of a long line early, keeping one back in case the line ends in whitespace
+            line = (line + parts[-1]).lstrip()
+            usable = len(line) - len(line) % oligo_length - oligo_length
+            if usable > 0:
+                yield from _split_oligo_line(line[:usable], oligo_length)
+                line = line[usable:]
+    yield from _split_oligo_line(line, oligo_length)
+
+def _split_oligo_line(line, oligo_length):
+    """Split one line of a text pool into oligos."""
+    line = line.strip()
+    for start in range(0, len(line), oligo_length):
+        yield line[start:start + oligo_length]
+
+def _iter_decoded_oligos(oligos, decode_batch, args, workers=1):
+    """
+    Yield (quality, decode result) for every oligo of a pool, in order.
+    
+    Oligos (strings, or (oligo, quality) pairs) are decoded in batches by
+    decode_batch(batch, *args), concurrently on the shared process pool when
+    workers > 1. Only a few batches per worker are read ahead, so the pool is
+    never loaded whole and a consumer can stop early.
+    """
+    entries = ((oligo, 0.0) if isinstance(oligo, str) else oligo for oligo in oligos)
+    batches = iter(lambda: list(itertools.islice(entries, OLIGO_BATCH_SIZE)), [])
+    while True:
+        window = list(itertools.islice(batches, max(workers, 1) * 4))
+        if not window:
+            break
+        sequences = [[oligo for oligo, _ in batch] for batch in window]
+        if workers > 1:
+            results = get_executor(workers).map(decode_batch, sequences, *[[arg] * len(window) for arg in args])
+        else:
+            results = (decode_batch(batch, *args) for batch in sequences)
+        
+        for batch, decoded in zip(window, results):
+            for (_, quality), entry in zip(batch, decoded):
+                yield quality, entry
+
+def reassemble_oligos(oligos, nucleotides, oligo_length, payload_length, output_file, workers=1, code='binary',
+                      erasures=None):
+    """
+    Write the payload carried by an oligo pool, in any order, to a binary file.
+    
+    Oligos are decoded in batches, concurrently on the shared process pool
+    when workers > 1, and every payload is written at the position given by
+    its address. Malformed oligos are skipped, and missing oligos leave zero
+    bytes behind. Of several copies of an address the one with the best
+    read quality wins, or the first one when there are no qualities.
+    
+    Args:
+        oligos (iterable): Oligo strings, e.g. from iter_oligo_file, or
+            (oligo, quality) pairs for sequencing reads, where quality is a
+            mean Phred score or a FASTQ quality string
+        nucleotides (list): Nucleotide alphabet
+        oligo_length (int): Oligo length the pool was created with
+        payload_length (int): Payload bytes the pool carries
+        output_file: Binary file object opened for writing and seeking
+        workers (int): Number of worker processes
+        code (str): Nucleotide code the pool was written in
+        erasures (list): If given, the sorted (start, stop) ranges of the
+            payload known to be lost are appended to it: those of missing
+            oligos, and single bytes holding a base read below
+            ERASURE_QUALITY (see iter_rs_decode)
+        
+    Returns:
+        dict: Counts of 'oligos' read, 'invalid' and 'duplicate' ones,
+            'missing' addresses and 'weak' payload bytes of the copies used
+    """
+    payload_size = oligo_payload_size(oligo_length, code)
+    count = -(-payload_length // payload_size)
+    best_quality = array.array('f', [-1.0]) * count  # -1 marks addresses not seen yet
+    weak = {}  # Address -> weak payload byte offsets of the copy used
+    stats = {'oligos': 0, 'invalid': 0, 'duplicate': 0, 'missing': 0, 'weak': 0}
+    
+    output_file.truncate(payload_length)
+    for quality, entry in _iter_decoded_oligos(oligos, _decode_oligo_batch, (nucleotides, payload_size, code), workers):
+        stats['oligos'] += 1
+        if entry is None or entry[0] >= count:
+            stats['invalid'] += 1
+            continue
+        address, payload = entry
+        offsets = None
+        if isinstance(quality, str):
+            offsets = weak_payload_bytes(quality, payload_size, code)
+            quality = mean_quality(quality)
+        if best_quality[address] >= 0:
+            stats['duplicate'] += 1
+            if quality <= best_quality[address]:
+                continue
+        best_quality[address] = quality
+        if offsets:
+            weak[address] = offsets
+        else:
+            weak.pop(address, None)
+        output_file.seek(address * payload_size)
+        output_file.write(payload[:payload_length - address * payload_size])
+    
+    stats['missing'] = sum(1 for quality in best_quality if quality < 0)
+    stats['weak'] = sum(len(offsets) for offsets in weak.values())
+    if erasures is not None:
+        for address, quality in enumerate(best_quality):
+            start = address * payload_size
+            if quality < 0:
+                erasures.append((start, min(start + payload_size, payload_length)))
+            else:
+                erasures.extend((start + offset, start + offset + 1)
+                                for offset in weak.get(address, ()) if start + offset < payload_length)
+    output_file.seek(0)
+    return stats
+
+# DNA Fountain pools: droplets of the payload (see fountain.py) instead of
+# addressed pieces, framed like oligos with the droplet seed in place of the
+# address and followed by a few Reed-Solomon symbols to reject misread strands
+FOUNTAIN_ECC_SYMBOLS = 2
+FOUNTAIN_EXTRA_DROPLETS = 10  # Made beyond the redundancy, so that small pools decode too
+
+def fountain_segment_size(oligo_length, code='binary'):
+    """Return the payload bytes XORed into each droplet of a pool of oligo_length nucleotide strands."""
+    segment_size = oligo_payload_size(oligo_length, code) - FOUNTAIN_ECC_SYMBOLS
+    if segment_size < 1:
+        raise ValueError(f"Droplets must be longer than {oligo_size(FOUNTAIN_ECC_SYMBOLS, code)} nucleotides")
+    return segment_size
+
+def iter_fountain_oligos(data, nucleotides, oligo_length, redundancy=0.3, code='binary'):
+    """
+    Turn a payload into DNA Fountain droplet strands.
+    
+    Droplets are made for consecutive seeds, and only those whose strand
+    passes fountain.screen_strand (no long homopolymers, balanced GC
+    content) are kept, until segments * (1 + redundancy) +
+    FOUNTAIN_EXTRA_DROPLETS strands have been yielded.
+    """
+    segment_size = fountain_segment_size(oligo_length, code)
+    wanted = ceil(max(1, -(-len(data) // segment_size)) * (1 + redundancy)) + FOUNTAIN_EXTRA_DROPLETS
+    rs_backend = get_rs_backend()
+    for seed, droplet in iter_droplets(data, segment_size):
+        body = rs_backend.encode(OLIGO_ADDRESS.pack(seed) + droplet, FOUNTAIN_ECC_SYMBOLS)
+        strand = "ATG" + unpack_code(body, nucleotides, code, backend='python') + "TAC"
+        if screen_strand(strand):
+            yield strand
+            wanted -= 1
+            if not wanted:
+                return
+
+def decode_droplet(oligo, nucleotides, segment_size, code='binary'):
+    """Return (seed, droplet) of one droplet strand, or None if it is malformed or fails its Reed-Solomon check."""
+    decoded = decode_oligo(oligo, nucleotides, segment_size + FOUNTAIN_ECC_SYMBOLS, code)
+    if decoded is None:
+        return None
+    # Only checked, never corrected: a miscorrected droplet would spoil every segment peeled from it
+    seed, payload = decoded
+    if get_rs_backend().check(OLIGO_ADDRESS.pack(seed) + payload, FOUNTAIN_ECC_SYMBOLS):
+        return None
+    return seed, payload[:-FOUNTAIN_ECC_SYMBOLS]
+
+def _decode_droplet_batch(oligos, nucleotides, segment_size, code='binary'):
+    """Decode a batch of droplet strands in a worker process."""
+    return [decode_droplet(oligo, nucleotides, segment_size, code) for oligo in oligos]
 
-def rs_encode(data, ecc_symbols=10):
-    """Apply Reed-Solomon encoding with error correction."""
-    rsc = RSCodec(ecc_symbols)
-    return rsc.encode(data)
+def reassemble_droplets(oligos, nucleotides, oligo_length, payload_length, output_file, workers=1, code='binary',
+                        erasures=None):
+    """
+    Write the payload carried by a DNA Fountain pool to a binary file.
+    
+    Takes the same arguments and returns the same statistics as
+    reassemble_oligos, with 'missing' counting payload segments that could
+    not be recovered. Droplets are fed to a peeling decoder as they are
+    read, and reading stops as soon as every segment is known; if the pool
+    runs out first, the rest is solved by Gaussian elimination.
+    """
+    segment_size = fountain_segment_size(oligo_length, code)
+    decoder = FountainDecoder(max(1, -(-payload_length // segment_size)), segment_size)
+    stats = {'oligos': 0, 'invalid': 0, 'duplicate': 0, 'missing': 0, 'weak': 0}
+    
+    for _, entry in _iter_decoded_oligos(oligos, _decode_droplet_batch, (nucleotides, segment_size, code), workers):
+        stats['oligos'] += 1
+        if entry is None:
+            stats['invalid'] += 1
+        elif not decoder.add(*entry):
+            stats['duplicate'] += 1
+        elif decoder.complete:
+            break
+    if not decoder.complete:
+        decoder.solve()
+    
+    output_file.truncate(payload_length)
+    for segment in decoder.iter_data(payload_length):
+        output_file.write(segment)
+    missing = decoder.missing()
+    stats['missing'] = len(missing)
+    if erasures is not None:
+        erasures.extend((index * segment_size, min((index + 1) * segment_size, payload_length)) for index in missing)
+    output_file.seek(0)
+    return stats
 
-def rs_decode(data, ecc_symbols=10):
-    """Apply Reed-Solomon decoding with error correction."""
-    rsc = RSCodec(ecc_symbols)
+def write_sequence_records(records, file_path, sequence_format):
+    """Write (name, sequence) records as 'fasta' or 'fastq'; returns (record count, nucleotide count)."""
+    if sequence_format == 'fasta':
+        return write_fasta(records, file_path)
+    if sequence_format == 'fastq':
+        return write_fastq(((name, sequence, None) for name, sequence in records), file_path)
+    raise ValueError(f"Unknown sequence format: {sequence_format}")
+
+def iter_strip_codons(sequence_chunks, chunk_size=DNA_CHUNK_SIZE):
+    """Drop the start/stop codons from a stream of nucleotide chunks, re-cut into chunk_size pieces."""
+    pending = ""
+    skip = 3
+    for chunk in sequence_chunks:
+        pending += chunk
+        if skip:
+            cut = min(skip, len(pending))
+            pending = pending[cut:]
+            skip -= cut
+        # Hold back the stop codon until the end
+        while len(pending) >= chunk_size + 3:
+            yield pending[:chunk_size]
+            pending = pending[chunk_size:]
+    if len(pending) > 3:
+        yield pending[:-3]
+
+def encode_file(input_path, dna_path, config, password=None):
+    """
+    Encode a file to a .dna file through the streaming pipeline.
+    
+    Read, compression, encryption, error correction and nucleotide mapping
+    each work on bounded chunks and the DNA is written as it is produced.
+    
+    Returns:
+        dict: Metadata needed to decode the .dna file
+    """
+    nucleotides, _ = initialize_nucleotides()
+    code = config.get('nucleotide_code', 'binary')
+    nucleotides_per_byte(code)  # Fail on an unknown code before any work is done
+    cipher = config.get('cipher', 'aes-cbc')
+    if config['use_encryption'] and cipher not in CIPHERS:
+        raise ValueError(f"Unknown cipher: {cipher}")
+    if config.get('fountain') and not config.get('oligo_length'):
+        raise ValueError("DNA Fountain droplets need an oligo_length")
+    sizes = {}
+    chunks = iter_count(iter_read_file(input_path), sizes, 'original_size')
+    
+    # Step 1: Compression (optional)
+    codec = None
+    info = None
+    block_index = [] if config.get('random_access') else None
+    if config['use_compression']:
+        codec, info, chunks = iter_compress_data(
+            chunks, config.get('compression_codec', 'huffman'), config.get('compression_workers', 1), block_index)
+    chunks = iter_count(chunks, sizes, 'processed_size')
+    
+    # Step 2: Encryption (optional)
+    encryption_salt = None
+    password_hash = None
+    verification_salt = None
+    key_check = None
+    if config['use_encryption']:
+        key, iv, encryption_salt = derive_key_iv_from_password(password)
+        if cipher == 'aes-gcm':
+            # The chunk tags detect corruption and the key check a wrong password
+            key_check = gcm_key_check((key, iv))
+            chunks = iter_encrypt_gcm(chunks, (key, iv))
+        else:
+            password_hash, verification_salt = generate_password_hash(password, encryption_salt)
+            chunks = iter_encrypt(chunks, (key, iv))
+    
+    # Step 3: Error correction (optional)
+    interleave = 1
+    if config['use_error_correction']:
+        interleave = ecc_interleave_depth(config)
+        if interleave > 1:
+            # Whole codewords only, so a lost oligo at the end of the pool costs no codeword more than the others
+            chunks = iter_pad(chunks, 255 - config['ecc_symbols'], sizes, 'ecc_padding')
+        chunks = iter_rs_encode(
+            chunks, config['ecc_symbols'], config.get('ecc_workers', 1), config.get('rs_backend', 'auto'), interleave,
+            merge_tail=True)
+    
+    # Convert to DNA and write it out, as one strand or as a pool of addressed oligos,
+    # in a .dna file or as FASTA/FASTQ records
+    sequence_format = config.get('sequence_format')
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    oligo_info = {}
+    if config.get('oligo_length'):
+        chunks = iter_count(chunks, oligo_info, 'payload_size')
+        if config.get('fountain'):
+            # Every droplet can mix segments from anywhere in the payload, so it is collected first
+            oligos = iter_fountain_oligos(
+                b"".join(chunks), nucleotides, config['oligo_length'], config.get('fountain_redundancy', 0.3), code)
+        else:
+            oligos = iter_fragment_oligos(chunks, nucleotides, config['oligo_length'], code)
+        if sequence_format:
+            records = ((f"{name}_{address}", oligo) for address, oligo in enumerate(oligos))
+            oligo_info['oligo_count'], dna_sequence_length = write_sequence_records(records, dna_path, sequence_format)
+        else:
+            oligo_info['oligo_count'], dna_sequence_length = write_oligo_pool(
+                oligos, dna_path, nucleotides, config.get('packed_dna', False))
+    else:
+        sequence = iter_convert_to_nucleotides(chunks, nucleotides, code)
+        if sequence_format:
+            _, dna_sequence_length = write_sequence_records([(name, sequence)], dna_path, sequence_format)
+        else:
+            dna_sequence_length = write_dna_stream(sequence, dna_path, nucleotides, config.get('packed_dna', False))
+    
+    return {
+        'config': config,
+        'original_file_name': os.path.basename(input_path),
+        'original_size': sizes['original_size'],
+        'processed_size': sizes['processed_size'],
+        'encryption_salt': base64.b64encode(encryption_salt).decode('utf-8') if encryption_salt else None,
+        'password_hash': base64.b64encode(password_hash).decode('utf-8') if password_hash else None,
+        'verification_salt': base64.b64encode(verification_salt).decode('utf-8') if verification_salt else None,
+        'key_check': base64.b64encode(key_check).decode('utf-8') if key_check else None,
+        'compression_codec': codec,
+        'huffman_info': serialize_huffman_info(info),
+        'dna_sequence_length': dna_sequence_length,
+        'block_index': block_index or None,
+        'ecc_interleave': interleave,
+        'ecc_padding': sizes.get('ecc_padding', 0) if config['use_error_correction'] else None,
+        **oligo_info
+    }
+
+def derive_decryption_key(metadata, password):
+    """Verify the password against the metadata and return the (key, iv) it encrypted with."""
+    if not metadata.get('encryption_salt'):
+        raise ValueError("Encryption salt not found in metadata")
+    encryption_salt = base64.b64decode(metadata['encryption_salt'])
+    if metadata['config'].get('cipher', 'aes-cbc') == 'aes-gcm':
+        key, iv, _ = derive_key_iv_from_password(password, encryption_salt)
+        if not hmac.compare_digest(gcm_key_check((key, iv)), base64.b64decode(metadata.get('key_check') or "")):
+            raise ValueError("PASSWORD_INCORRECT")
+        return key, iv
+    if metadata.get('password_hash') and metadata.get('verification_salt'):
+        password_hash = base64.b64decode(metadata['password_hash'])
+        verification_salt = base64.b64decode(metadata['verification_salt'])
+        if not verify_password(password, password_hash, verification_salt):
+            raise ValueError("PASSWORD_INCORRECT")
+    key, iv, _ = derive_key_iv_from_password(password, encryption_salt)
+    return key, iv
+
+def decode_file(dna_path, metadata, output_path, password=None):
+    """
+    Decode a text or packed .dna file through the streaming pipeline, writing the output as it is produced.
+    
+    Returns:
+        dict: 'oligos', the statistics from reassemble_oligos for oligo pools,
+            and 'ecc', the codeword counts from rs_decode when error
+            correction is on; either is None otherwise
+    
+    Raises:
+        ValueError: "PASSWORD_INCORRECT" or "DECRYPTION_FAILED" for encrypted
+            files, or a description of what is missing from the metadata
+    """
+    nucleotides, _ = initialize_nucleotides()
+    config = metadata['config']
+    # Metadata written before nucleotide codes were selectable always used the binary code
+    code = config.get('nucleotide_code', 'binary')
+    
+    # Check the password before any work is done
+    if config['use_encryption']:
+        key, iv = derive_decryption_key(metadata, password)
+    
+    oligo_stats = None
+    ecc_stats = None
+    payload_file = None
+    erasures = []  # Lost byte ranges of the Reed-Solomon stream, known for oligo pools
     try:
-        return rsc.decode(data)[0]  # [0] to get the decoded data without ecc symbols
-    except ReedSolomonError as e:
-        print(f"Reed-Solomon decoding error: {e}")
-        return data  # Return original data if decoding fails
+        sequence_format = detect_format(dna_path)
+        if config.get('oligo_length'):
+            if sequence_format == 'fastq':
+                # Read qualities decide between copies of the same oligo and mark weak bases as erasures
+                oligos = ((sequence, quality) for _, sequence, quality in iter_fastq(dna_path))
+            elif sequence_format == 'fasta':
+                oligos = (sequence for _, sequence in iter_fasta(dna_path))
+            else:
+                oligos = iter_oligo_file(dna_path, config['oligo_length'], code)
+            
+            # Put the pool back in order in a temporary file, then stream it
+            payload_file = tempfile.TemporaryFile()
+            reassemble = reassemble_droplets if config.get('fountain') else reassemble_oligos
+            oligo_stats = reassemble(
+                oligos, nucleotides, config['oligo_length'], metadata['payload_size'], payload_file,
+                config.get('oligo_workers', 1), code, erasures)
+            chunks = iter_blocks(payload_file, STREAM_CHUNK_SIZE)
+        elif sequence_format:
+            sequence = iter_strip_codons(iter_sequence(dna_path), code_chunk_size(code))
+            chunks = iter_nucleotides_to_bytes(sequence, nucleotides, code)
+        else:
+            # Skip start/stop codons
+            sequence = iter_dna_file(dna_path, 3, -3, code_chunk_size(code))
+            chunks = iter_nucleotides_to_bytes(sequence, nucleotides, code)
+        
+        # Step 1: Error correction (optional) - reverse
+        if config['use_error_correction']:
+            ecc_stats = dict.fromkeys(RS_STATS, 0)
+            # All backends decode the same bytes; one that is not installed here is replaced
+            rs_backend = config.get('rs_backend', 'auto')
+            if rs_backend not in RS_BACKENDS:
+                rs_backend = 'auto'
+            # Metadata written before the last block was merged has no ecc_padding
+            chunks = iter_rs_decode(
+                chunks, config['ecc_symbols'], config.get('ecc_workers', 1), ecc_stats, rs_backend,
+                metadata.get('ecc_interleave', 1), erasures, metadata.get('ecc_padding') is not None,
+                metadata.get('ecc_padding') or 0)
+        
+        # Step 2: Decryption (optional) - reverse
+        if config['use_encryption']:
+            # Metadata written before the cipher was selectable always used AES-CBC
+            if config.get('cipher', 'aes-cbc') == 'aes-gcm':
+                chunks = iter_decrypt_gcm(chunks, (key, iv), metadata['processed_size'])
+            else:
+                chunks = iter_decrypt(chunks, (key, iv), metadata['processed_size'])
+        
+        # Step 3: Decompression (optional) - reverse
+        if config['use_compression']:
+            # Metadata written before codecs were selectable always used Huffman
+            codec = metadata.get('compression_codec') or 'huffman'
+            huffman_info = deserialize_huffman_info(metadata['huffman_info'])
+            chunks = iter_decompress_data(chunks, codec, huffman_info, config.get('compression_workers', 1))
+        
+        try:
+            with open(output_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        except Exception:
+            # Do not leave a partially decoded file behind
+            os.remove(output_path)
+            raise
+    finally:
+        if payload_file is not None:
+            payload_file.close()
+    return {'oligos': oligo_stats, 'ecc': ecc_stats}
+
+def decode_range(dna_path, metadata, start, stop, password=None):
+    """
+    Decode only bytes [start, stop) of the original file.
+    
+    Every layer is read from the middle: the DNA is sliced through mmap,
+    only the Reed-Solomon codewords covering the range are corrected, only
+    the AES-GCM chunks covering it are decrypted (AES-CBC from the block
+    before the range), and Huffman
+    streams decode only the blocks listed in the metadata block index.
+    Files encoded without random_access (or with a codec that is not
+    seekable, or oligo pools that are not in address order) are decoded in
+    full through decode_file and sliced.
+    
+    Returns:
+        bytes: The requested range of the original file
+    
+    Raises:
+        ValueError: As for decode_file
+    """
+    config = metadata['config']
+    start, stop, _ = slice(start, stop).indices(metadata['original_size'])
+    if start >= stop:
+        return b""
+    
+    key_iv = derive_decryption_key(metadata, password) if config['use_encryption'] else None
+    codec = metadata.get('compression_codec') or 'huffman'
+    if not config['use_compression'] or codec == 'store' or metadata.get('block_index'):
+        try:
+            return _decode_range_seekable(dna_path, metadata, start, stop, key_iv)
+        except ValueError as e:
+            if str(e) != "RANDOM_ACCESS_UNAVAILABLE":
+                raise
+    
+    # Decode everything and keep the range
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, "decoded")
+        decode_file(dna_path, metadata, output_path, password)
+        with open(output_path, 'rb') as f:
+            f.seek(start)
+            return f.read(stop - start)
+
+def _decode_range_seekable(dna_path, metadata, start, stop, key_iv):
+    """Random access path of decode_range, reading each layer through read(offset, length) functions."""
+    config = metadata['config']
+    nucleotides, _ = initialize_nucleotides()
+    if detect_format(dna_path) or config.get('fountain'):
+        # FASTA/FASTQ line layout is not known in advance, and droplets mix the whole payload
+        raise ValueError("RANDOM_ACCESS_UNAVAILABLE")
+    
+    read = _dna_reader(dna_path, metadata, nucleotides)
+    if config['use_error_correction']:
+        if config.get('oligo_length'):
+            size = metadata['payload_size']
+        else:
+            size = (metadata['dna_sequence_length'] - 6) // nucleotides_per_byte(config.get('nucleotide_code', 'binary'))
+        read = _rs_reader(
+            read, config['ecc_symbols'], metadata.get('ecc_interleave', 1), size, metadata.get('ecc_padding') is not None)
+    if config['use_encryption']:
+        if config.get('cipher', 'aes-cbc') == 'aes-gcm':
+            read = _gcm_reader(read, key_iv, metadata['processed_size'])
+        else:
+            read = _cbc_reader(read, key_iv)
+    
+    if not config['use_compression']:
+        return read(start, stop - start)
+    return decompress_range(read, metadata.get('compression_codec') or 'huffman', metadata.get('block_index'), start, stop)
+
+def _dna_reader(dna_path, metadata, nucleotides):
+    """Return read(offset, length) over the bytes stored in a .dna file, decoding only the nucleotides needed."""
+    oligo_length = metadata['config'].get('oligo_length')
+    code = metadata['config'].get('nucleotide_code', 'binary')
+    if not oligo_length:
+        width = nucleotides_per_byte(code)
+        
+        def read(offset, length):
+            # Byte i is stored in nucleotides 3 + wi .. 3 + wi + w, after the start codon;
+            # the nucleotide before it is read too, as the rotating code depends on it
+            sequence = load_dna_sequence(dna_path, 2 + width * offset, 3 + width * (offset + length))
+            return bytes(pack_code(sequence[1:], nucleotides, code, sequence[0]))
+        return read
+    
+    payload_size = oligo_payload_size(oligo_length, code)
+    actual_length = oligo_size(payload_size, code)
+    # Pools are written in address order: back to back when packed, one per line otherwise
+    stride = actual_length if is_packed_dna_file(dna_path) else actual_length + 1
+    
+    def read(offset, length):
+        length = min(length, metadata['payload_size'] - offset)
+        if length <= 0:
+            return b""
+        first = offset // payload_size
+        last = (offset + length - 1) // payload_size
+        region = load_dna_sequence(dna_path, first * stride, (last + 1) * stride)
+        payloads = []
+        for address in range(first, last + 1):
+            position = (address - first) * stride
+            decoded = decode_oligo(region[position:position + actual_length], nucleotides, payload_size, code)
+            if decoded is None or decoded[0] != address:
+                raise ValueError("RANDOM_ACCESS_UNAVAILABLE")
+            payloads.append(decoded[1])
+        skip = offset - first * payload_size
+        return b"".join(payloads)[skip:skip + length]
+    return read
+
+def _rs_reader(read, ecc_symbols, interleave=1, size=None, merge_tail=False):
+    """Wrap a reader of size Reed-Solomon encoded bytes into a reader of the corrected message."""
+    message_size = 255 - ecc_symbols
+    
+    def rs_read(offset, length):
+        # Interleaved codewords are read a whole block at a time
+        if size is None:
+            first = offset // message_size // interleave * interleave
+            last = ((offset + length - 1) // message_size // interleave + 1) * interleave
+            stop = last * 255
+        else:
+            first, _ = rs_interleave_block(offset // message_size, size, interleave, merge_tail)
+            last, count = rs_interleave_block((offset + length - 1) // message_size, size, interleave, merge_tail)
+            stop = min((last + count) * 255, size)
+        codewords = rs_deinterleave(bytearray(read(first * 255, stop - first * 255)), interleave, merge_tail)
+        message = rs_decode(codewords, ecc_symbols)
+        skip = offset - first * message_size
+        return bytes(message[skip:skip + length])
+    return rs_read
+
+def _cbc_reader(read, key_iv_tuple):
+    """Wrap a reader of AES-CBC ciphertext into a reader of plaintext; each block only needs the one before it."""
+    key, iv = key_iv_tuple
+    
+    def cbc_read(offset, length):
+        first = offset // 16
+        last = (offset + length - 1) // 16
+        if first == 0:
+            previous = iv
+            ciphertext = read(0, (last + 1) * 16)
+        else:
+            ciphertext = read((first - 1) * 16, (last - first + 2) * 16)
+            previous, ciphertext = ciphertext[:16], ciphertext[16:]
+        decryptor = Cipher(algorithms.AES(key), modes.CBC(previous), backend=default_backend()).decryptor()
+        try:
+            plaintext = decryptor.update(ciphertext) + decryptor.finalize()
+        except ValueError as e:
+            raise ValueError("DECRYPTION_FAILED") from e
+        skip = offset - first * 16
+        return plaintext[skip:skip + length]
+    return cbc_read
+
+def _gcm_reader(read, key_iv_tuple, original_length):
+    """Wrap a reader of chunked AES-GCM ciphertext into a reader of plaintext, authenticating only the chunks read."""
+    key, iv = key_iv_tuple
+    aesgcm = AESGCM(key)
+    count = gcm_chunk_count(original_length)
+    sealed_size = GCM_CHUNK_SIZE + GCM_TAG_SIZE
+    
+    def gcm_read(offset, length):
+        first = offset // GCM_CHUNK_SIZE
+        last = min((offset + length - 1) // GCM_CHUNK_SIZE, count - 1)
+        stop = min((last + 1) * sealed_size, gcm_encrypted_size(original_length))
+        ciphertext = read(first * sealed_size, stop - first * sealed_size)
+        plaintext = b"".join(
+            _gcm_open(aesgcm, iv, index, ciphertext[(index - first) * sealed_size:(index - first + 1) * sealed_size],
+                      index == count - 1)
+            for index in range(first, last + 1))
+        skip = offset - first * GCM_CHUNK_SIZE
+        return plaintext[skip:skip + length]
+    return gcm_read
+
+def encode_data(data, config, password=None):
+    """
+    Encode bytes held in memory, such as a short text, to a DNA sequence.
+    
+    Runs compression, encryption and error correction on the whole input
+    at once; use encode_file for anything large.
+    
+    Returns:
+        tuple: (DNA sequence, metadata needed to decode it)
+    """
+    nucleotides, _ = initialize_nucleotides()
+    cipher = config.get('cipher', 'aes-cbc')
+    if config['use_encryption'] and cipher not in CIPHERS:
+        raise ValueError(f"Unknown cipher: {cipher}")
+    processed_data = data
+    original_encoded_length = len(data)
+    info = None
+    codec = None
+    
+    # Step 1: Compression (optional)
+    if config['use_compression']:
+        processed_data, codec, info = compress_data(processed_data, config.get('compression_codec', 'huffman'))
+        original_encoded_length = len(processed_data)
+    
+    # Step 2: Encryption (optional)
+    encryption_salt = None
+    password_hash = None
+    verification_salt = None
+    key_check = None
+    if config['use_encryption']:
+        key, iv, encryption_salt = derive_key_iv_from_password(password)
+        if cipher == 'aes-gcm':
+            key_check = gcm_key_check((key, iv))
+            processed_data = b"".join(iter_encrypt_gcm([processed_data], (key, iv)))
+        else:
+            password_hash, verification_salt = generate_password_hash(password, encryption_salt)
+            processed_data = encrypt_data(processed_data, (key, iv))
+    
+    # Step 3: Error correction (optional)
+    if config['use_error_correction']:
+        processed_data = rs_encode(bytes(processed_data), config['ecc_symbols'])
+    
+    # Convert to DNA sequence
+    dna_sequence = convert_to_nucleotides(processed_data, nucleotides)
+    
+    # The metadata includes the encryption salt but not the password
+    metadata = {
+        'config': config,
+        'original_size': len(data),
+        'processed_size': original_encoded_length,
+        'encryption_salt': base64.b64encode(encryption_salt).decode('utf-8') if encryption_salt else None,
+        'password_hash': base64.b64encode(password_hash).decode('utf-8') if password_hash else None,
+        'verification_salt': base64.b64encode(verification_salt).decode('utf-8') if verification_salt else None,
+        'key_check': base64.b64encode(key_check).decode('utf-8') if key_check else None,
+        'compression_codec': codec,
+        'huffman_info': serialize_huffman_info(info),
+        'dna_sequence_length': len(dna_sequence)
+    }
+    return dna_sequence, metadata
+
+def decode_data(dna_sequence, metadata, password=None):
+    """
+    Decode a DNA sequence produced by encode_data back to bytes.
+    
+    Raises:
+        ValueError: "PASSWORD_INCORRECT" or "DECRYPTION_FAILED" for encrypted
+            data, or a description of what is missing from the metadata
+    """
+    _, inverse_nucleotides = initialize_nucleotides()
+    config = metadata['config']
+    original_encoded_length = metadata['processed_size']
+    
+    # Verify the password before anything else is decoded
+    key_iv_tuple = None
+    if config['use_encryption']:
+        key_iv_tuple = derive_decryption_key(metadata, password)
+    
+    retrieved_data = nucleotides_to_bytes(dna_sequence, inverse_nucleotides)
+    
+    # Step 1: Error correction (optional) - reverse
+    if config['use_error_correction']:
+        retrieved_data = rs_decode(retrieved_data, config['ecc_symbols'])
+    
+    # Step 2: Decryption (optional) - reverse
+    if config['use_encryption']:
+        try:
+            # Metadata written before the cipher was selectable always used AES-CBC
+            if config.get('cipher', 'aes-cbc') == 'aes-gcm':
+                retrieved_data = b"".join(iter_decrypt_gcm([retrieved_data], key_iv_tuple, original_encoded_length))
+            else:
+                retrieved_data = decrypt_data(retrieved_data, key_iv_tuple, original_encoded_length)
+        except Exception as e:
+            raise ValueError("DECRYPTION_FAILED") from e
+        retrieved_data = retrieved_data[:original_encoded_length]
+    
+    # Step 3: Decompression (optional) - reverse
+    if config['use_compression']:
+        # Metadata written before codecs were selectable always used Huffman
+        codec = metadata.get('compression_codec') or 'huffman'
+        retrieved_data = decompress_data(bytes(retrieved_data), codec, deserialize_huffman_info(metadata['huffman_info']))
+    return bytes(retrieved_data)
 
 def save_metadata(metadata, file_path):
     """Save metadata to a file."""
@@ -244,13 +1847,23 @@ def serialize_huffman_info(info):
     """Serialize Huffman encoding information for storage in metadata."""
     if info is None:
         return None
-    return base64.b64encode(pickle.dumps(info)).decode('utf-8')
+    
+    # Canonical codes only need their lengths, stored in a small binary header
+    header = pack_huffman_header(info)
+    if header is None:
+        header = pickle.dumps(info)
+    return base64.b64encode(header).decode('utf-8')
 
 def deserialize_huffman_info(serialized_info):
     """Deserialize Huffman encoding information from metadata."""
     if serialized_info is None:
         return None
-    return pickle.loads(base64.b64decode(serialized_info.encode('utf-8')))
+    header = base64.b64decode(serialized_info.encode('utf-8'))
+    if header.startswith(HEADER_MAGIC):
+        return unpack_huffman_header(header)
+    
+    # For backward compatibility with metadata that stored the pickled code dict
+    return load_pickled_header(io.BytesIO(header))
 
 # Add a compatibility wrapper for code that might still expect the old generate_key function
 def generate_key(data_length=None):
@@ -261,10 +1874,42 @@ def generate_key(data_length=None):
     key = urandom(32)  # Generate a fixed-size 256-bit key
     return key
 
+def train_dictionary_files(dictionary_id, sample_files):
+    """Train a static Huffman dictionary from sample files and save it with the other user dictionaries."""
+    if os.path.exists(DICTIONARIES_FILE):
+        load_dictionaries(DICTIONARIES_FILE)
+    train_dictionary((read_file(path) for path in sample_files), dictionary_id)
+    save_dictionaries(DICTIONARIES_FILE)
+
 def main():
     # Initialize mappings
     nucleotides, inverse_nucleotides = initialize_nucleotides()
     
+    # Load user-trained Huffman dictionaries
+    if os.path.exists(DICTIONARIES_FILE):
+        load_dictionaries(DICTIONARIES_FILE)
+    
+    # TRAINING MODE: build a static Huffman dictionary from sample files
+    if len(os.sys.argv) > 1 and os.sys.argv[1].lower() == 'train':
+        if len(os.sys.argv) < 4:
+            print("Usage: python dna_encoder.py train <dictionary_id> <sample_file> [<sample_file> ...]")
+            return
+        train_dictionary_files(os.sys.argv[2], os.sys.argv[3:])
+        print(f"Dictionary '{os.sys.argv[2]}' saved to {DICTIONARIES_FILE}, use it with compression_codec 'huffman:{os.sys.argv[2]}'")
+        return
+    
+    # CONVERSION MODE: switch a .dna file between ASCII text and the packed format
+    if len(os.sys.argv) > 1 and os.sys.argv[1].lower() in ('pack', 'unpack'):
+        if len(os.sys.argv) < 4:
+            print(f"Usage: python dna_encoder.py {os.sys.argv[1].lower()} <input.dna> <output.dna>")
+            return
+        if os.sys.argv[1].lower() == 'pack':
+            pack_dna_file(os.sys.argv[2], os.sys.argv[3], nucleotides)
+        else:
+            unpack_dna_file(os.sys.argv[2], os.sys.argv[3])
+        print(f"Converted {os.sys.argv[2]} to {os.sys.argv[3]}")
+        return
+    
     # Check if we're in encoding or decoding mode
     encode_mode = True
     if len(os.sys.argv) > 1 and os.sys.argv[1].lower() == 'decode':
@@ -277,69 +1922,29 @@ def main():
         if len(os.sys.argv) > 2:
             input_file = os.sys.argv[2]
             
-        data = read_file(input_file)
-        
-        # Process data based on configuration
-        processed_data = data
-        original_encoded_length = len(data)
-        info = None
-        
-        # Step 1: Compression (optional)
-        if CONFIG['use_compression']:
-            processed_data, info = huffman_encode(processed_data)
-            original_encoded_length = len(processed_data)
-            print(f"Compression ratio: {len(data)/original_encoded_length:.2f}")
-        else:
-            print("Compression disabled")
-        
-        # Step 2: Encryption (optional)
-        encryption_salt = None
-        password_hash = None
-        verification_salt = None
+        # Get password from user
+        password = None
         if CONFIG['use_encryption']:
-            # Get password from user
             import getpass
             password = getpass.getpass("Enter encryption password: ")
-            processed_data, encryption_salt, password_hash, verification_salt = encrypt_data_with_password(processed_data, password)
-            print(f"Data encrypted with password-derived key")
-        else:
-            print("Encryption disabled")
-        
-        # Step 3: Error correction (optional)
-        if CONFIG['use_error_correction']:
-            ecc_symbols = CONFIG['ecc_symbols']
-            processed_data = rs_encode(bytes(processed_data), ecc_symbols)
-            print(f"Data size after RS encoding: {len(processed_data)} bytes")
-        else:
-            print("Error correction disabled")
-        
-        # Convert to DNA sequence
-        dna_sequence = convert_to_nucleotides(processed_data, nucleotides)
-        print(f"DNA sequence length: {len(dna_sequence)} nucleotides")
         
-        # Create metadata
-        metadata = {
-            'config': CONFIG,
-            'original_file_name': os.path.basename(input_file),
-            'original_size': len(data),
-            'processed_size': original_encoded_length,
-            'encryption_salt': base64.b64encode(encryption_salt).decode('utf-8') if encryption_salt else None,
-            'password_hash': base64.b64encode(password_hash).decode('utf-8') if password_hash else None,
-            'verification_salt': base64.b64encode(verification_salt).decode('utf-8') if verification_salt else None,
-            'huffman_info': serialize_huffman_info(info),
-            'dna_sequence_length': len(dna_sequence)
-        }
-        
-        # Save DNA sequence and metadata
+        # Encode through the streaming pipeline, writing the DNA as it is produced
         output_base = os.path.splitext(input_file)[0]
-        dna_file = f"{output_base}.dna"
+        dna_file = f"{output_base}.{CONFIG['sequence_format'] or 'dna'}"
         metadata_file = f"{output_base}_metadata.json"
-        
-        with open(dna_file, 'w') as f:
-            f.write(dna_sequence)
-        
+        metadata = encode_file(input_file, dna_file, CONFIG, password)
         save_metadata(metadata, metadata_file)
         
+        if CONFIG['use_compression']:
+            print(f"Compression codec: {metadata['compression_codec']}")
+            print(f"Compression ratio: {metadata['original_size']/max(metadata['processed_size'], 1):.2f}")
+        else:
+            print("Compression disabled")
+        print("Data encrypted with password-derived key" if CONFIG['use_encryption'] else "Encryption disabled")
+        print(f"Error correction: {CONFIG['ecc_symbols']} RS symbols" if CONFIG['use_error_correction'] else "Error correction disabled")
+        print(f"DNA sequence length: {metadata['dna_sequence_length']} nucleotides")
+        if CONFIG['oligo_length']:
+            print(f"Split into {metadata['oligo_count']} oligos")
         print(f"DNA sequence saved to {dna_file}")
         print(f"Metadata saved to {metadata_file}")
         
@@ -347,97 +1952,56 @@ def main():
         # DECODING MODE
         # Load DNA sequence and metadata
         if len(os.sys.argv) < 3:
-            print("Usage: python test2.py decode <dna_file> <metadata_file>")
+            print("Usage: python dna_encoder.py decode <dna_file> <metadata_file> [<start> <end>]")
             return
             
         dna_file = os.sys.argv[2]
         metadata_file = os.sys.argv[3]
         
-        with open(dna_file, 'r') as f:
-            dna_sequence = f.read().strip()
-        
         metadata = load_metadata(metadata_file)
-        
-        # Extract configuration and needed information
         config = metadata['config']
-        original_encoded_length = metadata['processed_size']
-        huffman_info = deserialize_huffman_info(metadata['huffman_info'])
-        output_file = metadata['original_file_name']
-        
-        print(f"Decoding DNA sequence of length {len(dna_sequence)}")
-        
-        # Decode the DNA sequence
-        binary_string = decode_nucleotides(dna_sequence, inverse_nucleotides)
-        
-        # Convert binary string to bytes
-        byte_array = binary_to_bytes(binary_string)
-        
-        # Process data back based on configuration (in reverse order)
-        retrieved_data = byte_array
-        
-        # Step 1: Error correction (optional) - reverse
-        if config['use_error_correction']:
-            ecc_symbols = config['ecc_symbols']
-            retrieved_data = rs_decode(retrieved_data, ecc_symbols)
-            print(f"Data size after RS decoding: {len(retrieved_data)} bytes")
+        output_path = f"decoded_{metadata['original_file_name']}"
+        print(f"Decoding DNA sequence of length {metadata.get('dna_sequence_length')}")
         
         # Get encryption password if needed
+        password = None
         if config['use_encryption']:
             # Check if we have a salt in the metadata
             if 'encryption_salt' not in metadata or not metadata['encryption_salt']:
                 print("Error: Encryption salt not found in metadata")
                 return
-                
             import getpass
             password = getpass.getpass("Enter decryption password: ")
-            encryption_salt = base64.b64decode(metadata['encryption_salt'])
-            password_hash = base64.b64decode(metadata['password_hash']) if 'password_hash' in metadata else None
-            verification_salt = base64.b64decode(metadata['verification_salt']) if 'verification_salt' in metadata else None
-            
-            # If we have password hash, verify first before proceeding
-            if password_hash and verification_salt:
-                if not verify_password(password, password_hash, verification_salt):
-                    print("Error: Incorrect password.")
-                    return
         
-        # Step 2: Decryption (optional) - reverse
-        if config['use_encryption']:
-            try:
-                # Use the new decrypt function that handles password hash verification
-                if 'password_hash' in metadata and 'verification_salt' in metadata:
-                    password_hash = base64.b64decode(metadata['password_hash'])
-                    verification_salt = base64.b64decode(metadata['verification_salt'])
-                    retrieved_data = decrypt_data_with_password(
-                        retrieved_data, password, encryption_salt, 
-                        password_hash, verification_salt, original_encoded_length)
-                else:
-                    # For backward compatibility with older files
-                    key, iv, _ = derive_key_iv_from_password(password, encryption_salt)
-                    key_iv_tuple = (key, iv)
-                    retrieved_data = decrypt_data(retrieved_data, key_iv_tuple, original_encoded_length)
-                
-                # Ensure output is the right length
-                retrieved_data = retrieved_data[:original_encoded_length]
-            except ValueError as e:
-                if str(e) == "PASSWORD_INCORRECT":
-                    print("Error: Incorrect password.")
-                elif str(e) == "DECRYPTION_FAILED":
-                    print("Error: Decryption failed due to an unknown issue.")
-                return
-            except Exception as e:
-                print(f"Decryption failed: {e}")
-                print("This may be due to an incorrect password.")
-                return
-        
-        # Step 3: Decompression (optional) - reverse
-        if config['use_compression']:
-            retrieved_data = huffman_decode(bytes(retrieved_data), huffman_info)
-        
-        # Save the decoded output to a file
-        output_path = f"decoded_{output_file}"
-        with open(output_path, "wb") as f:
-            f.write(retrieved_data)
+        # Decode through the streaming pipeline (text and packed .dna, FASTA and FASTQ files are accepted),
+        # or just the byte range given after the file names
+        stats = {}
+        try:
+            if len(os.sys.argv) > 5:
+                data = decode_range(dna_file, metadata, int(os.sys.argv[4]), int(os.sys.argv[5]), password)
+                with open(output_path, "wb") as f:
+                    f.write(data)
+            else:
+                stats = decode_file(dna_file, metadata, output_path, password)
+        except ValueError as e:
+            if str(e) == "PASSWORD_INCORRECT":
+                print("Error: Incorrect password.")
+            elif str(e) == "DECRYPTION_FAILED":
+                print("Error: Decryption failed. The data may be corrupted or the password incorrect.")
+            else:
+                print(f"Decoding failed: {e}")
+            return
         
+        oligo_stats = stats.get('oligos')
+        if oligo_stats:
+            print(f"Oligos read: {oligo_stats['oligos']}, invalid: {oligo_stats['invalid']}, "
+                  f"duplicate: {oligo_stats['duplicate']}, missing: {oligo_stats['missing']}, "
+                  f"weak bytes: {oligo_stats['weak']}")
+        ecc_stats = stats.get('ecc')
+        if ecc_stats:
+            print(f"Reed-Solomon codewords clean: {ecc_stats['clean']}, corrected: {ecc_stats['corrected']} "
+                  f"({ecc_stats['corrected_symbols']} symbols, {ecc_stats['erasures']} of them known erasures), "
+                  f"uncorrectable: {ecc_stats['uncorrectable']}")
         print(f"Decoding completed successfully! Output saved to {output_path}")
 
 if __name__ == "__main__":
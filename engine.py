@@ -0,0 +1,160 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from reedsolo import RSCodec
+
+# Reed-Solomon codecs kept per engine, one per ecc_symbols value
+RS_CACHE_SIZE = 8
+
+# Huffman decode tables kept per engine; each is about 0.5 MB
+HUFFMAN_TABLE_CACHE_SIZE = 16
+
+# Derived keys kept per engine, and for how many seconds after they were derived
+KEY_CACHE_SIZE = 32
+KEY_CACHE_TTL = 300
+
+# Nucleotide alphabet, in the order of the 2-bit values it encodes
+NUCLEOTIDES = ["A", "C", "G", "T"]
+
+# Engine shared by everything in this process, created on first use
+_engine = None
+_engine_lock = threading.Lock()
+
+
+class LRUCache:
+    """Thread-safe mapping that builds missing values on demand and evicts the least recently used."""
+    
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, build):
+        """Return the value for key, calling build() to create it if it is not cached."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        
+        # Build outside the lock; if two threads race, both values are equal
+        value = build()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return value
+    
+    def __len__(self):
+        return len(self._items)
+
+
+class KeyCache:
+    """
+    Thread-safe cache of key material derived from passwords.
+    
+    Entries are keyed on a label (e.g. the KDF parameters), the salt and an
+    HMAC of the password under a secret that never leaves this process, so
+    the cache holds no password or unkeyed password hash. At most size
+    entries are kept, each for ttl seconds after it was derived. The
+    material is stored in bytearrays that are overwritten with zeros when an
+    entry expires or is evicted; callers get a copy. Each process has its
+    own cache, so every worker of a process pool derives a key once.
+    """
+    
+    def __init__(self, size=KEY_CACHE_SIZE, ttl=KEY_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._secret = os.urandom(32)
+        self._items = OrderedDict()  # key -> (expiry time, material)
+        self._lock = threading.Lock()
+    
+    def get(self, label, salt, password, build):
+        """Return the key material for (label, salt, password), calling build() to derive it if it is not cached."""
+        key = (label, bytes(salt), hmac.new(self._secret, password, hashlib.sha256).digest())
+        with self._lock:
+            self._expire()
+            if key in self._items:
+                self._items.move_to_end(key)
+                return bytes(self._items[key][1])
+        
+        # Derive outside the lock, key derivation is slow on purpose
+        material = bytearray(build())
+        with self._lock:
+            if key in self._items:
+                _wipe(self._items.pop(key)[1])
+            self._items[key] = (time.monotonic() + self.ttl, material)
+            while len(self._items) > self.size:
+                _wipe(self._items.popitem(last=False)[1][1])
+            return bytes(material)
+    
+    def clear(self):
+        """Wipe and drop every entry."""
+        with self._lock:
+            for _, material in self._items.values():
+                _wipe(material)
+            self._items.clear()
+    
+    def _expire(self):
+        """Wipe and drop the entries past their expiry time; the lock must be held."""
+        now = time.monotonic()
+        for key in [key for key, (expiry, _) in self._items.items() if expiry <= now]:
+            _wipe(self._items.pop(key)[1])
+    
+    def __len__(self):
+        return len(self._items)
+
+
+def _wipe(material):
+    """Overwrite a bytearray with zeros."""
+    material[:] = bytes(len(material))
+
+
+class Engine:
+    """
+    Precomputed state reused by every encode and decode in a process.
+    
+    Building an RSCodec recomputes the Galois field tables and generator
+    polynomial, and Huffman decode tables have 2 ** 15 entries, so both are
+    cached here instead of being rebuilt per call, as are the 65536-entry
+    encode tables of the static dictionaries. The nucleotide alphabet
+    and its lookup tables (see dna_encoder.nucleotide_tables) live here too,
+    as do recently derived password keys, so repeated decodes of files with
+    the same password skip PBKDF2. Get the shared instance with get_engine().
+    """
+    
+    def __init__(self, rs_cache_size=RS_CACHE_SIZE, huffman_table_cache_size=HUFFMAN_TABLE_CACHE_SIZE,
+                 key_cache_size=KEY_CACHE_SIZE, key_cache_ttl=KEY_CACHE_TTL):
+        self.nucleotides = list(NUCLEOTIDES)
+        self.inverse_nucleotides = {n: f"{i:02b}" for i, n in enumerate(self.nucleotides)}
+        self.nucleotide_tables = {}  # Few alphabets and codes, so never evicted
+        self.rs_codecs = LRUCache(rs_cache_size)
+        self.rs_tables = LRUCache(rs_cache_size)  # See reed_solomon.rs_remainder_tables
+        self.huffman_tables = LRUCache(huffman_table_cache_size)
+        self.huffman_pair_tables = LRUCache(huffman_table_cache_size)  # Encode tables of static dictionaries
+        self.keys = KeyCache(key_cache_size, key_cache_ttl)
+    
+    def rs_codec(self, ecc_symbols, codec_class=RSCodec):
+        """Return the cached RSCodec (or compatible class, e.g. creedsolo's) for this number of ecc symbols."""
+        return self.rs_codecs.get((codec_class, ecc_symbols), lambda: codec_class(ecc_symbols))
+    
+    def huffman_decode_table(self, codes, build):
+        """Return the decode table of a Huffman code table, calling build(codes) on a cache miss."""
+        return self.huffman_tables.get(tuple(sorted(codes.items())), lambda: build(codes))
+    
+    def huffman_pair_table(self, dictionary_id, codes, build):
+        """Return the pair encode table of a static Huffman dictionary, calling build(codes) on a cache miss."""
+        return self.huffman_pair_tables.get(dictionary_id, lambda: build(codes))
+
+
+def get_engine():
+    """Return the engine of this process (every worker process gets its own), creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = Engine()
+    return _engine
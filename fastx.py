@@ -0,0 +1,180 @@
+import itertools
+
+# FASTA sequences are wrapped at this many nucleotides per line
+FASTA_LINE_WIDTH = 80
+
+# Files are read and written in buffers of this size
+IO_BUFFER_SIZE = 1 << 22
+
+# Phred+33 quality written for designed (not sequenced) strands: Q40
+DEFAULT_QUALITY = "I"
+QUALITY_OFFSET = 33
+
+
+def detect_format(file_path):
+    """Return 'fasta' or 'fastq' from the first character of a file, or None for anything else."""
+    with open(file_path, 'rb') as f:
+        first = f.read(1024).lstrip()[:1]
+    return {b">": "fasta", b"@": "fastq"}.get(first)
+
+
+def _iter_chunks(sequence):
+    """Yield a sequence given either as one string or as an iterable of string chunks."""
+    if isinstance(sequence, str):
+        yield sequence
+    else:
+        yield from sequence
+
+
+def write_fasta(records, file_path, line_width=FASTA_LINE_WIDTH):
+    """
+    Write records to a FASTA file as they arrive.
+    
+    Args:
+        records (iterable): (name, sequence) pairs; a sequence can be a
+            string or an iterable of string chunks, so a multi-GB strand
+            never has to be in memory at once
+        file_path (str): Output path
+        line_width (int): Nucleotides per sequence line
+    
+    Returns:
+        tuple: (number of records, number of nucleotides)
+    """
+    count = 0
+    length = 0
+    with open(file_path, 'w', buffering=IO_BUFFER_SIZE) as f:
+        for name, sequence in records:
+            f.write(f">{name}\n")
+            pending = ""
+            for chunk in _iter_chunks(sequence):
+                pending += chunk
+                usable = len(pending) - len(pending) % line_width
+                for start in range(0, usable, line_width):
+                    f.write(pending[start:start + line_width] + "\n")
+                pending = pending[usable:]
+                length += len(chunk)
+            if pending:
+                f.write(pending + "\n")
+            count += 1
+    return count, length
+
+
+def write_fastq(records, file_path):
+    """
+    Write records to a FASTQ file as they arrive.
+    
+    Args:
+        records (iterable): (name, sequence, quality) triples; the sequence
+            can be a string or an iterable of string chunks, and a quality of
+            None writes DEFAULT_QUALITY for every nucleotide
+        file_path (str): Output path
+    
+    Returns:
+        tuple: (number of records, number of nucleotides)
+    """
+    count = 0
+    length = 0
+    with open(file_path, 'w', buffering=IO_BUFFER_SIZE) as f:
+        for name, sequence, quality in records:
+            f.write(f"@{name}\n")
+            record_length = 0
+            for chunk in _iter_chunks(sequence):
+                f.write(chunk)
+                record_length += len(chunk)
+            f.write("\n+\n")
+            if quality is None:
+                for start in range(0, record_length, IO_BUFFER_SIZE):
+                    f.write(DEFAULT_QUALITY * min(IO_BUFFER_SIZE, record_length - start))
+            elif len(quality) != record_length:
+                raise ValueError(f"Quality of record {name} does not match its sequence length")
+            else:
+                f.write(quality)
+            f.write("\n")
+            count += 1
+            length += record_length
+    return count, length
+
+
+def iter_fasta(file_path):
+    """Yield (name, sequence) for every record of a FASTA file."""
+    name = None
+    lines = []
+    with open(file_path, 'r', buffering=IO_BUFFER_SIZE, errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith(">"):
+                if name is not None:
+                    yield name, "".join(lines)
+                name = line[1:]
+                lines = []
+            elif line and name is not None:
+                lines.append(line)
+    if name is not None:
+        yield name, "".join(lines)
+
+
+def iter_fastq(file_path):
+    """Yield (name, sequence, quality) for every record of a FASTQ file."""
+    with open(file_path, 'r', buffering=IO_BUFFER_SIZE, errors='replace') as f:
+        lines = (line.strip() for line in f)
+        for header in lines:
+            if not header:
+                continue
+            if not header.startswith("@"):
+                raise ValueError("Malformed FASTQ record")
+            sequence, separator, quality = itertools.islice(lines, 3)
+            if not separator.startswith("+") or len(quality) != len(sequence):
+                raise ValueError(f"Malformed FASTQ record {header[1:]}")
+            yield header[1:], sequence, quality
+
+
+def iter_sequence(file_path, chunk_size=IO_BUFFER_SIZE):
+    """
+    Yield the nucleotides of every record of a FASTA or FASTQ file, concatenated, in chunks.
+    
+    The file is read in chunk_size buffers and names, line breaks and
+    FASTQ qualities are dropped, so even a single multi-GB record is never
+    held in memory.
+    """
+    fastq = detect_format(file_path) == "fastq"
+    line_number = -1  # Line within the current FASTQ record, 1 is the sequence
+    at_line_start = True
+    skipping = False
+    with open(file_path, 'r', buffering=IO_BUFFER_SIZE, errors='replace') as f:
+        for buffer in iter(lambda: f.read(chunk_size), ""):
+            # Fast path for the body of a FASTA record: just drop the line breaks
+            if not fastq and ">" not in buffer and (at_line_start or not skipping):
+                at_line_start = buffer.endswith("\n")
+                skipping = False
+                yield "".join(buffer.split())
+                continue
+            
+            pieces = []
+            position = 0
+            while position < len(buffer):
+                end = buffer.find("\n", position)
+                line_end = end if end >= 0 else len(buffer)
+                if at_line_start:
+                    if fastq:
+                        line_number = (line_number + 1) % 4
+                        skipping = line_number != 1
+                    else:
+                        skipping = buffer.startswith(">", position)
+                if not skipping:
+                    pieces.append(buffer[position:line_end].strip())
+                at_line_start = end >= 0
+                position = line_end + 1
+            if pieces:
+                yield "".join(pieces)
+
+
+def phred_scores(quality, offset=QUALITY_OFFSET):
+    """Convert a FASTQ quality string into a list of Phred scores."""
+    return [ord(char) - offset for char in quality]
+
+
+def mean_quality(quality, offset=QUALITY_OFFSET):
+    """Return the mean Phred score of a FASTQ quality string (0 for an empty one)."""
+    if not quality:
+        return 0.0
+    return sum(quality.encode('ascii', errors='replace')) / len(quality) - offset
@@ -0,0 +1,243 @@
+import bisect
+import itertools
+import math
+
+# DNA Fountain (Erlich & Zielinski, 2017): the payload is cut into segments
+# and every droplet carries the XOR of a few of them, chosen by a PRNG from
+# the droplet's seed. Any set of slightly more droplets than segments
+# decodes, in any order, so lost strands need no addresses or retransmission.
+
+# Robust soliton parameters, as in DNA Fountain
+SOLITON_C = 0.025
+SOLITON_DELTA = 0.001
+
+# Screening of droplet strands: longest homopolymer run and GC content range
+MAX_HOMOPOLYMER = 3
+GC_RANGE = (0.45, 0.55)
+
+# Droplet seeds are 32-bit
+MAX_SEED = (1 << 32) - 1
+
+_MASK64 = (1 << 64) - 1
+
+
+def robust_soliton_cdf(segment_count, c=SOLITON_C, delta=SOLITON_DELTA):
+    """Return the cumulative robust soliton distribution of droplet degrees 1..segment_count."""
+    k = segment_count
+    weights = [1 / k] + [1 / (d * (d - 1)) for d in range(2, k + 1)]
+    
+    # The spike that keeps the ripple of degree-one droplets from running dry
+    s = c * math.log(k / delta) * math.sqrt(k)
+    pivot = max(1, int(round(k / s)))
+    for d in range(1, min(pivot, k + 1)):
+        weights[d - 1] += s / (k * d)
+    if pivot <= k:
+        weights[pivot - 1] += s * math.log(s / delta) / k
+    
+    total = sum(weights)
+    return [value / total for value in itertools.accumulate(weights)]
+
+
+def _splitmix64(seed):
+    """Yield the SplitMix64 sequence of a seed; fixed here so droplets never depend on Python's random module."""
+    state = seed
+    while True:
+        state = (state + 0x9E3779B97F4A7C15) & _MASK64
+        z = state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        yield z ^ (z >> 31)
+
+
+def seed_sequence(start=1):
+    """
+    Yield the droplet seeds in the order droplets are made: a fixed permutation of the 32-bit ints.
+    
+    Consecutive numbers would put long runs of zero bits, and so homopolymers,
+    into the seeds written on the strands.
+    """
+    for number in range(start, MAX_SEED + 1):
+        # MurmurHash3 finalizer, a bijection
+        number ^= number >> 16
+        number = (number * 0x85EBCA6B) & MAX_SEED
+        number ^= number >> 13
+        number = (number * 0xC2B2AE35) & MAX_SEED
+        yield number ^ (number >> 16)
+    raise ValueError("Droplet seeds exhausted")
+
+
+def droplet_mask(seed, segment_size):
+    """Return the pseudo-random bytes (as an int) XORed over a droplet, so any payload looks random on the strand."""
+    numbers = _splitmix64(seed ^ 0x5A5A5A5A5A5A5A5A)
+    mask = 0
+    for _ in range(-(-segment_size // 8)):
+        mask = (mask << 64) | next(numbers)
+    return mask >> (-segment_size % 8 * 8)
+
+
+def droplet_segments(seed, segment_count, cdf):
+    """Return the indices of the segments XORed into the droplet with this seed."""
+    numbers = _splitmix64(seed)
+    degree = min(bisect.bisect_left(cdf, next(numbers) / (1 << 64)) + 1, segment_count)
+    chosen = []
+    seen = set()
+    while len(chosen) < degree:
+        index = next(numbers) % segment_count
+        if index not in seen:
+            seen.add(index)
+            chosen.append(index)
+    return chosen
+
+
+def iter_droplets(data, segment_size, start=1):
+    """
+    Yield (seed, droplet bytes) for the seeds of seed_sequence(start), without end.
+    
+    Args:
+        data (bytes): Payload; the last segment is padded with zero bytes
+        segment_size (int): Bytes per segment and per droplet
+        start (int): Position in the seed sequence of the first droplet
+    """
+    segment_count = max(1, -(-len(data) // segment_size))
+    data = bytes(data).ljust(segment_count * segment_size, b"\0")
+    segments = [int.from_bytes(data[i:i + segment_size], "big") for i in range(0, len(data), segment_size)]
+    cdf = robust_soliton_cdf(segment_count)
+    for seed in seed_sequence(start):
+        value = droplet_mask(seed, segment_size)
+        for index in droplet_segments(seed, segment_count, cdf):
+            value ^= segments[index]
+        yield seed, value.to_bytes(segment_size, "big")
+
+
+def screen_strand(strand, max_homopolymer=MAX_HOMOPOLYMER, gc_range=GC_RANGE):
+    """Return whether a strand has no homopolymer longer than max_homopolymer and its GC content is within gc_range."""
+    gc = (strand.count("G") + strand.count("C")) / len(strand)
+    if not gc_range[0] <= gc <= gc_range[1]:
+        return False
+    return not any(nucleotide * (max_homopolymer + 1) in strand for nucleotide in "ACGT")
+
+
+class FountainDecoder:
+    """
+    Peeling (belief propagation) decoder for droplets from iter_droplets.
+    
+    Droplets can be added in any order as they are read. Every droplet has
+    the segments already known XORed out of it; one left with a single
+    unknown segment recovers it, which is then XORed out of the droplets
+    waiting on it, and so on. Segments are held as ints, whose XOR is a
+    single operation however long the segment.
+    """
+    
+    def __init__(self, segment_count, segment_size):
+        self.segment_count = segment_count
+        self.segment_size = segment_size
+        self.cdf = robust_soliton_cdf(segment_count)
+        self.segments = [None] * segment_count
+        self.recovered = 0
+        self._seeds = set()
+        self._waiting = {}  # Segment index -> droplets ([unknown indices, value]) that include it
+    
+    @property
+    def complete(self):
+        return self.recovered == self.segment_count
+    
+    def add(self, seed, droplet):
+        """Add a droplet; returns False if its seed was added before."""
+        if seed in self._seeds:
+            return False
+        self._seeds.add(seed)
+        
+        value = int.from_bytes(droplet, "big") ^ droplet_mask(seed, self.segment_size)
+        unknown = set()
+        for index in droplet_segments(seed, self.segment_count, self.cdf):
+            if self.segments[index] is None:
+                unknown.add(index)
+            else:
+                value ^= self.segments[index]
+        
+        entry = [unknown, value]
+        if len(unknown) == 1:
+            self._peel(entry)
+        else:
+            for index in unknown:
+                self._waiting.setdefault(index, []).append(entry)
+        return True
+    
+    def _peel(self, entry):
+        """Recover the segment of a degree-one droplet and everything that follows from it."""
+        ripple = [entry]
+        while ripple:
+            unknown, value = ripple.pop()
+            if len(unknown) == 1:
+                ripple.extend(self._recover(unknown.pop(), value))
+    
+    def _recover(self, index, value):
+        """Store a segment and XOR it out of the droplets waiting on it; returns those left with one unknown segment."""
+        if self.segments[index] is not None:
+            return []
+        self.segments[index] = value
+        self.recovered += 1
+        ready = []
+        for other in self._waiting.pop(index, ()):
+            if index in other[0]:
+                other[0].discard(index)
+                other[1] ^= value
+                if len(other[0]) == 1:
+                    ready.append(other)
+        return ready
+    
+    def solve(self):
+        """
+        Recover what peeling cannot by Gaussian elimination over GF(2).
+        
+        Peeling stalls when no droplet is left with a single unknown segment,
+        which happens near the end of small pools. The droplets still waiting
+        are then solved together, with each droplet's unknown segments as the
+        bits of an int. Call it once no more droplets will arrive.
+        
+        Returns:
+            bool: Whether every segment is known now
+        """
+        entries = {id(entry): entry for waiting in self._waiting.values() for entry in waiting if entry[0]}
+        columns = sorted({index for unknown, _ in entries.values() for index in unknown})
+        bit_of = {index: bit for bit, index in enumerate(columns)}
+        
+        # Row echelon form, one row per highest bit
+        basis = {}
+        for unknown, value in entries.values():
+            mask = sum(1 << bit_of[index] for index in unknown)
+            while mask:
+                top = mask.bit_length() - 1
+                if top not in basis:
+                    basis[top] = (mask, value)
+                    break
+                mask ^= basis[top][0]
+                value ^= basis[top][1]
+        
+        # Reduce every row by the lower ones; a row left with its own bit only is solved
+        for top in sorted(basis):
+            mask, value = basis[top]
+            bits = mask & ~(1 << top)
+            while bits:
+                bit = bits.bit_length() - 1
+                bits &= ~(1 << bit)
+                if bit in basis:
+                    mask ^= basis[bit][0]
+                    value ^= basis[bit][1]
+            basis[top] = (mask, value)
+            if mask == 1 << top:
+                for entry in self._recover(columns[top], value):
+                    self._peel(entry)
+        return self.complete
+    
+    def iter_data(self, length):
+        """Yield the first length bytes of the payload a segment at a time, with zero bytes for segments not recovered."""
+        for index, segment in enumerate(self.segments):
+            size = min(self.segment_size, length - index * self.segment_size)
+            if size <= 0:
+                break
+            yield (segment or 0).to_bytes(self.segment_size, "big")[:size]
+    
+    def missing(self):
+        """Return the indices of the segments not recovered yet."""
+        return [index for index, segment in enumerate(self.segments) if segment is None]
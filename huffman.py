@@ -1,6 +1,16 @@
 import heapq
+import json
+import struct
+import sys
 from collections import Counter
 import pickle
+from parallel import get_executor, default_workers, split_ranges
+from engine import get_engine
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure Python bit packer is used instead
+    np = None
 
 
 class Node:
@@ -14,11 +24,36 @@ class Node:
         return self.freq < other.freq
 
 
-def build_huffman_tree(data):
-    """Build a Huffman tree from the given data."""
+# Longest code build_huffman_tree will produce. Keeping codes short bounds the
+# size of the decoder lookup table (2 ** MAX_CODE_LENGTH entries).
+MAX_CODE_LENGTH = 15
+
+# Inputs at least this large are bit-packed with NumPy when it is installed
+NUMPY_MIN_SIZE = 64 * 1024
+
+# Symbols packed per NumPy batch, bounds the temporary bit arrays
+NUMPY_BATCH_SIZE = 1 << 20
+
+
+def build_huffman_tree(data, max_length=MAX_CODE_LENGTH):
+    """Build a Huffman tree from the given data, limiting code lengths to max_length."""
     # Count frequency of each byte
-    frequency = Counter(data)
-    
+    return build_tree_from_frequency(Counter(data), max_length)
+
+
+def build_tree_from_frequency(frequency, max_length=MAX_CODE_LENGTH):
+    """Build a Huffman tree from a {byte: count} mapping, limiting code lengths to max_length."""
+    while True:
+        root = _build_tree(frequency)
+        if _tree_depth(root) <= max_length:
+            return root
+        
+        # Codes are too long: flatten the distribution and rebuild
+        frequency = {char: (freq + 1) // 2 for char, freq in frequency.items()}
+
+
+def _build_tree(frequency):
+    """Build a Huffman tree from a {byte: count} mapping."""
     # Create a priority queue (min heap)
     priority_queue = [Node(char, freq) for char, freq in frequency.items()]
     heapq.heapify(priority_queue)
@@ -41,6 +76,13 @@ def build_huffman_tree(data):
     return priority_queue[0] if priority_queue else None
 
 
+def _tree_depth(node):
+    """Return the length of the longest code in the tree."""
+    if node is None or node.char is not None:
+        return 0
+    return 1 + max(_tree_depth(node.left), _tree_depth(node.right))
+
+
 def generate_codes(node, current_code="", codes=None):
     """Generate Huffman codes for each character."""
     if codes is None:
@@ -74,22 +116,13 @@ def huffman_encode(data):
     # Build Huffman tree
     root = build_huffman_tree(data)
     
-    # Generate codes for each character
+    # Generate codes for each character, then renumber them canonically so
+    # the code lengths alone are enough to rebuild them
     codes = generate_codes(root)
+    codes = canonical_codes({char: len(code) for char, code in codes.items()})
     
     # Encode the data
-    encoded_string = ""
-    for byte in data:
-        encoded_string += codes[byte]
-    
-    # Convert the encoded string to bytes
-    padding = 8 - len(encoded_string) % 8 if len(encoded_string) % 8 != 0 else 0
-    encoded_string += padding * "0"  # Pad with zeros to make length a multiple of 8
-    
-    encoded_bytes = bytearray()
-    for i in range(0, len(encoded_string), 8):
-        byte_str = encoded_string[i:i+8]
-        encoded_bytes.append(int(byte_str, 2))
+    encoded_bytes, padding = pack_codes(data, codes)
     
     # Save encoding info for decoding
     encoding_info = {
@@ -97,7 +130,401 @@ def huffman_encode(data):
         "padding": padding
     }
     
-    return bytes(encoded_bytes), encoding_info
+    return encoded_bytes, encoding_info
+
+
+def canonical_codes(lengths):
+    """
+    Assign canonical Huffman codes from code lengths.
+    
+    Symbols are numbered in order of (length, byte value), so any decoder that
+    knows the lengths derives exactly the same codes.
+    
+    Args:
+        lengths (dict): Mapping of byte -> code length
+        
+    Returns:
+        dict: Mapping of byte -> code string
+    """
+    codes = {}
+    code = 0
+    previous_length = 0
+    for char, length in sorted(lengths.items(), key=lambda item: (item[1], item[0])):
+        if not length:
+            continue
+        code <<= length - previous_length
+        codes[char] = format(code, f"0{length}b")
+        code += 1
+        previous_length = length
+    return codes
+
+
+# Header of the compact canonical Huffman format: magic, version, padding,
+# then the 256 code lengths packed two per byte (4 bits each). Version 2
+# appends the segment table written by parallel_huffman_encode. Version 3
+# replaces the code lengths with the ID of a static dictionary.
+HEADER_MAGIC = b"HC"
+HEADER_VERSION = 1
+HEADER_SEGMENTS_VERSION = 2
+HEADER_DICTIONARY_VERSION = 3
+HEADER_SIZE = len(HEADER_MAGIC) + 2 + 128
+
+# segment table: count, then (bit offset, symbol count) per segment
+SEGMENT_COUNT = struct.Struct(">H")
+SEGMENT_ENTRY = struct.Struct(">QI")
+
+
+def pack_huffman_header(encoding_info):
+    """
+    Serialize encoding info as a compact canonical Huffman header.
+    
+    Args:
+        encoding_info (dict): Dictionary containing Huffman codes and padding info
+        
+    Returns:
+        bytes: The header, or None if the codes are not canonical or are too
+            long to store in 4 bits (legacy encoding info)
+    """
+    dictionary_id = encoding_info.get("dictionary")
+    if dictionary_id is not None:
+        encoded_id = dictionary_id.encode("ascii")
+        return HEADER_MAGIC + bytes([HEADER_DICTIONARY_VERSION, encoding_info["padding"], len(encoded_id)]) + encoded_id
+    
+    codes = encoding_info["codes"]
+    lengths = {char: len(code) for char, code in codes.items()}
+    if any(length > MAX_CODE_LENGTH for length in lengths.values()):
+        return None
+    if canonical_codes(lengths) != codes:
+        return None
+    
+    packed = bytearray(128)
+    for char, length in lengths.items():
+        packed[char >> 1] |= length << (4 if char & 1 == 0 else 0)
+    
+    segments = encoding_info.get("segments")
+    if not segments:
+        return HEADER_MAGIC + bytes([HEADER_VERSION, encoding_info["padding"]]) + bytes(packed)
+    
+    table = SEGMENT_COUNT.pack(len(segments))
+    table += b"".join(SEGMENT_ENTRY.pack(offset, count) for offset, count in segments)
+    return HEADER_MAGIC + bytes([HEADER_SEGMENTS_VERSION, encoding_info["padding"]]) + bytes(packed) + table
+
+
+def unpack_huffman_header(header):
+    """
+    Rebuild encoding info from a compact canonical Huffman header.
+    
+    Args:
+        header (bytes): Header produced by pack_huffman_header
+        
+    Returns:
+        dict: Dictionary containing Huffman codes and padding info
+    """
+    if len(header) < 4 or not header.startswith(HEADER_MAGIC):
+        raise ValueError("Not a canonical Huffman header")
+    if header[2] == HEADER_DICTIONARY_VERSION:
+        dictionary_id = header[5:5 + header[4]].decode("ascii")
+        return {"codes": dictionary_codes(dictionary_id), "padding": header[3], "dictionary": dictionary_id}
+    if header[2] not in (HEADER_VERSION, HEADER_SEGMENTS_VERSION):
+        raise ValueError(f"Unsupported Huffman header version: {header[2]}")
+    if len(header) < HEADER_SIZE:
+        raise ValueError("Truncated Huffman header")
+    
+    lengths = {}
+    for index, byte in enumerate(header[4:HEADER_SIZE]):
+        lengths[2 * index] = byte >> 4
+        lengths[2 * index + 1] = byte & 0x0F
+    
+    encoding_info = {"codes": canonical_codes(lengths), "padding": header[3]}
+    if header[2] == HEADER_SEGMENTS_VERSION:
+        (count,) = SEGMENT_COUNT.unpack_from(header, HEADER_SIZE)
+        encoding_info["segments"] = [
+            list(SEGMENT_ENTRY.unpack_from(header, HEADER_SIZE + SEGMENT_COUNT.size + i * SEGMENT_ENTRY.size))
+            for i in range(count)
+        ]
+    return encoding_info
+
+
+class _HeaderUnpickler(pickle.Unpickler):
+    """Unpickler that refuses every global, so a pickled header can build dicts, ints, strs and bytes but run no code."""
+    
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"Global {module}.{name} is not allowed in a Huffman header")
+
+
+def load_pickled_header(file):
+    """Read the legacy pickled encoding info from a file object; it may come from an untrusted upload."""
+    return _HeaderUnpickler(file).load()
+
+
+# Pre-trained code tables for small payloads, where a per-message table costs
+# more than it saves. Each string holds the code length of byte values 0-255
+# as one hex digit. Every byte has a code, so any input can be encoded.
+# These tables are referenced by ID from stored metadata: never change them,
+# add a new ID instead.
+BUILTIN_DICTIONARIES = {
+    "en": "ffffffffff6fffffefffffffffffffff3c88ffff996c7779999aa9bccf8afafcf8b8889aa9fbcb8a9f988afbfbcfbfff74755466649856446944468796affffffffffffffffffeffffffffffffffffffffffffffffffffffeeffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff",
+    "json": "eeeeeeeeee5eeeeeeeeeeeeeeeeeeeee3e3aeeeedb9e5a7b76666666664dedececebcceedeeeeeddeeecdeeeede7e8eeb577548895d757567c55568ab7e6e6feeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeefe",
+}
+
+# Weight of observed byte counts against the +1 every byte value receives
+# when training, so unseen bytes still get a (long) code
+DICTIONARY_SAMPLE_WEIGHT = 64
+
+# Canonical codes of every registered dictionary, by ID
+_dictionaries = {}
+
+
+def register_dictionary(dictionary_id, lengths):
+    """
+    Register a static code table under a short ID.
+    
+    Metadata records only the ID, so an ID can never be given a different
+    table: files encoded with the old one would decode to garbage.
+    Registering the same table again is allowed.
+    
+    Args:
+        dictionary_id (str): Short ASCII identifier stored in metadata
+        lengths (str or dict): 256 hex digits, or a mapping of byte -> code length
+    
+    Raises:
+        ValueError: If the lengths do not form a prefix code covering every
+            byte value, or the ID already holds a different table
+    """
+    if isinstance(lengths, str):
+        lengths = {char: int(digit, 16) for char, digit in enumerate(lengths)}
+    if len(dictionary_id.encode("ascii")) > 255:
+        raise ValueError("Dictionary ID is too long")
+    if sorted(char for char, length in lengths.items() if length) != list(range(256)):
+        raise ValueError("A dictionary must assign a code to every byte value")
+    if max(lengths.values()) > MAX_CODE_LENGTH:
+        raise ValueError(f"Dictionary code lengths must not exceed {MAX_CODE_LENGTH}")
+    # Kraft inequality: otherwise no prefix code has these lengths
+    if sum(1 << (MAX_CODE_LENGTH - length) for length in lengths.values()) > 1 << MAX_CODE_LENGTH:
+        raise ValueError("Dictionary code lengths do not form a prefix code")
+    
+    codes = canonical_codes(lengths)
+    if dictionary_id in _dictionaries and _dictionaries[dictionary_id] != codes:
+        if dictionary_id in BUILTIN_DICTIONARIES:
+            raise ValueError(f"Dictionary ID is reserved for a built-in dictionary: {dictionary_id}")
+        raise ValueError(f"Dictionary {dictionary_id} is already registered with a different table; "
+                         f"files encoded with it would no longer decode, use a new ID")
+    _dictionaries[dictionary_id] = codes
+
+
+def dictionary_codes(dictionary_id):
+    """Return the canonical codes of a registered dictionary."""
+    if dictionary_id not in _dictionaries:
+        raise ValueError(f"Unknown Huffman dictionary: {dictionary_id}")
+    return _dictionaries[dictionary_id]
+
+
+def dictionary_ids():
+    """Return the IDs of all registered dictionaries."""
+    return list(_dictionaries)
+
+
+def train_dictionary(samples, dictionary_id=None):
+    """
+    Build a static code table from sample inputs.
+    
+    Args:
+        samples (iterable): Byte strings representative of future inputs
+        dictionary_id (str): If given, register the table under this ID
+        
+    Returns:
+        str: The code lengths as 256 hex digits
+    """
+    counts = Counter()
+    for sample in samples:
+        counts.update(sample)
+    frequency = {char: counts[char] * DICTIONARY_SAMPLE_WEIGHT + 1 for char in range(256)}
+    codes = generate_codes(build_tree_from_frequency(frequency))
+    lengths = "".join(format(len(codes[char]), "x") for char in range(256))
+    
+    if dictionary_id is not None:
+        register_dictionary(dictionary_id, lengths)
+    return lengths
+
+
+def save_dictionaries(path, ids=None):
+    """Save registered dictionaries to a JSON file, by default every one that is not built in."""
+    if ids is None:
+        ids = [dictionary_id for dictionary_id in _dictionaries if dictionary_id not in BUILTIN_DICTIONARIES]
+    
+    tables = {}
+    for dictionary_id in ids:
+        codes = dictionary_codes(dictionary_id)
+        tables[dictionary_id] = "".join(format(len(codes[char]), "x") for char in range(256))
+    with open(path, 'w') as f:
+        json.dump(tables, f, indent=2)
+
+
+def load_dictionaries(path):
+    """Register every dictionary stored in a JSON file written by save_dictionaries."""
+    with open(path, 'r') as f:
+        tables = json.load(f)
+    for dictionary_id, lengths in tables.items():
+        register_dictionary(dictionary_id, lengths)
+    return list(tables)
+
+
+def dictionary_encode(data, dictionary_id):
+    """
+    Encode the input bytes with a static dictionary instead of a per-message tree.
+    
+    Args:
+        data (bytes): Input bytes to encode
+        dictionary_id (str): ID of a registered dictionary
+        
+    Returns:
+        tuple: (encoded_data, encoding_info) as returned by huffman_encode,
+            with the dictionary ID recorded in encoding_info["dictionary"]
+    """
+    codes = dictionary_codes(dictionary_id)
+    pair_table = get_engine().huffman_pair_table(dictionary_id, codes, build_pair_table)
+    encoded_bytes, padding = pack_codes(data, codes, pair_table) if data else (b"", 0)
+    return encoded_bytes, {"codes": codes, "padding": padding, "dictionary": dictionary_id}
+
+
+for _dictionary_id, _lengths in BUILTIN_DICTIONARIES.items():
+    register_dictionary(_dictionary_id, _lengths)
+
+
+def pack_codes(data, codes, pair_table=None):
+    """
+    Pack the Huffman code of every byte of data into a bit stream.
+    
+    Args:
+        data (bytes): Input bytes, every value must have a code
+        codes (dict): Mapping of byte -> code string
+        pair_table (tuple): Table from build_pair_table(codes), if one is
+            cached; otherwise it is built for this call
+        
+    Returns:
+        tuple: (packed_bytes, padding) where padding is the number of zero
+            bits appended to fill the last byte
+    """
+    if np is not None and len(data) >= NUMPY_MIN_SIZE and max(map(len, codes.values())) <= 16:
+        return _pack_codes_numpy(data, codes)
+    return _pack_codes_python(data, codes, pair_table)
+
+
+def build_pair_table(codes):
+    """
+    Return (pair values, pair lengths): the combined code of every pair of symbols, indexed by the native 16-bit word.
+    
+    With all 256 byte values coded this takes a 256x256 loop, so the tables
+    of static dictionaries are cached in the engine.
+    """
+    values = {char: int(code, 2) for char, code in codes.items()}
+    lengths = {char: len(code) for char, code in codes.items()}
+    pair_values = [0] * 65536
+    pair_lengths = [0] * 65536
+    for first in codes:
+        for second in codes:
+            if sys.byteorder == "little":
+                word = first | (second << 8)
+            else:
+                word = (first << 8) | second
+            pair_values[word] = (values[first] << lengths[second]) | values[second]
+            pair_lengths[word] = lengths[first] + lengths[second]
+    return pair_values, pair_lengths
+
+
+def _pack_codes_python(data, codes, pair_table=None):
+    """Pack codes through an integer bit accumulator, two input bytes per step."""
+    values = {char: int(code, 2) for char, code in codes.items()}
+    lengths = {char: len(code) for char, code in codes.items()}
+    pair_values, pair_lengths = pair_table or build_pair_table(codes)
+    
+    encoded_bytes = bytearray()
+    acc = 0
+    nbits = 0
+    even_length = len(data) & ~1
+    for word in memoryview(data)[:even_length].cast("H"):
+        length = pair_lengths[word]
+        acc = (acc << length) | pair_values[word]
+        nbits += length
+        if nbits >= 64:
+            # Flush all complete bytes, keep the remaining bits
+            remaining = nbits & 7
+            encoded_bytes += (acc >> remaining).to_bytes(nbits >> 3, "big")
+            acc &= (1 << remaining) - 1
+            nbits = remaining
+    
+    if len(data) & 1:
+        acc = (acc << lengths[data[-1]]) | values[data[-1]]
+        nbits += lengths[data[-1]]
+    
+    # Pad with zeros to make the length a multiple of 8
+    padding = -nbits % 8
+    encoded_bytes += (acc << padding).to_bytes((nbits + padding) >> 3, "big")
+    return bytes(encoded_bytes), padding
+
+
+def _pack_codes_numpy(data, codes):
+    """Pack codes in batches: expand each code to its bits with NumPy and repack them."""
+    values = np.zeros(256, dtype=">u2")
+    lengths = np.zeros(256, dtype=np.uint8)
+    for char, code in codes.items():
+        values[char] = int(code, 2)
+        lengths[char] = len(code)
+    columns = np.arange(16, dtype=np.uint8)
+    
+    symbols = np.frombuffer(data, dtype=np.uint8)
+    chunks = []
+    carry = np.zeros(0, dtype=np.uint8)
+    for start in range(0, len(symbols), NUMPY_BATCH_SIZE):
+        batch = symbols[start:start + NUMPY_BATCH_SIZE]
+        
+        # One row of 16 bits per symbol, keep only the trailing code bits
+        bit_rows = np.unpackbits(values[batch].view(np.uint8).reshape(-1, 2), axis=1)
+        bits = np.concatenate((carry, bit_rows[columns >= (16 - lengths[batch])[:, None]]))
+        
+        # Emit whole bytes and carry the leftover bits into the next batch
+        whole = len(bits) & ~7
+        chunks.append(np.packbits(bits[:whole]).tobytes())
+        carry = bits[whole:]
+    
+    padding = -len(carry) % 8
+    chunks.append(np.packbits(carry).tobytes())
+    return b"".join(chunks), padding
+
+
+def build_decode_table(codes):
+    """
+    Build lookup tables for table-driven Huffman decoding.
+    
+    Every code of at most table_bits bits fills all table slots that start
+    with it, so one lookup on the next table_bits bits of input yields the
+    next symbol and its length. Codes longer than MAX_CODE_LENGTH (only found
+    in metadata written before code lengths were limited) are resolved bit by
+    bit through long_codes.
+    
+    Args:
+        codes (dict): Mapping of byte -> code string
+        
+    Returns:
+        tuple: (table_bits, symbols, lengths, long_codes)
+    """
+    max_length = max((len(code) for code in codes.values()), default=1)
+    table_bits = min(max_length, MAX_CODE_LENGTH)
+    symbols = [0] * (1 << table_bits)
+    lengths = [0] * (1 << table_bits)
+    long_codes = {}
+    
+    for char, code in codes.items():
+        length = len(code)
+        if length > table_bits:
+            long_codes[(length, int(code, 2))] = char
+            continue
+        start = int(code, 2) << (table_bits - length)
+        count = 1 << (table_bits - length)
+        symbols[start:start + count] = [char] * count
+        lengths[start:start + count] = [length] * count
+    
+    return table_bits, symbols, lengths, long_codes
 
 
 def huffman_decode(encoded_data, encoding_info):
@@ -114,55 +541,366 @@ def huffman_decode(encoded_data, encoding_info):
     codes = encoding_info["codes"]
     padding = encoding_info["padding"]
     
-    # Reverse the codes for decoding
-    reverse_codes = {code: char for char, code in codes.items()}
+    if not encoded_data or not codes:
+        return b""
     
-    # Convert encoded_data to a binary string
-    binary_string = ""
-    for byte in encoded_data:
-        binary_string += format(byte, '08b')
+    # Tables are cached, so blocks and messages sharing a code table build it once
+    table_bits, symbols, lengths, long_codes = get_engine().huffman_decode_table(codes, build_decode_table)
+    mask = (1 << table_bits) - 1
+    decoded_data = bytearray()
     
-    # Remove padding
-    if padding:
-        binary_string = binary_string[:-padding]
+    # Bit accumulator: the low `nbits` bits of `acc` are not yet decoded
+    acc = 0
+    nbits = 0
+    for byte in encoded_data[:-1]:
+        acc = (acc << 8) | byte
+        nbits += 8
+        
+        while nbits >= table_bits:
+            # Look up the next table_bits bits
+            index = (acc >> (nbits - table_bits)) & mask
+            length = lengths[index]
+            if not length:
+                # Code longer than the table, extend one bit at a time
+                length = _match_long_code(acc, nbits, table_bits, long_codes)
+                if not length:
+                    break
+                decoded_data.append(long_codes[(length, (acc >> (nbits - length)) & ((1 << length) - 1))])
+            else:
+                decoded_data.append(symbols[index])
+            nbits -= length
+        
+        acc &= (1 << nbits) - 1
     
-    # Decode the binary string
-    decoded_data = bytearray()
-    current_code = ""
-    for bit in binary_string:
-        current_code += bit
-        if current_code in reverse_codes:
-            decoded_data.append(reverse_codes[current_code])
-            current_code = ""
+    # Final byte: drop its padding and decode whatever is left
+    acc = ((acc << 8) | encoded_data[-1]) >> padding
+    nbits += 8 - padding
+    while nbits > 0:
+        # Zero-fill the lookup index past the end of the data
+        index = ((acc << table_bits) >> nbits) & mask
+        length = lengths[index]
+        if not length:
+            length = _match_long_code(acc, nbits, table_bits, long_codes)
+            if not length:
+                break
+            decoded_data.append(long_codes[(length, (acc >> (nbits - length)) & ((1 << length) - 1))])
+        elif length <= nbits:
+            decoded_data.append(symbols[index])
+        else:
+            break
+        nbits -= length
             
     return bytes(decoded_data)
 
 
-def compress_file(input_path, output_path):
-    """Compress a file using Huffman coding."""
-    with open(input_path, 'rb') as file:
-        data = file.read()
+def _match_long_code(acc, nbits, table_bits, long_codes):
+    """Return the length of the long code at the top of the accumulator, or 0 if more bits are needed."""
+    for length in range(table_bits + 1, nbits + 1):
+        if (length, (acc >> (nbits - length)) & ((1 << length) - 1)) in long_codes:
+            return length
+    return 0
+
+
+# Inputs smaller than this are not worth splitting across processes
+PARALLEL_MIN_SIZE = 1 << 20
+
+
+def parallel_huffman_encode(data, workers=None):
+    """
+    Encode the input bytes using Huffman coding on several processes.
+    
+    The input is split into one segment per worker. Byte frequencies are
+    counted per segment in parallel and merged into a single shared code,
+    then the segments are encoded concurrently and their bit streams are
+    concatenated, so the result is an ordinary huffman_decode stream. The
+    bit offset of every segment is recorded so parallel_huffman_decode can
+    split the work the same way.
+    
+    Args:
+        data (bytes): Input bytes to encode
+        workers (int): Number of worker processes, defaults to the CPU count
+        
+    Returns:
+        tuple: (encoded_data, encoding_info) as returned by huffman_encode,
+            with an extra "segments" list of [bit_offset, symbol_count]
+    """
+    workers = workers or default_workers()
+    if workers < 2 or len(data) < PARALLEL_MIN_SIZE:
+        return huffman_encode(data)
+    
+    executor = get_executor(workers)
+    segments = [data[start:stop] for start, stop in split_ranges(len(data), workers)]
+    
+    # Step 1: Merge the per-segment histograms into one code
+    frequency = Counter()
+    for counts in executor.map(Counter, segments):
+        frequency.update(counts)
+    codes = generate_codes(build_tree_from_frequency(frequency))
+    codes = canonical_codes({char: len(code) for char, code in codes.items()})
+    
+    # Step 2: Encode the segments concurrently and stitch their bits together
+    stream = 0
+    total_bits = 0
+    segment_table = []
+    for segment, (packed, padding) in zip(segments, executor.map(pack_codes, segments, [codes] * len(segments))):
+        nbits = len(packed) * 8 - padding
+        segment_table.append([total_bits, len(segment)])
+        stream = (stream << nbits) | (int.from_bytes(packed, "big") >> padding)
+        total_bits += nbits
+    
+    padding = -total_bits % 8
+    encoded_data = (stream << padding).to_bytes((total_bits + padding) // 8, "big")
+    return encoded_data, {"codes": codes, "padding": padding, "segments": segment_table}
+
+
+def parallel_huffman_decode(encoded_data, encoding_info, workers=None):
+    """
+    Decode Huffman-encoded data, one process per recorded segment.
+    
+    Falls back to huffman_decode when the encoding info has no segment table.
+    
+    Args:
+        encoded_data (bytes): Compressed data
+        encoding_info (dict): Dictionary containing Huffman codes, padding info
+            and optionally the segment table from parallel_huffman_encode
+        workers (int): Number of worker processes, defaults to the CPU count
+        
+    Returns:
+        bytes: Decompressed data
+    """
+    segments = encoding_info.get("segments")
+    if not segments or len(segments) < 2 or (workers or default_workers()) < 2:
+        return huffman_decode(encoded_data, encoding_info)
+    
+    total_bits = len(encoded_data) * 8 - encoding_info["padding"]
+    bounds = [offset for offset, _ in segments] + [total_bits]
+    
+    # Cut out every segment's bytes and the bit range it covers within them
+    pieces = []
+    for start, stop in zip(bounds, bounds[1:]):
+        pieces.append((encoded_data[start // 8:-(-stop // 8)], start % 8, stop - start))
+    
+    executor = get_executor(workers)
+    codes = [encoding_info["codes"]] * len(pieces)
+    return b"".join(executor.map(_decode_segment, pieces, codes))
+
+
+def _decode_segment(piece, codes):
+    """Decode the bits of one segment, realigned to start on a byte boundary."""
+    segment, skip, nbits = piece
+    value = (int.from_bytes(segment, "big") >> (len(segment) * 8 - skip - nbits)) & ((1 << nbits) - 1)
+    padding = -nbits % 8
+    aligned = (value << padding).to_bytes((nbits + padding) // 8, "big")
+    return huffman_decode(aligned, {"codes": codes, "padding": padding})
+
+
+# Streaming container: a file header, then independent blocks of at most
+# block_size input bytes, each followed by its own code table unless the
+# header carries one shared by the whole stream
+STREAM_MAGIC = b"HUFS"
+STREAM_VERSION = 1
+STREAM_SHARED_TABLE = 0x01
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+# stream header: magic, version, flags, block size
+STREAM_HEADER = struct.Struct(">4sBBI")
+# block header: input length, payload length (0, 0 marks the end of the stream)
+BLOCK_HEADER = struct.Struct(">II")
+
+
+def iter_blocks(file, block_size=DEFAULT_BLOCK_SIZE):
+    """Yield successive blocks of at most block_size bytes read from a binary file."""
+    while True:
+        block = file.read(block_size)
+        if not block:
+            return
+        yield block
+
+
+def compress_block(block, codes=None):
+    """
+    Compress one block of a stream.
     
-    encoded_data, encoding_info = huffman_encode(data)
+    Args:
+        block (bytes): Input bytes of the block
+        codes (dict): Shared code table, or None to build one for this block
+        
+    Returns:
+        bytes: Block header, code table (or just the padding byte when a
+            shared table is used) and payload
+    """
+    if not block:
+        raise ValueError("An empty block would read as the end of the stream")
+    if codes is None:
+        payload, info = huffman_encode(block)
+        table = pack_huffman_header(info)
+    else:
+        payload, padding = pack_codes(block, codes)
+        table = bytes([padding])
+    return BLOCK_HEADER.pack(len(block), len(payload)) + table + payload
+
+
+def iter_compress(blocks, block_size=DEFAULT_BLOCK_SIZE, codes=None, index=None):
+    """
+    Compress an iterable of blocks into the streaming container format.
+    
+    Args:
+        blocks (iterable): Input blocks, each at most block_size bytes;
+            empty blocks are skipped, as a zero-length block header marks the
+            end of the stream
+        block_size (int): Block size recorded in the stream header
+        codes (dict): Canonical code table shared by all blocks, or None to
+            give every block its own table
+        index (list): If given, the stream offset of every block and of the
+            end marker is appended to it, so blocks can be decoded on their
+            own with decompress_block
+        
+    Yields:
+        bytes: Successive pieces of the compressed stream
+    """
+    flags = STREAM_SHARED_TABLE if codes is not None else 0
+    header = STREAM_HEADER.pack(STREAM_MAGIC, STREAM_VERSION, flags, block_size)
+    if codes is not None:
+        header += pack_huffman_header({"codes": codes, "padding": 0})
+    yield header
+    
+    offset = len(header)
+    for block in blocks:
+        if not block:
+            continue
+        piece = compress_block(block, codes)
+        if index is not None:
+            index.append(offset)
+        offset += len(piece)
+        yield piece
     
-    with open(output_path, 'wb') as file:
-        # Save encoding info for later decompression
-        pickle.dump(encoding_info, file)
-        file.write(encoded_data)
+    if index is not None:
+        index.append(offset)
+    yield BLOCK_HEADER.pack(0, 0)
+
+
+def stream_header_size(header):
+    """Return the size of a stream header (including any shared table) from its first STREAM_HEADER.size bytes."""
+    _, _, flags, _ = STREAM_HEADER.unpack(header[:STREAM_HEADER.size])
+    return STREAM_HEADER.size + (HEADER_SIZE if flags & STREAM_SHARED_TABLE else 0)
+
+
+def decompress_block(block, header):
+    """
+    Decompress one block of a stream, as located by the index of iter_compress.
+    
+    Args:
+        block (bytes): The block, starting at its block header
+        header (bytes): The stream header, including the shared table if any
+        
+    Returns:
+        bytes: The decompressed block
+    """
+    magic, version, flags, _ = STREAM_HEADER.unpack(header[:STREAM_HEADER.size])
+    if magic != STREAM_MAGIC:
+        raise ValueError("Not a Huffman stream")
+    if version != STREAM_VERSION:
+        raise ValueError(f"Unsupported Huffman stream version: {version}")
+    
+    length, payload_length = BLOCK_HEADER.unpack(block[:BLOCK_HEADER.size])
+    position = BLOCK_HEADER.size
+    if flags & STREAM_SHARED_TABLE:
+        codes = unpack_huffman_header(header[STREAM_HEADER.size:STREAM_HEADER.size + HEADER_SIZE])["codes"]
+        info = {"codes": codes, "padding": block[position]}
+        position += 1
+    else:
+        info = unpack_huffman_header(block[position:position + HEADER_SIZE])
+        position += HEADER_SIZE
+    
+    payload = block[position:position + payload_length]
+    if len(payload) < payload_length:
+        raise ValueError("Truncated Huffman stream")
+    return huffman_decode(payload, info)[:length]
+
+
+def iter_decompress(file):
+    """
+    Decompress a streaming container read from a binary file.
+    
+    Blocks are decoded as soon as they have been read, so output starts
+    before the whole stream is available.
+    
+    Args:
+        file: Binary file object positioned at the start of the stream
+        
+    Yields:
+        bytes: Successive decompressed blocks
+    """
+    magic, version, flags, _ = STREAM_HEADER.unpack(_read_exact(file, STREAM_HEADER.size))
+    if magic != STREAM_MAGIC:
+        raise ValueError("Not a Huffman stream")
+    if version != STREAM_VERSION:
+        raise ValueError(f"Unsupported Huffman stream version: {version}")
+    
+    shared_codes = None
+    if flags & STREAM_SHARED_TABLE:
+        shared_codes = unpack_huffman_header(_read_exact(file, HEADER_SIZE))["codes"]
+    
+    while True:
+        length, payload_length = BLOCK_HEADER.unpack(_read_exact(file, BLOCK_HEADER.size))
+        if length == 0:
+            return
+        
+        if shared_codes is None:
+            info = unpack_huffman_header(_read_exact(file, HEADER_SIZE))
+        else:
+            info = {"codes": shared_codes, "padding": _read_exact(file, 1)[0]}
+        
+        yield huffman_decode(_read_exact(file, payload_length), info)[:length]
+
+
+def _read_exact(file, size):
+    """Read exactly size bytes, raising ValueError if the stream ends early."""
+    data = file.read(size)
+    while len(data) < size:
+        more = file.read(size - len(data))
+        if not more:
+            raise ValueError("Truncated Huffman stream")
+        data += more
+    return data
+
+
+def compress_file(input_path, output_path, block_size=DEFAULT_BLOCK_SIZE, shared_table=False):
+    """
+    Compress a file using Huffman coding.
+    
+    The input is processed block by block, so memory use does not depend on
+    the file size. With shared_table the file is read twice: once to count
+    byte frequencies for a single code table, once to encode.
+    """
+    codes = None
+    if shared_table:
+        frequency = Counter()
+        with open(input_path, 'rb') as file:
+            for block in iter_blocks(file, block_size):
+                frequency.update(block)
+        codes = generate_codes(build_tree_from_frequency(frequency))
+        codes = canonical_codes({char: len(code) for char, code in codes.items()})
+    
+    with open(input_path, 'rb') as file, open(output_path, 'wb') as output:
+        for piece in iter_compress(iter_blocks(file, block_size), block_size, codes):
+            output.write(piece)
 
 
 def decompress_file(input_path, output_path):
     """Decompress a Huffman-compressed file."""
-    with open(input_path, 'rb') as file:
-        # Load encoding info
-        encoding_info = pickle.load(file)
-        # Read compressed data
+    with open(input_path, 'rb') as file, open(output_path, 'wb') as output:
+        if file.read(len(STREAM_MAGIC)) == STREAM_MAGIC:
+            file.seek(0)
+            for block in iter_decompress(file):
+                output.write(block)
+            return
+        
+        # For backward compatibility with files holding one pickled header
+        file.seek(0)
+        encoding_info = load_pickled_header(file)
         encoded_data = file.read()
-    
-    decoded_data = huffman_decode(encoded_data, encoding_info)
-    
-    with open(output_path, 'wb') as file:
-        file.write(decoded_data)
+        output.write(huffman_decode(encoded_data, encoding_info))
 
 
 # Example usage:
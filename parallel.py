@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Process pool shared by every parallel stage, created on first use
+_executor = None
+_executor_workers = None
+
+# Process pool that runs whole jobs (e.g. one encode of the web app), kept
+# apart from the stage pool so that resizing one never shuts down the other
+_job_executor = None
+_job_lock = threading.Lock()
+
+
+def default_workers():
+    """Return the number of worker processes to use when none is configured."""
+    return os.cpu_count() or 1
+
+
+def get_executor(workers=None):
+    """Return the shared process pool, (re)creating it with the given number of workers."""
+    global _executor, _executor_workers
+    workers = workers or default_workers()
+    if _executor is None or _executor_workers != workers:
+        shutdown_executor()
+        _executor = ProcessPoolExecutor(max_workers=workers)
+        _executor_workers = workers
+    return _executor
+
+
+def shutdown_executor():
+    """Shut down the shared process pool if it is running."""
+    global _executor, _executor_workers
+    if _executor is not None:
+        _executor.shutdown()
+    _executor = None
+    _executor_workers = None
+
+
+def get_job_executor(workers=None, initializer=None, initargs=()):
+    """
+    Return the job pool, creating it on first use.
+    
+    Args:
+        workers (int): Number of worker processes (default: one per CPU)
+        initializer (callable): Called with initargs in every worker when it
+            starts, e.g. to load state the parent loaded after it started
+    
+    The workers are spawned rather than forked: the pool is created from a
+    request thread, and forking a process with other threads running can
+    leave a lock held forever in the child.
+    """
+    global _job_executor
+    with _job_lock:
+        if _job_executor is None:
+            _job_executor = ProcessPoolExecutor(
+                max_workers=workers or default_workers(), mp_context=multiprocessing.get_context('spawn'),
+                initializer=initializer, initargs=initargs)
+        return _job_executor
+
+
+def run_job(function, *args, workers=None, initializer=None, initargs=()):
+    """
+    Run function(*args) in the job pool and return its result (or raise its exception).
+    
+    The calling thread only waits, without holding the GIL, so other
+    threads of the process keep running. workers=0 calls the function in
+    the calling thread instead. A pool whose worker died is discarded, so
+    the next job starts a new one.
+    """
+    if workers == 0:
+        return function(*args)
+    try:
+        return get_job_executor(workers, initializer, initargs).submit(_run_in_job_worker, function, args).result()
+    except BrokenProcessPool:
+        shutdown_job_executor()
+        raise
+
+
+def _run_in_job_worker(function, args):
+    """Run a job in a job pool worker, then shut down any stage pool it started there, which would keep the worker from exiting."""
+    try:
+        return function(*args)
+    finally:
+        shutdown_executor()
+
+
+def shutdown_job_executor():
+    """Shut down the job pool if it is running."""
+    global _job_executor
+    with _job_lock:
+        if _job_executor is not None:
+            _job_executor.shutdown(wait=False)
+        _job_executor = None
+
+
+def split_ranges(length, parts, align=1):
+    """
+    Split range(length) into at most `parts` contiguous (start, stop) ranges.
+    
+    Every boundary except the last is a multiple of `align`, so ranges can be
+    made to cover whole codewords or blocks.
+    """
+    if length <= 0:
+        return []
+    size = -(-length // max(parts, 1))
+    size = -(-size // align) * align
+    return [(start, min(start + size, length)) for start in range(0, length, size)]
@@ -0,0 +1,154 @@
+import struct
+
+# Probabilities are 12-bit fixed point estimates (out of 4096) that the next
+# bit is 1. Each coded bit moves its probability 1/16 of the way towards the
+# observed value. The coding loops inline these constants for speed.
+PROBABILITY_BITS = 12
+INITIAL_PROBABILITY = 1 << (PROBABILITY_BITS - 1)
+ADAPT_SHIFT = 4
+
+# Updated probability after coding a 1 or a 0, by current probability
+ADAPT_UP = [p + (((1 << PROBABILITY_BITS) - p) >> ADAPT_SHIFT) for p in range((1 << PROBABILITY_BITS) + 1)]
+ADAPT_DOWN = [p - (p >> ADAPT_SHIFT) for p in range((1 << PROBABILITY_BITS) + 1)]
+
+# Contexts longer than one byte are hashed into 2 ** CONTEXT_HASH_BITS buckets
+CONTEXT_HASH_BITS = 14
+
+DEFAULT_ORDER = 2
+MAX_ORDER = 3
+
+# stream header: coder order, original length
+HEADER = struct.Struct(">BI")
+
+# (tree node, bit) for each of the 8 decisions that code a byte
+BIT_PATHS = [
+    tuple((((256 | byte) >> (8 - depth)), (byte >> (7 - depth)) & 1) for depth in range(8))
+    for byte in range(256)
+]
+
+
+def _context_table(order):
+    """
+    Return the probability table and context hashing parameters for an order.
+    
+    The table holds 256 tree nodes per context. Order 0 and 1 index contexts
+    directly, higher orders hash the previous bytes into CONTEXT_HASH_BITS.
+    It is a list rather than a compact array: reading an array item creates
+    a new int object, which the coding loops would pay for on every bit.
+    """
+    if not 0 <= order <= MAX_ORDER:
+        raise ValueError(f"Range coder order must be between 0 and {MAX_ORDER}")
+    context_bits = min(8 * order, CONTEXT_HASH_BITS)
+    probabilities = [INITIAL_PROBABILITY] * (256 << context_bits)
+    history_mask = (1 << (8 * order)) - 1
+    return probabilities, history_mask, 32 - context_bits
+
+
+def range_encode(data, order=DEFAULT_ORDER):
+    """
+    Compress data with an adaptive order-k binary range coder.
+    
+    Every byte is coded as 8 binary decisions, most significant bit first.
+    Each decision is modeled by an adaptive probability selected by the
+    previous `order` bytes and the bits of the current byte seen so far, so
+    the model learns byte statistics conditioned on their context.
+    
+    Args:
+        data (bytes): Input bytes to encode
+        order (int): Number of preceding bytes used as context (0-3)
+        
+    Returns:
+        bytes: Header (order, length) followed by the coded stream
+    """
+    probabilities, history_mask, hash_shift = _context_table(order)
+    hashed = order > 1
+    paths = BIT_PATHS
+    up, down = ADAPT_UP, ADAPT_DOWN
+    output = bytearray(HEADER.pack(order, len(data)))
+    low = 0
+    high = 0xFFFFFFFF
+    history = 0
+    
+    for byte in data:
+        # Select the context from the previous bytes
+        if hashed:
+            base = (((history * 2654435761) & 0xFFFFFFFF) >> hash_shift) << 8
+        else:
+            base = history << 8
+        
+        for node, bit in paths[byte]:
+            index = base | node
+            p = probabilities[index]
+            middle = low + ((high - low) >> 12) * p
+            if bit:
+                high = middle
+                probabilities[index] = up[p]
+            else:
+                low = middle + 1
+                probabilities[index] = down[p]
+            
+            # Shift out leading bytes once low and high agree on them
+            while (low ^ high) < 0x1000000:
+                output.append(high >> 24)
+                low = (low << 8) & 0xFFFFFFFF
+                high = ((high << 8) & 0xFFFFFFFF) | 0xFF
+        
+        history = ((history << 8) | byte) & history_mask
+    
+    output += low.to_bytes(4, "big")
+    return bytes(output)
+
+
+def range_decode(encoded_data):
+    """
+    Decompress data produced by range_encode.
+    
+    Args:
+        encoded_data (bytes): Header and coded stream
+        
+    Returns:
+        bytes: Decompressed data
+    """
+    order, length = HEADER.unpack_from(encoded_data)
+    probabilities, history_mask, hash_shift = _context_table(order)
+    hashed = order > 1
+    up, down = ADAPT_UP, ADAPT_DOWN
+    stream = bytes(encoded_data[HEADER.size:])
+    position = 4
+    value = int.from_bytes(stream[:4], "big")
+    low = 0
+    high = 0xFFFFFFFF
+    history = 0
+    decoded_data = bytearray(length)
+    
+    for offset in range(length):
+        if hashed:
+            base = (((history * 2654435761) & 0xFFFFFFFF) >> hash_shift) << 8
+        else:
+            base = history << 8
+        
+        node = 1
+        while node < 256:
+            index = base | node
+            p = probabilities[index]
+            middle = low + ((high - low) >> 12) * p
+            if value <= middle:
+                high = middle
+                probabilities[index] = up[p]
+                node = node + node + 1
+            else:
+                low = middle + 1
+                probabilities[index] = down[p]
+                node = node + node
+            
+            while (low ^ high) < 0x1000000:
+                low = (low << 8) & 0xFFFFFFFF
+                high = ((high << 8) & 0xFFFFFFFF) | 0xFF
+                value = ((value << 8) & 0xFFFFFFFF) | stream[position]
+                position += 1
+        
+        byte = node & 0xFF
+        decoded_data[offset] = byte
+        history = ((history << 8) | byte) & history_mask
+    
+    return bytes(decoded_data)
@@ -0,0 +1,302 @@
+from collections import namedtuple
+from reedsolo import RSCodec, ReedSolomonError
+from engine import get_engine
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the numpy backend is not registered without it
+    np = None
+
+try:
+    import creedsolo
+except ImportError:  # Compiled reedsolo extension, optional
+    creedsolo = None
+
+# A Reed-Solomon implementation over GF(256) with reedsolo's parameters
+# (primitive polynomial 0x11d, generator 2, first root 0), so every backend
+# produces the same bytes:
+#   encode(data, ecc_symbols) adds ecc_symbols parity bytes after every
+#       255 - ecc_symbols bytes, exactly like RSCodec.encode
+#   check(data, ecc_symbols) returns the indices of the 255-byte codewords
+#       whose syndromes are not all zero
+#   correct(codeword, ecc_symbols, erase_pos=None) corrects one codeword,
+#       given the positions of any bytes known to be wrong, and returns
+#       (message, errata positions), raising ReedSolomonError if it cannot
+RSBackend = namedtuple("RSBackend", ["name", "encode", "check", "correct"])
+
+RS_BACKENDS = {}
+
+# Backends picked by get_rs_backend('auto'), fastest first
+AUTO_RS_BACKENDS = ["creedsolo", "numpy", "pure"]
+
+# Full codewords (or messages) at least this many are checked (or encoded) with NumPy when it is installed
+RS_NUMPY_MIN_CODEWORDS = 64
+
+
+def register_rs_backend(name, encode, check, correct):
+    """Register a Reed-Solomon backend under the given name."""
+    RS_BACKENDS[name] = RSBackend(name, encode, check, correct)
+
+
+def get_rs_backend(name="auto"):
+    """Return the named backend, or the fastest one installed for 'auto'."""
+    if name == "auto":
+        name = next(backend for backend in AUTO_RS_BACKENDS if backend in RS_BACKENDS)
+    if name not in RS_BACKENDS:
+        raise ValueError(f"Reed-Solomon backend not available: {name}")
+    return RS_BACKENDS[name]
+
+
+def rs_backend_names():
+    """Return the names of the backends available in this installation."""
+    return [name for name in AUTO_RS_BACKENDS if name in RS_BACKENDS]
+
+
+def rs_remainder_tables(ecc_symbols):
+    """
+    Return the lookup tables of a byte-wise division by the Reed-Solomon generator polynomial.
+    
+    Entry f is f times the generator without its leading 1, like a CRC table
+    (as an int, and as a row of a NumPy array when NumPy is installed). The
+    products come from the GF(256) log/antilog tables. Cached in the engine.
+    """
+    def build():
+        rsc = get_engine().rs_codec(ecc_symbols)
+        generator = rsc.gen[ecc_symbols]
+        
+        def multiply(x, y):
+            if x == 0 or y == 0:
+                return 0
+            return rsc.gf_exp[(rsc.gf_log[x] + rsc.gf_log[y]) % 255]
+        
+        rows = [[multiply(f, generator[k]) for k in range(1, ecc_symbols + 1)] for f in range(256)]
+        table = [int.from_bytes(bytes(row), "big") for row in rows]
+        return table, np.array(rows, dtype=np.uint8) if np is not None else None
+    return get_engine().rs_tables.get(ecc_symbols, build)
+
+
+def _remainder(piece, table, ecc_symbols):
+    """Divide one piece by the generator polynomial, one table lookup per byte; returns the remainder as an int."""
+    shift = 8 * (ecc_symbols - 1)
+    mask = (1 << 8 * ecc_symbols) - 1
+    remainder = 0
+    for byte in piece:
+        remainder = ((remainder << 8) & mask) ^ table[(remainder >> shift) ^ byte]
+    return remainder
+
+
+def _remainders_numpy(pieces, numpy_table, ecc_symbols):
+    """Divide every row of a 2-D uint8 array by the generator polynomial side by side; returns the remainder rows."""
+    remainder = np.zeros((pieces.shape[0], ecc_symbols), dtype=np.uint8)
+    for column in range(pieces.shape[1]):
+        feedback = remainder[:, 0] ^ pieces[:, column]
+        remainder[:, :-1] = remainder[:, 1:]
+        remainder[:, -1] = 0
+        remainder ^= numpy_table[feedback]
+    return remainder
+
+
+def rs_failing_codewords(data, ecc_symbols=10, use_numpy=True):
+    """
+    Return the indices of the codewords in data whose syndromes are not all zero.
+    
+    A codeword has all-zero syndromes exactly when it is a multiple of the
+    generator polynomial, so instead of evaluating the syndromes each
+    codeword is divided by the generator with a CRC-style table and checked
+    for a zero remainder. Full codewords are divided side by side with NumPy
+    when it is installed and use_numpy is set.
+    """
+    table, numpy_table = rs_remainder_tables(ecc_symbols)
+    failing = []
+    full = len(data) // 255
+    first = 0
+    if use_numpy and numpy_table is not None and full >= RS_NUMPY_MIN_CODEWORDS:
+        codewords = np.frombuffer(bytes(data[:full * 255]), dtype=np.uint8).reshape(full, 255)
+        remainder = _remainders_numpy(codewords, numpy_table, ecc_symbols)
+        failing = np.flatnonzero(remainder.any(axis=1)).tolist()
+        first = full
+    
+    for index in range(first, -(-len(data) // 255)):
+        # A piece too short to hold the ecc symbols is never a valid codeword
+        if (_remainder(data[index * 255:index * 255 + 255], table, ecc_symbols)
+                or len(data) - index * 255 <= ecc_symbols):
+            failing.append(index)
+    return failing
+
+
+def _tail_block(length, depth, merge_tail=False):
+    """Return (first codeword, codeword count) of the last interleaved block of length encoded bytes when it is not a full one, counting a last shorter codeword too."""
+    full = length // 255
+    blocks = full // depth
+    if merge_tail and blocks and full % depth:
+        blocks -= 1
+    return blocks * depth, -(-length // 255) - blocks * depth
+
+
+def _interleave_blocks(length, depth, merge_tail=False):
+    """
+    Yield (start, codeword count) of the interleaved blocks of whole codewords in length encoded bytes.
+    
+    With merge_tail the codewords left over after the last full block are
+    interleaved with it, in one block of depth to 2 * depth - 1 codewords.
+    """
+    tail_first, _ = _tail_block(length, depth, merge_tail)
+    for first in range(0, tail_first, depth):
+        yield first * 255, depth
+    full = length // 255
+    if full > tail_first:
+        yield tail_first * 255, full - tail_first
+
+
+def rs_interleave(data, depth, merge_tail=False):
+    """
+    Interleave Reed-Solomon codewords depth at a time, so that neighbouring bytes belong to different codewords.
+    
+    Each block of depth whole codewords is stored column by column: byte i of
+    codeword j goes to i * depth + j. A burst of lost bytes, such as a
+    missing oligo, then costs every codeword of the block only about
+    burst / depth bytes. Pieces of whole blocks can be interleaved
+    separately.
+    
+    The codewords after the last full block form a smaller block, and a last
+    shorter codeword stays as it is; a burst there costs each of them more.
+    merge_tail interleaves the leftover codewords with the last full block
+    instead, which with whole codewords only (the message padded to a
+    multiple of 255 - ecc_symbols bytes) leaves no weak tail.
+    
+    Args:
+        data (bytes): Codewords from rs_encode
+        depth (int): Codewords per block, 1 leaves the data as it is
+        merge_tail (bool): Interleave the leftover codewords with the last full block
+    
+    Returns:
+        bytearray: The interleaved codewords
+    """
+    if depth <= 1:
+        return data
+    output = bytearray(data)
+    for start, count in _interleave_blocks(len(data), depth, merge_tail):
+        for column in range(count):
+            output[start + column:start + count * 255:count] = data[start + column * 255:start + column * 255 + 255]
+    return output
+
+
+def rs_deinterleave(data, depth, merge_tail=False):
+    """Undo rs_interleave, putting every codeword back in one piece."""
+    if depth <= 1:
+        return data
+    output = bytearray(data)
+    for start, count in _interleave_blocks(len(data), depth, merge_tail):
+        for column in range(count):
+            output[start + column * 255:start + column * 255 + 255] = data[start + column:start + count * 255:count]
+    return output
+
+
+def rs_deinterleave_positions(positions, length, depth, merge_tail=False):
+    """Return where positions in length interleaved bytes end up after rs_deinterleave, sorted."""
+    if depth <= 1:
+        return sorted(positions)
+    tail_first, _ = _tail_block(length, depth, merge_tail)
+    tail_start = tail_first * 255
+    full = length // 255 * 255
+    mapped = []
+    for position in positions:
+        if position < full:
+            if position >= tail_start:
+                start, count = tail_start, (full - tail_start) // 255
+            else:
+                start, count = position // (255 * depth) * (255 * depth), depth
+            row, column = divmod(position - start, count)
+            position = start + column * 255 + row
+        mapped.append(position)
+    return sorted(mapped)
+
+
+def rs_interleave_block(index, length, depth, merge_tail=False):
+    """
+    Return (first codeword, codeword count) of the interleaved block holding codeword index.
+    
+    Args:
+        index (int): Codeword index in the stream
+        length (int): Size of the whole encoded stream in bytes
+        depth (int): Interleaving depth
+        merge_tail (bool): As for rs_interleave
+    
+    Returns:
+        tuple: The block, counting a last shorter codeword with the last block
+    """
+    if depth <= 1:
+        return index, 1
+    tail_first, tail_count = _tail_block(length, depth, merge_tail)
+    if index >= tail_first:
+        return tail_first, tail_count
+    return index // depth * depth, depth
+
+
+def _codec_correct(codec_class, error_class=ReedSolomonError):
+    """Return a correct() that decodes one codeword with a cached RSCodec-compatible class."""
+    def correct(codeword, ecc_symbols, erase_pos=None):
+        try:
+            message, _, errata = get_engine().rs_codec(ecc_symbols, codec_class).decode(codeword, erase_pos=erase_pos)
+        except error_class as e:
+            # creedsolo has its own exception class
+            raise ReedSolomonError(str(e)) from e
+        return message, errata
+    return correct
+
+
+def _codec_encode(codec_class):
+    """Return an encode() that uses a cached RSCodec-compatible class."""
+    def encode(data, ecc_symbols):
+        return get_engine().rs_codec(ecc_symbols, codec_class).encode(data)
+    return encode
+
+
+def _numpy_encode(data, ecc_symbols):
+    """
+    Encode with the parity of all full messages computed at once.
+    
+    The parity of a message is the remainder of message * x^ecc_symbols
+    divided by the generator polynomial, which is what the division table
+    yields when it is fed the message bytes.
+    """
+    table, numpy_table = rs_remainder_tables(ecc_symbols)
+    message_size = 255 - ecc_symbols
+    full = len(data) // message_size
+    if full < RS_NUMPY_MIN_CODEWORDS:
+        # Too few messages to make up for the NumPy call overhead
+        encoded = bytearray()
+        for start in range(0, len(data), message_size):
+            message = bytes(data[start:start + message_size])
+            encoded += message + _remainder(message, table, ecc_symbols).to_bytes(ecc_symbols, "big")
+        return encoded
+    
+    messages = np.frombuffer(bytes(data[:full * message_size]), dtype=np.uint8).reshape(full, message_size)
+    parity = _remainders_numpy(messages, numpy_table, ecc_symbols)
+    encoded = bytearray(np.concatenate((messages, parity), axis=1).tobytes())
+    
+    tail = bytes(data[full * message_size:])
+    if tail:
+        encoded += tail + _remainder(tail, table, ecc_symbols).to_bytes(ecc_symbols, "big")
+    return encoded
+
+
+# The reference implementation: reedsolo in pure Python
+register_rs_backend(
+    "pure", _codec_encode(RSCodec),
+    lambda data, ecc_symbols: rs_failing_codewords(data, ecc_symbols, use_numpy=False),
+    _codec_correct(RSCodec),
+)
+
+# reedsolo's Cython build, same API
+if creedsolo is not None:
+    register_rs_backend(
+        "creedsolo", _codec_encode(creedsolo.RSCodec), rs_failing_codewords,
+        _codec_correct(creedsolo.RSCodec, creedsolo.ReedSolomonError),
+    )
+
+# Batched GF(256) arithmetic on whole arrays of codewords for encoding and
+# the check. Correction is not batched: the codewords that fail the check
+# go one at a time through the reference decoder, at pure reedsolo speed.
+if np is not None:
+    register_rs_backend("numpy", _numpy_encode, rs_failing_codewords, _codec_correct(RSCodec))
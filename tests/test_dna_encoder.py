@@ -0,0 +1,35 @@
+import pytest
+
+from dna_encoder import encode_data, decode_data
+
+TEXT = b"The quick brown fox jumps over the lazy dog. " * 20
+
+def text_config(**overrides):
+    config = {
+        'use_compression': True,
+        'use_encryption': True,
+        'use_error_correction': True,
+        'ecc_symbols': 10,
+    }
+    config.update(overrides)
+    return config
+
+@pytest.mark.parametrize('cipher', ['aes-gcm', 'aes-cbc', None])
+def test_encode_data_round_trip(cipher):
+    config = text_config(compression_codec='huffman')
+    if cipher:
+        config['cipher'] = cipher
+    dna_sequence, metadata = encode_data(TEXT, config, "secret")
+    assert decode_data(dna_sequence, metadata, "secret") == TEXT
+
+@pytest.mark.parametrize('cipher', ['aes-gcm', 'aes-cbc'])
+def test_encode_data_wrong_password(cipher):
+    dna_sequence, metadata = encode_data(TEXT, text_config(cipher=cipher), "secret")
+    with pytest.raises(ValueError, match="PASSWORD_INCORRECT"):
+        decode_data(dna_sequence, metadata, "wrong")
+
+def test_encode_data_without_codec():
+    # Configs written before codecs were selectable have no compression_codec
+    dna_sequence, metadata = encode_data(TEXT, text_config(use_encryption=False))
+    assert metadata['compression_codec'] == 'huffman'
+    assert decode_data(dna_sequence, metadata) == TEXT
@@ -0,0 +1,20 @@
+import io
+
+import pytest
+
+from huffman import compress_block, huffman_encode, iter_compress, iter_decompress
+
+@pytest.mark.parametrize('shared', [False, True])
+def test_iter_compress_skips_empty_blocks(shared):
+    # An empty block used to be written as the end marker and cut the stream short
+    codes = huffman_encode(b"abcdef")[1]["codes"] if shared else None
+    stream = b"".join(iter_compress([b"abc", b"", b"def"], codes=codes))
+    assert b"".join(iter_decompress(io.BytesIO(stream))) == b"abcdef"
+
+def test_iter_compress_empty_input():
+    stream = b"".join(iter_compress([b""]))
+    assert b"".join(iter_decompress(io.BytesIO(stream))) == b""
+
+def test_compress_block_rejects_empty_block():
+    with pytest.raises(ValueError):
+        compress_block(b"")
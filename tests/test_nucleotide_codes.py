@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from dna_encoder import (
+    initialize_nucleotides, convert_to_nucleotides, nucleotides_to_bytes, rotating_encode, rotating_decode,
+    rotating_tables
+)
+
+NUCLEOTIDES, INVERSE_NUCLEOTIDES = initialize_nucleotides()
+
+def gc_skews(sequence):
+    """Yield the G/C minus A/T count of every prefix of a sequence."""
+    skew = 0
+    for n in sequence:
+        skew += 1 if n in "GC" else -1
+        yield skew
+
+def gc_window_range(sequence, window):
+    counts = [1 if n in "GC" else 0 for n in sequence]
+    current = sum(counts[:window])
+    low = high = current
+    for i in range(window, len(counts)):
+        current += counts[i] - counts[i - window]
+        low = min(low, current)
+        high = max(high, current)
+    return low / window, high / window
+
+@pytest.mark.parametrize('previous', NUCLEOTIDES)
+def test_rotating_gc_bound_on_repeated_bytes(previous):
+    # Repeating one byte is the worst case for a code without a GC constraint:
+    # 0x3E used to give 17% GC, 0xDE 83% and 0xD1 runs of six A/T
+    for byte in range(256):
+        sequence = rotating_encode(bytes([byte]) * 100, NUCLEOTIDES, previous)
+        skews = list(gc_skews(sequence))
+        assert all(abs(skew) <= 6 for skew in skews[5::6])
+        low, high = gc_window_range(sequence, 60)
+        assert 0.3 <= low and high <= 0.7, hex(byte)
+        assert all(a != b for a, b in zip(sequence, sequence[1:]))
+
+def test_rotating_gc_bound_for_any_input():
+    # Walk every reachable (previous nucleotide, balance) pair under every next byte
+    encode, _, _ = rotating_tables(NUCLEOTIDES)
+    seen = set()
+    pending = [(NUCLEOTIDES.index("G"), 0)]
+    while pending:
+        state, balance = pending.pop()
+        if (state, balance) in seen:
+            continue
+        seen.add((state, balance))
+        for byte in range(256):
+            _, next_state, skew, _, spare_state, spare_skew = encode[state << 8 | byte]
+            if balance * skew > 0:
+                next_state, skew = spare_state, spare_skew
+            pending.append((next_state >> 8, balance + skew))
+    assert max(abs(balance) for _, balance in seen) <= 6
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_rotating_round_trip(backend):
+    if backend == 'numpy':
+        pytest.importorskip('numpy')
+    rng = random.Random(0)
+    data = bytes([0x3E] * 50 + [0xDE] * 50 + [0xD1] * 50) + bytes(rng.getrandbits(8) for _ in range(5000))
+    for previous in NUCLEOTIDES:
+        sequence = rotating_encode(data, NUCLEOTIDES, previous)
+        assert rotating_decode(sequence, NUCLEOTIDES, previous, backend) == data
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+def test_rotating_decodes_first_spellings(backend):
+    # Sequences written before spare spellings existed use the digits of the byte itself
+    if backend == 'numpy':
+        pytest.importorskip('numpy')
+    encode, _, _ = rotating_tables(NUCLEOTIDES)
+    for state, previous in enumerate(NUCLEOTIDES):
+        sequence = "".join(encode[state << 8 | byte][0] for byte in range(256)
+                           if encode[state << 8 | byte][1] >> 8 == state)
+        data = bytes(byte for byte in range(256) if encode[state << 8 | byte][1] >> 8 == state)
+        assert rotating_decode(sequence, NUCLEOTIDES, previous, backend) == data
+
+@pytest.mark.parametrize('length', list(range(0, 20)) + [4095, 4096, 4097, 100003])
+def test_binary_backends_match(length):
+    # The NumPy and pure Python converters must agree bit for bit
+    pytest.importorskip('numpy')
+    rng = random.Random(length)
+    data = bytes(rng.getrandbits(8) for _ in range(length))
+    sequence = convert_to_nucleotides(data, NUCLEOTIDES, 'python')
+    assert convert_to_nucleotides(data, NUCLEOTIDES, 'numpy') == sequence
+    assert nucleotides_to_bytes(sequence, INVERSE_NUCLEOTIDES, 'numpy') == data
+    # Also truncated payloads, whose last byte is zero-padded
+    for cut in range(4):
+        truncated = sequence[:len(sequence) - 3 - cut] + "TAC"
+        expected = nucleotides_to_bytes(truncated, INVERSE_NUCLEOTIDES, 'python')
+        assert nucleotides_to_bytes(truncated, INVERSE_NUCLEOTIDES, 'numpy') == expected
+
+@pytest.mark.parametrize('backend', ['python', 'numpy'])
+@pytest.mark.parametrize('payload', ['ACGN', 'ACGTA1', 'ACGTé'])
+def test_binary_rejects_invalid_nucleotides(backend, payload):
+    if backend == 'numpy':
+        pytest.importorskip('numpy')
+    with pytest.raises(ValueError, match="Invalid nucleotide"):
+        nucleotides_to_bytes("ATG" + payload + "TAC", INVERSE_NUCLEOTIDES, backend)